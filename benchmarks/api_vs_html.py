@@ -0,0 +1,89 @@
+"""Response bytes and median latency: HTML list pages vs the ``/api/v1`` equivalents.
+
+Runs every route through the Flask test client against a scratch database, so latency is
+server-side only (query + template or JSON encoding), and signs in as the seeded student.
+
+    python -m benchmarks.api_vs_html [--resources 1000] [--bookings 400] [--repeat 20]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from src.app import create_app
+from src.config import TestConfig
+
+
+def _populate(conn, resources: int, bookings: int) -> None:
+    owner_id = conn.execute("SELECT user_id FROM users WHERE role = 'staff'").fetchone()[0]
+    student_id = conn.execute("SELECT user_id FROM users WHERE email = 'student@campus.test'").fetchone()[0]
+    categories = ('Study room', 'Lab', 'Equipment', 'Event space')
+    conn.executemany(
+        '''INSERT INTO resources (owner_id, title, summary, category, location, capacity, availability_notes, status)
+           VALUES (?, ?, ?, ?, ?, ?, ?, 'published')''',
+        ((owner_id, f'Resource {n}', f'Summary for resource {n}. ' * 10, categories[n % 4], f'Building {n % 9}',
+          n % 40 + 1, 'Weekdays only.') for n in range(resources))
+    )
+    resource_ids = [row[0] for row in conn.execute('SELECT resource_id FROM resources')]
+    conn.executemany(
+        '''INSERT INTO bookings (resource_id, requester_id, start_datetime, end_datetime, status, notes)
+           VALUES (?, ?, ?, ?, 'approved', 'Team meeting')''',
+        ((resource_ids[n % len(resource_ids)], student_id, f'2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}T09:00:00',
+          f'2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}T10:00:00') for n in range(bookings))
+    )
+    conn.commit()
+
+
+def _time(client, url: str, repeat: int, headers=None) -> tuple:
+    samples = []
+    size = status = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        body = response.get_data()
+        samples.append(time.perf_counter() - started)
+        size, status = len(body), response.status_code
+    return status, size, statistics.median(samples)
+
+
+def run(resources: int, bookings: int, repeat: int) -> None:
+    from src.controllers.api_controller import MAX_PAGE_SIZE
+    from src.data_access.db import get_connection
+
+    with tempfile.TemporaryDirectory() as scratch:
+        config = type('BenchConfig', (TestConfig,), {'DATABASE_PATH': os.path.join(scratch, 'bench.db')})
+        app = create_app(config)
+        with app.app_context():
+            _populate(get_connection(), resources, bookings)
+        client = app.test_client()
+        client.post('/auth/login', data={'email': 'student@campus.test', 'password': 'StudentPass1!'})
+        everything = min(max(resources, bookings) + 10, MAX_PAGE_SIZE)
+        cases = [
+            ('browse (HTML)', '/resources/'),
+            ('resources, all fields', f'/api/v1/resources?limit={everything}'),
+            ('resources, title only', f'/api/v1/resources?limit={everything}&fields=title'),
+            ('resources, 50/page', '/api/v1/resources'),
+            ('my bookings (HTML)', '/bookings/mine'),
+            ('bookings, all fields', f'/api/v1/bookings?limit={everything}'),
+            ('bookings, 50/page', '/api/v1/bookings'),
+        ]
+        print(f'{resources} published resources, {bookings} bookings for the signed-in user; median of {repeat}')
+        print(f"{'route':<24} {'status':>6} {'KiB':>9} {'ms':>8}")
+        for label, url in cases:
+            status, size, elapsed = _time(client, url, repeat)
+            print(f'{label:<24} {status:>6} {size / 1024:>9.1f} {elapsed * 1000:>8.2f}')
+        etag = client.get('/api/v1/resources').headers['ETag']
+        status, size, elapsed = _time(client, '/api/v1/resources', repeat, {'If-None-Match': etag})
+        print(f"{'resources, revalidated':<24} {status:>6} {size / 1024:>9.1f} {elapsed * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=400)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run(args.resources, args.bookings, args.repeat)
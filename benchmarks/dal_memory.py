@@ -0,0 +1,76 @@
+"""Peak Python memory and time for walking a large bookings table: materialised list vs iterators.
+
+Builds a scratch database with ``--rows`` bookings, then counts approved bookings three ways:
+the ``fetchall()`` + dataclass list the list methods use, ``BookingDAL.iter_bookings()`` and
+``iter_bookings(raw=True)``. The iterators' peak should stay at roughly one batch.
+
+    python -m benchmarks.dal_memory [--rows 1000000] [--batch-size 500]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from src.app import create_app
+from src.config import TestConfig
+
+
+def _populate(conn, rows: int) -> None:
+    resource_ids = [row[0] for row in conn.execute('SELECT resource_id FROM resources')]
+    requester_id = conn.execute("SELECT user_id FROM users WHERE role = 'student'").fetchone()[0]
+    statuses = ('pending', 'approved', 'rejected', 'cancelled', 'completed')
+    conn.executemany(
+        '''INSERT INTO bookings (resource_id, requester_id, start_datetime, end_datetime, status, notes)
+           VALUES (?, ?, ?, ?, ?, ?)''',
+        ((resource_ids[n % len(resource_ids)], requester_id, f'2025-{n % 12 + 1:02d}-01T09:00:00',
+          f'2025-{n % 12 + 1:02d}-01T10:00:00', statuses[n % len(statuses)], f'booking note {n}')
+         for n in range(rows))
+    )
+    conn.commit()
+
+
+def _measure(label: str, walk) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    approved = walk()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<28} {elapsed:>8.2f} {peak / 2**20:>10.1f} {approved:>10}')
+
+
+def run(rows: int, batch_size: int) -> None:
+    from src.data_access.booking_dal import _SELECT, BookingDAL, _booking
+    from src.data_access.db import fetch_all, get_connection
+
+    with tempfile.TemporaryDirectory() as scratch:
+        config = type('BenchConfig', (TestConfig,), {'DATABASE_PATH': os.path.join(scratch, 'bench.db')})
+        app = create_app(config)
+        with app.app_context():
+            conn = get_connection()
+            started = time.perf_counter()
+            _populate(conn, rows)
+            print(f'{rows} bookings inserted in {time.perf_counter() - started:.1f}s; batch size {batch_size}')
+            print(f"{'path':<28} {'seconds':>8} {'peak MiB':>10} {'approved':>10}")
+
+            def materialised():
+                bookings = fetch_all(_booking, f'{_SELECT} ORDER BY booking_id')
+                return sum(1 for booking in bookings if booking.status == 'approved')
+
+            _measure('fetchall + dataclasses', materialised)
+            _measure('iter_bookings()', lambda: sum(
+                1 for booking in BookingDAL.iter_bookings(batch_size=batch_size) if booking.status == 'approved'))
+            status = BookingDAL.COLUMNS.index('status')
+            _measure('iter_bookings(raw=True)', lambda: sum(
+                1 for row in BookingDAL.iter_bookings(raw=True, batch_size=batch_size) if row[status] == 'approved'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+    run(args.rows, args.batch_size)
@@ -0,0 +1,108 @@
+"""Fuzzy resource index: build time, memory and per-query latency for misspelt searches.
+
+Fills a scratch database with ``--resources`` resources whose titles and locations mix common
+words with generated names (a vocabulary closer to a real catalog than "Resource 1..n"), then
+builds the per-worker index the way startup does and measures its Python heap with
+``tracemalloc``. Queries are title/location words with one or two typos (dropped, doubled,
+swapped or replaced letters), timed through the index alone and through
+``ResourceDAL.fuzzy_search``, which also loads the cards.
+
+    python -m benchmarks.fuzzy_search [--resources 50000] [--queries 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from src.app import create_app
+from src.config import TestConfig
+
+CATEGORIES = ('Study room', 'Lab', 'Equipment', 'Event space')
+NOUNS = ('studio', 'projector', 'camera', 'whiteboard', 'podcast', 'seminar', 'auditorium', 'microscope',
+         'printer', 'workshop', 'gallery', 'library', 'kitchen', 'theatre', 'lounge', 'workstation')
+SYLLABLES = ('ba', 'cor', 'del', 'fen', 'gri', 'hol', 'jar', 'kel', 'lu', 'mon', 'nor', 'pel', 'qui', 'ros',
+             'sten', 'tal', 'ver', 'wyn')
+
+
+def _name(rng: random.Random) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+
+
+def _populate(conn, resources: int, rng: random.Random) -> list:
+    owner_id = conn.execute("SELECT user_id FROM users WHERE role = 'staff'").fetchone()[0]
+    names = [_name(rng) for _ in range(max(resources // 10, 50))]
+    rows = [
+        (owner_id, f'{rng.choice(names)} {rng.choice(NOUNS).title()} {n % 400}', 'Bookable space.',
+         CATEGORIES[n % 4], f'{rng.choice(names)} Hall', n % 40 + 1, 'published')
+        for n in range(resources)
+    ]
+    conn.executemany(
+        '''INSERT INTO resources (owner_id, title, summary, category, location, capacity, status)
+           VALUES (?, ?, ?, ?, ?, ?, ?)''', rows)
+    conn.commit()
+    return [name.lower() for name in names] + list(NOUNS)
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    for _ in range(1 if len(word) <= 5 else rng.randint(1, 2)):
+        i = rng.randrange(len(word) - 1)
+        edit = rng.randrange(4)
+        if edit == 0:
+            word = word[:i] + word[i + 1:]
+        elif edit == 1:
+            word = word[:i] + word[i] + word[i:]
+        elif edit == 2:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        else:
+            word = word[:i] + rng.choice('aeiourstln') + word[i + 1:]
+    return word
+
+
+def run(resources: int, queries: int) -> None:
+    from src.data_access.db import get_connection
+    from src.data_access.resource_dal import ResourceDAL
+    from src.utils.fuzzy_search import FuzzyResourceIndex
+
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as scratch:
+        config = type('BenchConfig', (TestConfig,), {'DATABASE_PATH': os.path.join(scratch, 'bench.db')})
+        app = create_app(config)
+        with app.app_context():
+            vocabulary = _populate(get_connection(), resources, rng)
+            FuzzyResourceIndex.reset()
+            tracemalloc.start()
+            started = time.perf_counter()
+            FuzzyResourceIndex.sync()
+            build = time.perf_counter() - started
+            heap, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats = FuzzyResourceIndex.snapshot()
+            print(f"{stats['resources']} resources, {stats['terms']} distinct words")
+            print(f'build {build:.2f} s, index heap {heap / 2**20:.1f} MiB')
+
+            workload = [' '.join(_typo(rng.choice(vocabulary), rng) for _ in range(rng.choice((1, 1, 2))))
+                        for _ in range(queries)]
+            print(f"{'path':<22} {'median ms':>10} {'p95 ms':>8} {'found':>6}")
+            for label, search in (('index only', lambda text: FuzzyResourceIndex.search(text, 96)),
+                                  ('fuzzy_search (cards)', lambda text: ResourceDAL.fuzzy_search(keyword=text))):
+                samples, found = [], 0
+                for text in workload:
+                    started = time.perf_counter()
+                    found += bool(search(text))
+                    samples.append(time.perf_counter() - started)
+                p95 = statistics.quantiles(samples, n=20)[-1]
+                print(f'{label:<22} {statistics.median(samples) * 1000:>10.3f} {p95 * 1000:>8.3f} '
+                      f'{found / queries:>6.0%}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+    run(args.resources, args.queries)
@@ -0,0 +1,160 @@
+"""Rows, bytes and time per list page: full models (``SELECT`` every column + galleries) vs list projections.
+
+"before" rebuilds the previous list paths: browse and owner listings load whole ``Resource`` rows
+with their galleries, and the booking pages load whole ``Booking`` rows and then one full
+``Resource`` per booking for its title. "after" is the DAL as it stands: ``ResourceCard`` and
+``BookingRow`` projections. Both run against the same indexes, so the difference is the projection.
+
+    python -m benchmarks.list_projections [--resources 2000] [--bookings 20000] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from src.app import create_app
+from src.config import TestConfig
+
+
+class _Counter:
+    """Wraps row factories to count rows and the text/blob bytes they carried out of SQLite."""
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+    def wrap(self, factory):
+        def build(cursor, row):
+            self.rows += 1
+            self.bytes += sum(len(value) for value in row if isinstance(value, (str, bytes)))
+            return factory(cursor, row)
+        return build
+
+
+def _populate(conn, resources: int, bookings: int) -> tuple:
+    owner_id = conn.execute("SELECT user_id FROM users WHERE role = 'staff'").fetchone()[0]
+    student_id = conn.execute("SELECT user_id FROM users WHERE role = 'student'").fetchone()[0]
+    categories = ('Study room', 'Lab', 'Equipment', 'Event space')
+    conn.executemany(
+        '''INSERT INTO resources (owner_id, title, summary, category, location, capacity, availability_notes, status)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+        ((owner_id, f'Resource {n}', f'Summary for resource {n}. ' * 40, categories[n % 4], f'Building {n % 9}',
+          n % 40 + 1, f'Open weekdays, key from the front desk ({n}). ' * 8, 'published' if n % 5 else 'draft')
+         for n in range(resources))
+    )
+    resource_ids = [row[0] for row in conn.execute('SELECT resource_id FROM resources')]
+    conn.executemany(
+        'INSERT INTO resource_images (resource_id, file_path) VALUES (?, ?)',
+        ((resource_id, f'uploads/resource-{resource_id}-{i}.jpg') for resource_id in resource_ids for i in range(3))
+    )
+    statuses = ('pending', 'approved', 'rejected', 'cancelled', 'completed')
+    # One booking in fifty is the seeded student's; the rest belong to requesters nobody lists.
+    conn.executemany(
+        '''INSERT INTO bookings (resource_id, requester_id, start_datetime, end_datetime, status, notes, owner_notes)
+           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+        ((resource_ids[n % len(resource_ids)], student_id if n % 50 == 0 else 100_000 + n % 400,
+          f'2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}T09:00:00', f'2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}T10:00:00',
+          statuses[n % 5], f'Requester note for booking {n}. ' * 12, f'Owner reply {n}. ' * 6)
+         for n in range(bookings))
+    )
+    conn.commit()
+    return owner_id, student_id
+
+
+def _measure(page, repeat: int) -> tuple:
+    counter = _Counter()
+    page(counter)
+    rows, transferred = counter.rows, counter.bytes
+    started = time.perf_counter()
+    for _ in range(repeat):
+        page(_Counter())
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    page(_Counter())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, transferred, peak, elapsed
+
+
+def run(resources: int, bookings: int, repeat: int) -> None:
+    from src.data_access import booking_dal, resource_dal
+    from src.data_access.db import fetch_all, fetch_one, get_connection
+
+    with tempfile.TemporaryDirectory() as scratch:
+        config = type('BenchConfig', (TestConfig,), {'DATABASE_PATH': os.path.join(scratch, 'bench.db')})
+        app = create_app(config)
+        with app.app_context():
+            owner_id, student_id = _populate(get_connection(), resources, bookings)
+            full_resource, full_booking = resource_dal._SELECT, booking_dal._SELECT
+
+            def resources_for_bookings(counter, rows):
+                factory = counter.wrap(resource_dal._resource)
+                return {b.resource_id: fetch_one(factory, f'{full_resource} WHERE resource_id = ?', (b.resource_id,))
+                        for b in rows}
+
+            def browse_before(counter):
+                return fetch_all(counter.wrap(resource_dal._resource),
+                                 f"{full_resource} WHERE status = 'published' ORDER BY created_at DESC")
+
+            def browse_after(counter):
+                return fetch_all(counter.wrap(resource_dal._card),
+                                 f"{resource_dal._SELECT_CARD} WHERE status = 'published' ORDER BY created_at DESC")
+
+            def mine_before(counter):
+                return fetch_all(counter.wrap(resource_dal._resource),
+                                 f'{full_resource} WHERE owner_id = ? ORDER BY created_at DESC', (owner_id,))
+
+            def mine_after(counter):
+                return fetch_all(counter.wrap(resource_dal._card),
+                                 f'{resource_dal._SELECT_CARD} WHERE owner_id = ? ORDER BY created_at DESC', (owner_id,))
+
+            def my_bookings_before(counter):
+                rows = fetch_all(counter.wrap(booking_dal._booking),
+                                 f'{full_booking} WHERE requester_id = ? ORDER BY start_datetime DESC', (student_id,))
+                return rows, resources_for_bookings(counter, rows)
+
+            def my_bookings_after(counter):
+                return fetch_all(counter.wrap(booking_dal._booking_row),
+                                 f'{booking_dal._SELECT_ROW} WHERE b.requester_id = ? ORDER BY b.start_datetime DESC',
+                                 (student_id,))
+
+            def owner_queue_before(counter):
+                rows = fetch_all(
+                    counter.wrap(booking_dal._booking),
+                    f'''{full_booking} WHERE status = 'pending'
+                          AND resource_id IN (SELECT resource_id FROM resources WHERE owner_id = ?)
+                        ORDER BY start_datetime ASC''',
+                    (owner_id,))
+                return rows, resources_for_bookings(counter, rows)
+
+            def owner_queue_after(counter):
+                return fetch_all(
+                    counter.wrap(booking_dal._booking_row),
+                    f"{booking_dal._SELECT_ROW} WHERE r.owner_id = ? AND b.status = 'pending' ORDER BY b.start_datetime",
+                    (owner_id,))
+
+            pages = {
+                'browse': (browse_before, browse_after),
+                'my resources': (mine_before, mine_after),
+                'my bookings': (my_bookings_before, my_bookings_after),
+                'owner queue': (owner_queue_before, owner_queue_after),
+            }
+            print(f'{resources} resources (3 images each), {bookings} bookings')
+            print(f"{'page':<13} {'path':<7} {'rows':>7} {'KiB read':>9} {'peak KiB':>9} {'ms':>8}")
+            for name, paths in pages.items():
+                for label, page in zip(('before', 'after'), paths):
+                    rows, transferred, peak, elapsed = _measure(page, repeat)
+                    print(f'{name:<13} {label:<7} {rows:>7} {transferred / 1024:>9.0f} {peak / 1024:>9.0f} '
+                          f'{elapsed * 1000:>8.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=2000)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.resources, args.bookings, args.repeat)
@@ -0,0 +1,63 @@
+"""Per-character scan cost of the moderation automaton as the term list grows.
+
+Compares the Aho-Corasick scan against the naive alternative of one compiled regex per term;
+the automaton's ns/char should stay flat while the regex loop grows with the term count.
+
+    python -m benchmarks.moderation_filter [--chars 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import string
+import time
+
+from src.utils.aho_corasick import Automaton
+
+TERM_COUNTS = (10, 100, 1000, 10000)
+NAIVE_LIMIT = 1000  # the regex loop is already far behind by here
+
+
+def _word(rng: random.Random) -> str:
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+
+def _best_of(repeats: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(chars: int, seed: int = 11) -> None:
+    rng = random.Random(seed)
+    words = []
+    while sum(len(word) + 1 for word in words) < chars:
+        words.append(_word(rng))
+    text = ' '.join(words)
+
+    print(f'text: {len(text)} chars')
+    print(f"{'terms':>7} {'build ms':>9} {'automaton ns/char':>18} {'regex ns/char':>14}")
+    for count in TERM_COUNTS:
+        terms = [_word(rng) for _ in range(count)]
+        started = time.perf_counter()
+        automaton = Automaton((term, 'flag') for term in terms)
+        build_ms = (time.perf_counter() - started) * 1000
+        scan = _best_of(5, lambda: automaton.scan(text))
+
+        naive = '-'
+        if count <= NAIVE_LIMIT:
+            patterns = [re.compile(rf'\b{re.escape(term)}\b', re.IGNORECASE) for term in terms]
+            regex = _best_of(3, lambda: [pattern.findall(text) for pattern in patterns])
+            naive = f'{regex / len(text) * 1e9:.0f}'
+        print(f'{count:>7} {build_ms:>9.1f} {scan / len(text) * 1e9:>18.0f} {naive:>14}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chars', type=int, default=20000)
+    args = parser.parse_args()
+    run(args.chars)
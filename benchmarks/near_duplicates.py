@@ -0,0 +1,80 @@
+"""Precision/recall and write-path latency of the MinHash LSH near-duplicate detector.
+
+Builds a synthetic corpus of review-length texts, plants edited copies of some of them, and
+compares LSH matches against exact shingle Jaccard similarity.
+
+    python -m benchmarks.near_duplicates [--corpus 5000] [--duplicates 500]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from src.utils.minhash import MinHashLSH, shingles, signature
+
+THRESHOLD = 0.7
+VOCABULARY = [
+    f'{stem}{suffix}'
+    for stem in ('room', 'quiet', 'desk', 'light', 'group', 'book', 'lab', 'screen', 'chair', 'study',
+                 'noise', 'clean', 'staff', 'open', 'late', 'print', 'wifi', 'seat', 'board', 'door')
+    for suffix in ('', 's', 'ed', 'ing', 'er', 'ly', 'ness', 'able', 'ful', 'ish')
+]
+
+
+def _document(rng: random.Random) -> list[str]:
+    return [rng.choice(VOCABULARY) for _ in range(rng.randint(20, 60))]
+
+
+def _edit(rng: random.Random, words: list[str], rate: float) -> list[str]:
+    return [rng.choice(VOCABULARY) if rng.random() < rate else word for word in words]
+
+
+def _jaccard(left: set, right: set) -> float:
+    return len(left & right) / len(left | right) if left and right else 0.0
+
+
+def run(corpus_size: int, duplicates: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    corpus = [' '.join(_document(rng)) for _ in range(corpus_size)]
+    shingle_sets = [shingles(text) for text in corpus]
+
+    lsh = MinHashLSH()
+    started = time.perf_counter()
+    for index, hashes in enumerate(shingle_sets):
+        lsh.add(index, signature(hashes))
+    build_seconds = time.perf_counter() - started
+
+    true_positive = false_positive = false_negative = 0
+    latencies = []
+    for _ in range(duplicates):
+        source = rng.randrange(corpus_size)
+        probe = ' '.join(_edit(rng, corpus[source].split(), rate=rng.choice((0.02, 0.05, 0.1, 0.3))))
+        started = time.perf_counter()
+        hashes = shingles(probe)
+        found = {key for key, _ in lsh.query(signature(hashes), THRESHOLD)}
+        latencies.append(time.perf_counter() - started)
+
+        # Ground truth only for the planted source; random corpus texts never reach the threshold.
+        expected = {source} if _jaccard(hashes, shingle_sets[source]) >= THRESHOLD else set()
+        true_positive += len(found & expected)
+        false_positive += len(found - expected)
+        false_negative += len(expected - found)
+
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 1.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 1.0
+    latencies.sort()
+    print(f'corpus={corpus_size} probes={duplicates} threshold={THRESHOLD}')
+    print(f'index build: {build_seconds * 1000:.0f} ms ({build_seconds / corpus_size * 1e6:.0f} us/text)')
+    print(f'precision={precision:.3f} recall={recall:.3f}')
+    print(f'check latency: median {statistics.median(latencies) * 1e6:.0f} us, '
+          f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e6:.0f} us')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', type=int, default=5000)
+    parser.add_argument('--duplicates', type=int, default=500)
+    args = parser.parse_args()
+    run(args.corpus, args.duplicates)
@@ -0,0 +1,50 @@
+"""Roster provisioning throughput against a scratch database, by hashing process count.
+
+Hashing dominates, so rows/s should scale with processes up to the machine's core count; the
+executemany writes overlap with the next chunk's hashing and barely register.
+
+    python -m benchmarks.provisioning [--rows 2000] [--processes 0 1 2 4]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from src.app import create_app
+from src.config import TestConfig
+
+
+def _roster(rows: int, run: int) -> str:
+    lines = ['name,email,role,department']
+    lines += [f'User {i},user{run}.{i}@campus.test,student,Dept {i % 7}' for i in range(rows)]
+    return '\n'.join(lines) + '\n'
+
+
+def run(rows: int, process_counts: list[int], method: str) -> None:
+    from src.utils.provisioning import provision_users
+
+    with tempfile.TemporaryDirectory() as scratch:
+        config = type('BenchConfig', (TestConfig,), {'DATABASE_PATH': os.path.join(scratch, 'bench.db')})
+        app = create_app(config)
+        print(f'{rows} new accounts, {method}, {os.cpu_count()} cpu(s)')
+        print(f"{'processes':>9} {'seconds':>8} {'rows/s':>8}")
+        with app.app_context():
+            for run_number, processes in enumerate(process_counts):
+                roster = io.StringIO(_roster(rows, run_number))
+                started = time.perf_counter()
+                report = provision_users(roster, method, processes=processes)
+                elapsed = time.perf_counter() - started
+                assert report.created == rows, report.errors[:3]
+                print(f'{processes:>9} {elapsed:>8.2f} {rows / elapsed:>8.0f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--processes', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--method', default='scrypt:32768:8:1')
+    args = parser.parse_args()
+    run(args.rows, args.processes, args.method)
@@ -0,0 +1,101 @@
+"""Objects/second and bytes/row for large list views: sqlite3.Row + dict dataclasses vs slotted factories.
+
+"before" rebuilds the previous path: ``SELECT *`` through ``sqlite3.Row`` into a dataclass with a
+per-instance ``__dict__``, field by field via ``row['col']``. "after" is the DAL's generated
+positional row factory over slotted models, with status/category/role strings interned.
+
+    python -m benchmarks.row_factories [--rows 200000]
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from src.app import create_app
+from src.config import TestConfig
+
+
+def _unslotted(cls):
+    """Same fields as ``cls`` but as an ordinary (``__dict__``) dataclass."""
+    return dataclasses.make_dataclass(f'Plain{cls.__name__}', [(f.name, f.type, f) for f in dataclasses.fields(cls)])
+
+
+def _measure(build) -> tuple:
+    gc.collect()
+    started = time.perf_counter()
+    objects = build()
+    elapsed = time.perf_counter() - started
+    del objects
+    gc.collect()
+    tracemalloc.start()
+    objects = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(objects), len(objects) / elapsed, size / len(objects)
+
+
+def _populate(conn, rows: int) -> None:
+    owner_id = conn.execute("SELECT user_id FROM users WHERE role = 'staff'").fetchone()[0]
+    requester_id = conn.execute("SELECT user_id FROM users WHERE role = 'student'").fetchone()[0]
+    categories = ('Study room', 'Lab', 'Equipment', 'Event space')
+    conn.executemany(
+        '''INSERT INTO resources (owner_id, title, summary, category, location, capacity, status)
+           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+        ((owner_id, f'Resource {n}', f'Summary for resource {n}', categories[n % 4], f'Building {n % 9}', n % 40 + 1,
+          'published' if n % 5 else 'draft') for n in range(rows // 10))
+    )
+    resource_ids = [row[0] for row in conn.execute('SELECT resource_id FROM resources')]
+    statuses = ('pending', 'approved', 'rejected', 'cancelled', 'completed')
+    conn.executemany(
+        '''INSERT INTO bookings (resource_id, requester_id, start_datetime, end_datetime, status, notes)
+           VALUES (?, ?, ?, ?, ?, ?)''',
+        ((resource_ids[n % len(resource_ids)], requester_id, '2025-03-01T09:00:00', '2025-03-01T10:00:00',
+          statuses[n % 5], None) for n in range(rows))
+    )
+    conn.commit()
+
+
+def run(rows: int) -> None:
+    from src.data_access import booking_dal, resource_dal
+    from src.data_access.db import fetch_all, get_connection
+
+    with tempfile.TemporaryDirectory() as scratch:
+        config = type('BenchConfig', (TestConfig,), {'DATABASE_PATH': os.path.join(scratch, 'bench.db')})
+        app = create_app(config)
+        with app.app_context():
+            conn = get_connection()
+            _populate(conn, rows)
+            cases = {
+                'bookings': (booking_dal.Booking, booking_dal._booking, booking_dal._SELECT, 'bookings'),
+                'resources': (resource_dal.Resource, resource_dal._resource, resource_dal._SELECT, 'resources'),
+            }
+            print(f"{'model':<10} {'path':<7} {'rows':>8} {'objects/s':>11} {'bytes/row':>10}")
+            for name, (model, factory, select, table) in cases.items():
+                plain = _unslotted(model)
+                columns = [field.name for field in dataclasses.fields(model)]
+
+                def before():
+                    out = []
+                    for row in conn.execute(f'SELECT * FROM {table}').fetchall():
+                        values = {c: row[c] for c in columns if c in row.keys()}
+                        if 'gallery' in columns:
+                            values['gallery'] = [r[0] for r in conn.execute(
+                                'SELECT file_path FROM resource_images WHERE resource_id = ?', (row['resource_id'],))]
+                        out.append(plain(**values))
+                    return out
+
+                for label, build in (('before', before), ('after', lambda: fetch_all(factory, select))):
+                    count, per_second, per_row = _measure(build)
+                    print(f'{name:<10} {label:<7} {count:>8} {per_second:>11,.0f} {per_row:>10.0f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+    run(args.rows)
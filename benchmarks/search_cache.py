@@ -0,0 +1,93 @@
+"""Browse searches/second: every card uncached vs paged, with the search result cache off and on.
+
+Replays ``--searches`` browse lookups drawn from a few dozen filter sets (category dropdown,
+common keywords, capacity, sort) and pages 1-3, weighted so popular ones recur as they do on
+the browse page. "all cards" is the previous browse path, ``search_resources`` loading every
+match. Every ``--write-every`` searches one resource is edited, which bumps the catalog version
+and retires the whole cache.
+
+    python -m benchmarks.search_cache [--resources 20000] [--searches 2000] [--write-every 500]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.app import create_app
+from src.config import TestConfig
+
+CATEGORIES = ('Study room', 'Lab', 'Equipment', 'Event space')
+KEYWORDS = ('projector', 'quiet', 'whiteboard', 'camera', 'podcast', 'lab', 'Group', 'room 2')
+
+
+def _populate(conn, resources: int) -> None:
+    owner_id = conn.execute("SELECT user_id FROM users WHERE role = 'staff'").fetchone()[0]
+    conn.executemany(
+        '''INSERT INTO resources (owner_id, title, summary, category, location, capacity, status)
+           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+        ((owner_id, f'{KEYWORDS[n % len(KEYWORDS)].title()} room {n}',
+          f'Bookable space {n} with a {KEYWORDS[(n * 7) % len(KEYWORDS)]} and seating. ' * 4,
+          CATEGORIES[n % 4], f'Building {n % 9}', n % 40 + 1, 'published' if n % 5 else 'draft')
+         for n in range(resources))
+    )
+    conn.commit()
+
+
+def _workload(searches: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    filter_sets = [{}]
+    filter_sets += [{'category': category} for category in CATEGORIES]
+    filter_sets += [{'keyword': keyword} for keyword in KEYWORDS]
+    filter_sets += [{'keyword': keyword.upper()} for keyword in KEYWORDS[:3]]
+    filter_sets += [{'category': category, 'min_capacity': seats} for category in CATEGORIES for seats in (4, 5, 10)]
+    filter_sets += [{'sort': 'top_rated'}, {'category': 'Lab', 'sort': 'top_rated'}]
+    weights = [1 / (rank + 1) for rank in range(len(filter_sets))]  # Zipf-like popularity
+    pages = rng.choices((1, 2, 3), (6, 2, 1), k=searches)
+    return list(zip(rng.choices(filter_sets, weights, k=searches), pages))
+
+
+def run(resources: int, searches: int, write_every: int) -> None:
+    from src.data_access.db import get_connection
+    from src.data_access.resource_dal import ResourceDAL
+    from src.utils.search_cache import SearchCache
+
+    with tempfile.TemporaryDirectory() as scratch:
+        config = type('BenchConfig', (TestConfig,), {'DATABASE_PATH': os.path.join(scratch, 'bench.db')})
+        app = create_app(config)
+        workload = _workload(searches)
+        with app.app_context():
+            _populate(get_connection(), resources)
+            target = ResourceDAL.search_resources(limit=1)[0].resource_id
+            print(f'{resources} resources, {searches} searches over {len({repr(f) for f, _ in workload})} filter sets, '
+                  f'a catalog write every {write_every}')
+            print(f"{'path':<22} {'seconds':>8} {'searches/s':>11} {'hit rate':>9} {'evicted':>8}")
+            paths = (
+                ('all cards, no cache', 0, lambda filters, page: ResourceDAL.search_resources(**filters)),
+                ('paged, no cache', 0, lambda filters, page: ResourceDAL.search_page(**filters, page=page)),
+                ('paged, 4 MiB cache', 4 * 1024 * 1024,
+                 lambda filters, page: ResourceDAL.search_page(**filters, page=page)),
+            )
+            for label, budget, search in paths:
+                app.config['SEARCH_CACHE_BYTES'] = budget
+                SearchCache.reset()
+                started = time.perf_counter()
+                for n, (filters, page) in enumerate(workload, 1):
+                    search(filters, page)
+                    if write_every and n % write_every == 0:
+                        ResourceDAL.update_resource(target, capacity=n % 40 + 1)
+                elapsed = time.perf_counter() - started
+                stats = SearchCache.snapshot()
+                hit_rate = f"{stats['hit_rate']:.1%}" if stats['hit_rate'] is not None else '-'
+                print(f'{label:<22} {elapsed:>8.2f} {searches / elapsed:>11.0f} {hit_rate:>9} {stats["evicted"]:>8}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resources', type=int, default=20000)
+    parser.add_argument('--searches', type=int, default=2000)
+    parser.add_argument('--write-every', type=int, default=500)
+    args = parser.parse_args()
+    run(args.resources, args.searches, args.write_every)
@@ -4,9 +4,11 @@ from __future__ import annotations
 import os
 from datetime import datetime
 
+import click
 from flask import Flask, g
 from flask_login import LoginManager, current_user
 from flask_wtf.csrf import CSRFProtect
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from src.config import Config
 from src.controllers import (
@@ -17,21 +19,53 @@ from src.controllers import (
     message_bp,
     review_bp,
     admin_bp,
+    api_bp,
     site_bp,
 )
 from src.data_access.db import init_database, get_connection
-from src.data_access.notification_dal import NotificationDAL
+from src.data_access.feed_dal import Feed
+from src.data_access.message_dal import MessageDAL
+from src.data_access.stats_dal import reconcile_counters
 from src.data_access.user_dal import UserDAL
+from src.utils.content_filter import ContentFilter
+from src.utils.exports import DATASETS, FORMATS, ExportError, stream_export
+from src.utils.fuzzy_search import FuzzyResourceIndex
+from src.utils.maintenance import MaintenanceScheduler, run_retention
+from src.utils.near_duplicates import NearDuplicateIndex, backfill_signatures
+from src.utils.notification_feed import NotificationFeed
+from src.utils.notification_outbox import OutboxDispatcher, OutboxSettings, SMTPMailer, drain
+from src.utils.password_hasher import PasswordHasher
+from src.utils.provisioning import RosterError, missing_passwords, provision_users, write_credentials
+from src.utils.rate_limit import TokenBucketLimiter
+from src.utils.search_cache import SearchCache
+from src.utils.user_cache import UserCache
 
 login_manager = LoginManager()
 csrf = CSRFProtect()
 
 
+def reset_worker_caches() -> None:
+    """Drop every per-process cache and index, e.g. after the database file has been replaced.
+
+    Each rebuilds lazily on first use; nothing here reads the database.
+    """
+    NotificationFeed.invalidate_all()
+    NearDuplicateIndex.reset()
+    ContentFilter.reset()
+    UserCache.invalidate_all()
+    SearchCache.reset()
+    FuzzyResourceIndex.reset()
+
+
 def create_app(config_object: type[Config] | None = None) -> Flask:
     app = Flask(__name__, template_folder='templates', static_folder='static')
     app.config.from_object(config_object or Config)
 
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    if app.config['TRUSTED_PROXY_HOPS']:
+        # remote_addr (and the login IP bucket keyed on it) then names the client, not the proxy.
+        hops = app.config['TRUSTED_PROXY_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
 
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -40,10 +74,32 @@ def create_app(config_object: type[Config] | None = None) -> Flask:
 
     with app.app_context():
         init_database(force=app.config.get('TESTING', False))
+    reset_worker_caches()
+
+    if app.config.get('MAIL_SERVER') and app.config.get('OUTBOX_WORKERS'):
+        dispatcher = OutboxDispatcher(
+            SMTPMailer.from_config(app.config),
+            OutboxSettings.from_config(app.config),
+            workers=app.config['OUTBOX_WORKERS'],
+        )
+        dispatcher.start()
+        app.extensions['notification_outbox'] = dispatcher
+
+    app.extensions['password_hasher'] = PasswordHasher.from_config(app.config)
+    app.extensions['login_limits'] = {
+        'ip': TokenBucketLimiter(app.config['LOGIN_IP_BURST'], app.config['LOGIN_IP_PER_MINUTE']),
+        'account': TokenBucketLimiter(app.config['LOGIN_ACCOUNT_BURST'], app.config['LOGIN_ACCOUNT_PER_MINUTE']),
+    }
+
+    if app.config.get('RETENTION_INTERVAL_HOURS'):
+        scheduler = MaintenanceScheduler(app, app.config['RETENTION_INTERVAL_HOURS'] * 3600)
+        scheduler.start()
+        app.extensions['retention_scheduler'] = scheduler
 
     @login_manager.user_loader
     def load_user(user_id):  # type: ignore[override]
-        return UserDAL.get_user_by_id(int(user_id))
+        user = UserDAL.get_cached_user(int(user_id))
+        return user if user and user.is_active else None
 
     app.register_blueprint(site_bp)
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -53,24 +109,118 @@ def create_app(config_object: type[Config] | None = None) -> Flask:
     app.register_blueprint(message_bp)
     app.register_blueprint(review_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(api_bp)
 
     @app.context_processor
     def inject_layout_data():
-        nav_notifications = []
+        nav_feed = Feed()
         if current_user.is_authenticated:
-            nav_notifications = NotificationDAL.list_for_user(current_user.user_id, limit=5)
+            nav_feed = NotificationFeed.for_user(current_user.user_id, limit=5, ttl=app.config['FEED_CACHE_SECONDS'])
         return {
             'current_year': datetime.utcnow().year,
             'app_name': 'Campus Resource Hub',
-            'nav_notifications': nav_notifications,
+            'nav_notifications': nav_feed.items,
+            'nav_unread_messages': nav_feed.unread_messages,
         }
 
     @app.cli.command('init-db')
     def init_db_command():
         """CLI helper to rebuild the database schema."""
         init_database(force=True)
+        reset_worker_caches()
         print('Database initialized at', app.config['DATABASE_PATH'])
 
+    @app.cli.command('prune-message-events')
+    def prune_message_events_command():
+        """Trim the SSE change table to the configured retention window."""
+        removed = MessageDAL.prune_events(app.config['MESSAGE_EVENT_RETENTION_HOURS'])
+        print(f'Removed {removed} message events')
+
+    @app.cli.command('run-retention')
+    def run_retention_command():
+        """Archive old notifications and trim the outbox and message change table now."""
+        for table, removed in run_retention(app).items():
+            print(f'{table}: removed {removed} rows')
+
+    @app.cli.command('backfill-signatures')
+    @click.option('--batch-size', default=500, show_default=True)
+    def backfill_signatures_command(batch_size):
+        """Sign existing reviews and messages and flag near-duplicates among them."""
+        totals = backfill_signatures(batch_size=batch_size)
+        print(f"Signed {totals['signed']} rows, flagged {totals['flagged']} near-duplicates")
+
+    @app.cli.command('reconcile-counters')
+    def reconcile_counters_command():
+        """Recount the dashboard counters from their source tables and fix any drift."""
+        conn = get_connection()
+        drifted = reconcile_counters(conn)
+        conn.commit()
+        for name, stored, actual in drifted:
+            print(f'{name}: {stored} -> {actual}')
+        print(f'{len(drifted)} counters corrected')
+
+    @app.cli.command('export')
+    @click.argument('dataset', type=click.Choice(list(DATASETS)))
+    @click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), default='csv', show_default=True)
+    @click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+    @click.option('--since', help='First day to include (YYYY-MM-DD).')
+    @click.option('--until', help='Last day to include (YYYY-MM-DD).')
+    @click.option('--status')
+    @click.option('--department')
+    @click.option('--output', type=click.File('wb'), default='-', help='Destination file (default stdout).')
+    def export_command(dataset, fmt, compress, since, until, status, department, output):
+        """Stream bookings, resources or reviews to CSV/JSONL without loading the table."""
+        try:
+            chunks = stream_export(dataset, fmt, compress, since=since, until=until, status=status,
+                                   department=department)
+        except ExportError as exc:
+            raise click.ClickException(str(exc))
+        for chunk in chunks:
+            output.write(chunk)
+
+    @app.cli.command('provision-users')
+    @click.argument('roster', type=click.File('r', encoding='utf-8-sig'))
+    @click.option('--credentials-out', type=click.File('w'), help='Write generated passwords here as CSV.')
+    @click.option('--chunk-size', type=int, default=None, help='Rows per batch (default PROVISION_CHUNK_SIZE).')
+    def provision_users_command(roster, credentials_out, chunk_size):
+        """Create or update accounts from a CSV roster (name,email[,role,department,password])."""
+        chunk_size = chunk_size or app.config['PROVISION_CHUNK_SIZE']
+        try:
+            if not credentials_out:
+                # Generated passwords exist only in memory; check before anything is written.
+                if not roster.seekable():
+                    raise click.ClickException('Pass --credentials-out when the roster is read from stdin.')
+                missing = missing_passwords(roster, chunk_size)
+                if missing:
+                    raise click.ClickException(
+                        f'{missing} new account(s) have no password in the roster; '
+                        'pass --credentials-out to keep the generated ones.'
+                    )
+                roster.seek(0)
+            report = provision_users(
+                roster,
+                app.config['PASSWORD_HASH_METHOD'],
+                chunk_size=chunk_size,
+                processes=app.config['PROVISION_PROCESSES'],
+                progress=lambda report: print(f'{report.processed} rows written ({len(report.errors)} rejected)'),
+            )
+        except RosterError as exc:
+            raise click.ClickException(str(exc))
+        for line, message in report.errors:
+            print(f'line {line}: {message}')
+        if report.credentials:
+            write_credentials(credentials_out, report.credentials)
+        print(f'Created {report.created}, updated {report.updated}, rejected {len(report.errors)}')
+
+    @app.cli.command('drain-outbox')
+    def drain_outbox_command():
+        """Deliver every queued notification email now."""
+        if not app.config.get('MAIL_SERVER'):
+            print('MAIL_SERVER is not configured; nothing to deliver.')
+            return
+        delivered = drain(SMTPMailer.from_config(app.config), OutboxSettings.from_config(app.config))
+        print(f'Processed {delivered} outbox rows')
+
     @app.teardown_appcontext
     def close_connection(exception=None):
         conn = get_connection(close_only=True)
@@ -15,8 +15,53 @@ class Config:
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
     ALLOWED_EMAIL_DOMAINS = None  # set to list like {'iu.edu'} if needed
+    SSE_HEARTBEAT_SECONDS = 15
+    SSE_POLL_SECONDS = 10  # change-table poll for messages posted by other workers; 0 disables
+    SSE_MAX_STREAM_SECONDS = 300
+    SSE_QUEUE_SIZE = 100
+    MESSAGE_EVENT_RETENTION_HOURS = 24
+    MAIL_SERVER = os.environ.get('MAIL_SERVER')  # outbox emails are only queued when set
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 25))
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', '').lower() in {'1', 'true', 'yes'}
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'no-reply@campus.test')
+    OUTBOX_WORKERS = 2
+    OUTBOX_BATCH_SIZE = 50
+    OUTBOX_MAX_ATTEMPTS = 5
+    OUTBOX_RETRY_BASE_SECONDS = 30
+    OUTBOX_POLL_SECONDS = 5
+    NOTIFICATION_COALESCE_WINDOW_MINUTES = 15
+    NOTIFICATION_EMAIL_HOURLY_LIMIT = 20  # per recipient; 0 disables the cap
+    FEED_CACHE_SECONDS = 30
+    NOTIFICATION_RETENTION_DAYS = 180
+    NOTIFICATION_ARCHIVE = True  # copy to notifications_archive before deleting
+    RETENTION_BATCH_SIZE = 500
+    RETENTION_INTERVAL_HOURS = 6  # background compaction cadence; 0 disables the scheduler
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # changes rehash on next login
+    PASSWORD_HASH_WORKERS = 2  # hashing processes; 0 hashes on the request thread
+    PASSWORD_HASH_MAX_PENDING = 32  # in-flight hashes per worker process before sign-ins are refused
+    # Reverse proxies in front of the app that set X-Forwarded-For. Behind a proxy, leaving this at 0
+    # puts every client in the proxy's single login IP bucket.
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
+    LOGIN_IP_BURST = 20
+    LOGIN_IP_PER_MINUTE = 10
+    LOGIN_ACCOUNT_BURST = 5
+    LOGIN_ACCOUNT_PER_MINUTE = 2
+    PROVISION_CHUNK_SIZE = 500  # roster rows per executemany upsert
+    PROVISION_PROCESSES = None  # hashing processes for bulk provisioning; None uses every core, 0 hashes inline
+    WEB_ROSTER_MAX_ROWS = 100  # admin uploads hash inline in the request; larger rosters use `flask provision-users`
+    USER_CACHE_SECONDS = 60  # backstop only; cached users are also checked against the accounts version
+    SEARCH_CACHE_BYTES = 4 * 1024 * 1024  # per-worker budget for cached search id lists; 0 disables
+    NEAR_DUPLICATE_THRESHOLD = 0.7  # estimated Jaccard similarity at which new text is flagged
+    NEAR_DUPLICATE_MAX_ENTRIES = 20_000  # newest signatures each worker compares against (~6 KB apiece)
 
 class TestConfig(Config):
     TESTING = True
     DATABASE_PATH = os.environ.get('TEST_DATABASE_PATH', str(INSTANCE_DIR / 'test.db'))
     WTF_CSRF_ENABLED = False
+    MAIL_SERVER = None
+    OUTBOX_WORKERS = 0
+    RETENTION_INTERVAL_HOURS = 0
+    PASSWORD_HASH_WORKERS = 0
+    PROVISION_PROCESSES = 0
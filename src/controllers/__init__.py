@@ -7,6 +7,7 @@ from .booking_controller import booking_bp
 from .message_controller import message_bp
 from .review_controller import review_bp
 from .admin_controller import admin_bp
+from .api_controller import api_bp
 
 __all__ = [
     'site_bp',
@@ -17,4 +18,5 @@ __all__ = [
     'message_bp',
     'review_bp',
     'admin_bp',
+    'api_bp',
 ]
@@ -1,14 +1,40 @@
 """Admin dashboard routes."""
+import io
+import itertools
 from functools import wraps
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
 from flask_login import current_user, login_required
 
 from src.data_access.booking_dal import BookingDAL
+from src.data_access.message_dal import MessageDAL
+from src.data_access.moderation_dal import FLAG_STATUSES, TERM_ACTIONS, ModerationDAL
 from src.data_access.resource_dal import ResourceDAL
 from src.data_access.review_dal import ReviewDAL
-from src.data_access.user_dal import UserDAL
+from src.data_access.stats_dal import StatsDAL
+from src.data_access.user_dal import ROLES, UserDAL
+from src.utils.exports import FORMATS, ExportError, export_filename, stream_export
+from src.utils.fuzzy_search import FuzzyResourceIndex
+from src.utils.password_hasher import get_hasher
+from src.utils.provisioning import RosterError, provision_users, write_credentials
+from src.utils.search_cache import SearchCache
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+SEARCH_PAGE_SIZE = 20
+DIRECTORY_PAGE_SIZE = 50
+DASHBOARD_USERS = 10
+DASHBOARD_RESOURCES = 20
 
 
 def admin_required(func):
@@ -24,16 +50,191 @@ def admin_required(func):
 @admin_bp.route('/')
 @admin_required
 def dashboard():
-    users = UserDAL.list_users()
-    resources = ResourceDAL.search_resources(status=None)
+    users, _ = UserDAL.directory(limit=DASHBOARD_USERS)
+    resources = ResourceDAL.search_resources(status=None, limit=DASHBOARD_RESOURCES)
     bookings = BookingDAL.list_recent()
     reviews = ReviewDAL.list_recent()
+    resource_counts = StatsDAL.counters('resources')
+    user_counts = StatsDAL.counters('users')
     stats = {
-        'total_users': len(users),
-        'total_resources': len(resources),
-        'pending_requests': len([b for b in bookings if b.status == 'pending']),
+        'total_users': user_counts.get('', 0),
+        'users_by_role': {role: user_counts.get(f'role:{role}', 0) for role in ROLES},
+        'total_resources': resource_counts.get('', 0),
+        'published_resources': resource_counts.get('status:published', 0),
+        'draft_resources': resource_counts.get('status:draft', 0),
+        'pending_requests': StatsDAL.get('bookings:status:pending'),
     }
-    return render_template('admin/dashboard.html', users=users, resources=resources, bookings=bookings, reviews=reviews, stats=stats)
+    return render_template('admin/dashboard.html', users=users, resources=resources, bookings=bookings, reviews=reviews,
+                           stats=stats, roles=ROLES)
+
+
+def _directory_args():
+    role = request.args.get('role') or None
+    return {
+        'search': request.args.get('q', '').strip()[:120] or None,
+        'role': role if role in ROLES else None,
+        'department': request.args.get('department', '').strip()[:120] or None,
+        'after_id': request.args.get('after', type=int),
+    }
+
+
+@admin_bp.route('/users')
+@admin_required
+def users():
+    filters = _directory_args()
+    page, next_cursor = UserDAL.directory(**filters, limit=DIRECTORY_PAGE_SIZE)
+    return render_template('admin/users.html', users=page, next_cursor=next_cursor, filters=filters,
+                           counts=StatsDAL.counters('users'), roles=ROLES)
+
+
+@admin_bp.route('/api/users')
+@admin_required
+def users_api():
+    """JSON form of the directory: same filters, ``after`` cursor and role totals."""
+    page, next_cursor = UserDAL.directory(**_directory_args(), limit=DIRECTORY_PAGE_SIZE)
+    return jsonify({
+        'users': [
+            {'user_id': user.user_id, 'name': user.name, 'email': user.email, 'role': user.role,
+             'department': user.department, 'is_suspended': user.is_suspended}
+            for user in page
+        ],
+        'next_cursor': next_cursor,
+        'counts': StatsDAL.counters('users'),
+    })
+
+
+def _back():
+    """Return to the admin page that posted the form (the directory keeps its filters), else the dashboard."""
+    target = request.form.get('next', '')
+    if target.startswith('/admin/') and not target.startswith('/admin/api/'):
+        return redirect(target)
+    return redirect(url_for('admin.dashboard'))
+
+
+def _guard_self(user_id: int) -> bool:
+    if user_id == current_user.user_id:
+        flash('You cannot change your own account from here.', 'warning')
+        return False
+    return True
+
+
+@admin_bp.route('/users/<int:user_id>/role', methods=['POST'])
+@admin_required
+def update_user_role(user_id: int):
+    role = request.form.get('role')
+    if role not in ROLES:
+        flash('Invalid role.', 'danger')
+    elif _guard_self(user_id):
+        UserDAL.update_role(user_id, role)
+        flash('Role updated.', 'success')
+    return _back()
+
+
+@admin_bp.route('/users/<int:user_id>/suspension', methods=['POST'])
+@admin_required
+def set_user_suspension(user_id: int):
+    if _guard_self(user_id):
+        suspended = request.form.get('suspended') == '1'
+        UserDAL.set_suspension(user_id, suspended)
+        flash('User suspended.' if suspended else 'User reinstated.', 'success')
+    return _back()
+
+
+@admin_bp.route('/users/<int:user_id>/delete', methods=['POST'])
+@admin_required
+def delete_user(user_id: int):
+    if _guard_self(user_id):
+        UserDAL.delete_user(user_id)
+        flash('Account closed: anonymised and suspended, resources archived.', 'success')
+    return _back()
+
+
+@admin_bp.route('/users/import', methods=['POST'])
+@admin_required
+def import_users():
+    """Provision accounts from an uploaded roster; generated passwords come back as a CSV download.
+
+    Hashing runs on the request thread, never in a process pool inside the web worker, so uploads
+    are capped at ``WEB_ROSTER_MAX_ROWS`` and bigger rosters are pointed at the CLI command.
+    """
+    upload = request.files.get('roster')
+    if not upload or not upload.filename:
+        flash('Choose a CSV roster to import.', 'warning')
+        return redirect(url_for('admin.dashboard'))
+    max_rows = current_app.config['WEB_ROSTER_MAX_ROWS']
+    try:
+        lines = list(itertools.islice(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''), max_rows + 2))
+        if len(lines) > max_rows + 1:  # the header plus max_rows rows
+            flash(f'Rosters over {max_rows} rows take too long to import here; '
+                  'run `flask provision-users <roster.csv>` on the server instead.', 'danger')
+            return redirect(url_for('admin.dashboard'))
+        report = provision_users(
+            lines,
+            current_app.config['PASSWORD_HASH_METHOD'],
+            chunk_size=current_app.config['PROVISION_CHUNK_SIZE'],
+            processes=0,
+        )
+    except (RosterError, UnicodeDecodeError) as exc:
+        flash(f'Roster not imported: {exc}', 'danger')
+        return redirect(url_for('admin.dashboard'))
+    summary = f'Imported roster: {report.created} created, {report.updated} updated, {len(report.errors)} rejected.'
+    if report.errors:
+        summary += ' ' + '; '.join(f'line {line}: {message}' for line, message in report.errors[:5])
+    flash(summary, 'warning' if report.errors else 'success')
+    if not report.credentials:
+        return redirect(url_for('admin.dashboard'))
+    out = io.StringIO()
+    write_credentials(out, report.credentials)
+    return Response(out.getvalue(), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=generated-credentials.csv'})
+
+
+@admin_bp.route('/export')
+@admin_bp.route('/export/<dataset>')
+@login_required
+def export(dataset: str | None = None):
+    """Stream a report as CSV or JSONL (``?gzip=1`` to compress); staff get their own department only."""
+    if current_user.role == 'admin':
+        department = request.args.get('department', '').strip() or None
+    elif current_user.role == 'staff' and current_user.department:
+        department = current_user.department
+    else:
+        abort(403)
+    dataset = dataset or request.args.get('dataset', '')
+    fmt = request.args.get('format', 'csv')
+    compress = request.args.get('gzip') == '1'
+    try:
+        chunks = stream_export(
+            dataset, fmt, compress,
+            since=request.args.get('since') or None,
+            until=request.args.get('until') or None,
+            status=request.args.get('status') or None,
+            department=department,
+        )
+    except ExportError as exc:
+        abort(400, description=str(exc))
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress else FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename={export_filename(dataset, fmt, compress)}',
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
+
+@admin_bp.route('/metrics/auth')
+@admin_required
+def auth_metrics():
+    """Hash latency, queue wait and refusal counters for this worker process."""
+    return jsonify(get_hasher().metrics.snapshot())
+
+
+@admin_bp.route('/metrics/search')
+@admin_required
+def search_metrics():
+    """Search result cache hit rate, size and evictions, plus fuzzy index size, for this worker process."""
+    return jsonify({**SearchCache.snapshot(), 'fuzzy': FuzzyResourceIndex.snapshot()})
 
 
 @admin_bp.route('/bookings/<int:booking_id>/status', methods=['POST'])
@@ -46,3 +247,83 @@ def override_booking(booking_id: int):
     BookingDAL.update_status(booking_id, new_status, owner_notes='Updated by admin')
     flash('Booking updated.', 'success')
     return redirect(url_for('admin.dashboard'))
+
+
+@admin_bp.route('/reviews/<int:review_id>/visibility', methods=['POST'])
+@admin_required
+def review_visibility(review_id: int):
+    hidden = request.form.get('hidden') == '1'
+    ReviewDAL.set_hidden(review_id, hidden)
+    flash('Review hidden.' if hidden else 'Review restored.', 'success')
+    return redirect(url_for('admin.dashboard'))
+
+
+@admin_bp.route('/flags/<int:flag_id>', methods=['POST'])
+@admin_required
+def resolve_flag(flag_id: int):
+    flag = ModerationDAL.get_flag(flag_id)
+    if flag is None:
+        abort(404)
+    status = request.form.get('status')
+    if status not in FLAG_STATUSES:
+        flash('Invalid status.', 'danger')
+    else:
+        if status == 'actioned':
+            # What to hide comes from the flag itself, never from the submitted form.
+            if flag.kind == 'review':
+                ReviewDAL.set_hidden(flag.ref_id)
+            elif flag.kind == 'message':
+                MessageDAL.set_hidden(flag.ref_id)
+        ModerationDAL.resolve_flag(flag_id, status)
+        flash('Flag updated.', 'success')
+    return redirect(url_for('admin.moderation', scope='flags'))
+
+
+@admin_bp.route('/moderation/terms', methods=['GET', 'POST'])
+@admin_required
+def moderation_terms():
+    if request.method == 'POST':
+        term = request.form.get('term', '').strip()
+        action = request.form.get('action', 'flag')
+        if not term or action not in TERM_ACTIONS:
+            flash('Enter a term and choose flag or hide.', 'danger')
+        else:
+            ModerationDAL.save_term(term, action)
+            flash('Term saved.', 'success')
+        return redirect(url_for('admin.moderation_terms'))
+    return render_template('admin/moderation_terms.html', terms=ModerationDAL.list_terms(), actions=TERM_ACTIONS)
+
+
+@admin_bp.route('/moderation/terms/<int:term_id>/delete', methods=['POST'])
+@admin_required
+def delete_moderation_term(term_id: int):
+    ModerationDAL.delete_term(term_id)
+    flash('Term removed.', 'success')
+    return redirect(url_for('admin.moderation_terms'))
+
+
+@admin_bp.route('/moderation')
+@admin_required
+def moderation():
+    query = request.args.get('q', '').strip()
+    scope = request.args.get('scope', 'messages')
+    if scope not in {'messages', 'reviews', 'flags'}:
+        scope = 'messages'
+    page = max(request.args.get('page', 1, type=int), 1)
+    offset = (page - 1) * SEARCH_PAGE_SIZE
+    hits = []
+    if scope == 'flags':
+        hits = ModerationDAL.list_flags(limit=SEARCH_PAGE_SIZE + 1, offset=offset)
+    elif query:
+        if scope == 'messages':
+            hits = MessageDAL.search_messages(query, user_id=None, limit=SEARCH_PAGE_SIZE + 1, offset=offset)
+        else:
+            hits = ReviewDAL.search_reviews(query, limit=SEARCH_PAGE_SIZE + 1, offset=offset)
+    return render_template(
+        'admin/moderation.html',
+        query=query,
+        scope=scope,
+        hits=hits[:SEARCH_PAGE_SIZE],
+        page=page,
+        has_next=len(hits) > SEARCH_PAGE_SIZE,
+    )
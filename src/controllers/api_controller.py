@@ -0,0 +1,193 @@
+"""Read-only JSON API (``/api/v1``) for kiosks and mobile shortcuts.
+
+Every list takes ``fields=`` (sparse fieldsets), ``ids=`` (batch get, returned in request order)
+or ``after=``/``limit=`` (keyset paging, newest first). Pages up to ``BUFFERED_PAGE_SIZE`` rows
+carry an ETag and answer ``If-None-Match`` with 304; larger ones are streamed as they are encoded.
+Visibility follows the HTML routes: published resources for everyone, drafts for their owner,
+bookings and notifications for the signed-in user only.
+"""
+import json
+from datetime import date, datetime, timedelta
+from functools import wraps
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from flask import Blueprint, Response, abort, jsonify, request, stream_with_context
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+
+from src.data_access.booking_dal import BOOKING_ROW_COLUMNS, BookingDAL
+from src.data_access.notification_dal import NotificationDAL
+from src.data_access.resource_dal import CARD_COLUMNS, RESOURCE_COLUMNS, ResourceDAL
+from src.data_access.review_dal import ReviewDAL
+from src.utils.json_pages import ApiError, encode_page, in_order, parse_fields, parse_ids, parse_limit, project
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+BUFFERED_PAGE_SIZE = 200  # larger pages stream without an ETag
+MAX_BATCH_IDS = 100
+AVAILABILITY_DAYS = 14
+MAX_AVAILABILITY_DAYS = 62
+
+RESOURCE_CARD_FIELDS = (*CARD_COLUMNS, 'rating_average')  # summary/notes are clipped in lists
+RESOURCE_FIELDS = (*RESOURCE_COLUMNS, 'gallery', 'rating_average')
+BOOKING_FIELDS = BOOKING_ROW_COLUMNS
+REVIEW_FIELDS = ('review_id', 'resource_id', 'reviewer_id', 'rating', 'comment', 'created_at')
+NOTIFICATION_FIELDS = ('notification_id', 'message', 'kind', 'resource_id', 'item_count', 'created_at',
+                       'updated_at', 'is_read')
+
+# fetch(ids, after_id, limit) -> rows; ``ids`` and ``after_id`` are never both set.
+Fetch = Callable[[Optional[List[int]], Optional[int], int], Iterable]
+
+
+def api_login_required(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            abort(401, description='Sign in required.')
+        return func(*args, **kwargs)
+    return wrapper
+
+
+@api_bp.errorhandler(ApiError)
+def bad_request(exc: ApiError):
+    return jsonify({'error': str(exc)}), 400
+
+
+@api_bp.errorhandler(HTTPException)
+def http_error(exc: HTTPException):
+    return jsonify({'error': exc.description}), exc.code
+
+
+def _respond(chunks: Iterator[str], stream: bool = False) -> Response:
+    headers = {'Cache-Control': 'private, no-cache', 'Vary': 'Cookie'}
+    if stream:
+        headers['X-Accel-Buffering'] = 'no'
+        return Response(stream_with_context(chunks), mimetype='application/json', headers=headers)
+    response = Response(''.join(chunks), mimetype='application/json', headers=headers)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def _list(fetch: Fetch, allowed, key: str) -> Response:
+    fields = parse_fields(request.args.get('fields'), allowed, key)
+    ids = parse_ids(request.args.get('ids'), MAX_BATCH_IDS)
+    if ids is not None:
+        return _respond(encode_page(in_order(fetch(ids, None, len(ids)), ids, key), fields, key))
+    limit = parse_limit(request.args.get('limit'), PAGE_SIZE, MAX_PAGE_SIZE)
+    rows = fetch(None, request.args.get('after', type=int), limit + 1)
+    return _respond(encode_page(rows, fields, key, limit), stream=limit > BUFFERED_PAGE_SIZE)
+
+
+def _one(item, allowed, key: str) -> Response:
+    fields = parse_fields(request.args.get('fields'), allowed, key)
+    return _respond(iter([json.dumps({'data': project(item, fields)}, ensure_ascii=False, separators=(',', ':'))]))
+
+
+def _viewer_id() -> Optional[int]:
+    return current_user.user_id if current_user.is_authenticated else None
+
+
+def _visible(resource) -> bool:
+    """Same rule as the resource detail page."""
+    return resource.status == 'published' or resource.owner_id == _viewer_id()
+
+
+def _visible_resource(resource_id: int):
+    resource = ResourceDAL.get_resource_by_id(resource_id)
+    if not resource or not _visible(resource):
+        abort(404, description='Resource not found.')
+    return resource
+
+
+@api_bp.route('/resources')
+def resources():
+    """Published resource cards by newest id, with the browse filters (``q``, ``category``, ...)."""
+    filters = {
+        'keyword': request.args.get('q', '').strip()[:120] or None,
+        'category': request.args.get('category') or None,
+        'location': request.args.get('location', '').strip()[:120] or None,
+        'min_capacity': request.args.get('min_capacity', type=int),
+    }
+
+    def fetch(ids, after_id, limit):
+        if ids is not None:
+            return [card for card in ResourceDAL.iter_resources(status=None, ids=ids) if _visible(card)]
+        if limit > BUFFERED_PAGE_SIZE + 1:
+            return ResourceDAL.iter_resources(**filters, sort='id', limit=limit, after_id=after_id)
+        return ResourceDAL.search_resources(**filters, sort='id', limit=limit, after_id=after_id)  # cached
+
+    return _list(fetch, RESOURCE_CARD_FIELDS, 'resource_id')
+
+
+@api_bp.route('/resources/<int:resource_id>')
+def resource(resource_id: int):
+    return _one(_visible_resource(resource_id), RESOURCE_FIELDS, 'resource_id')
+
+
+@api_bp.route('/resources/<int:resource_id>/availability')
+def availability(resource_id: int):
+    """Pending and approved bookings from ``start`` (default today) for ``days`` days."""
+    _visible_resource(resource_id)
+    start = date.today()
+    try:
+        if request.args.get('start'):
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+    except ValueError:
+        raise ApiError('start must be a date (YYYY-MM-DD).') from None
+    days = parse_limit(request.args.get('days'), AVAILABILITY_DAYS, MAX_AVAILABILITY_DAYS)
+    end = start + timedelta(days=days)
+    busy = BookingDAL.busy_intervals(resource_id, start.isoformat(), end.isoformat())
+    body = {
+        'resource_id': resource_id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'busy': [{'start': s, 'end': e, 'status': status} for s, e, status in busy],
+    }
+    return _respond(iter([json.dumps({'data': body}, separators=(',', ':'))]))
+
+
+@api_bp.route('/resources/<int:resource_id>/reviews')
+def resource_reviews(resource_id: int):
+    _visible_resource(resource_id)
+
+    def fetch(ids, after_id, limit):
+        if ids is not None:
+            found = ReviewDAL.get_visible_reviews(ids, _viewer_id())
+            return [review for review in found if review.resource_id == resource_id]
+        return ReviewDAL.list_for_resource(resource_id, limit=limit, before_id=after_id)
+
+    return _list(fetch, REVIEW_FIELDS, 'review_id')
+
+
+@api_bp.route('/reviews')
+def reviews():
+    """Batch get only (``ids=``); a resource's reviews are paged under ``/resources/<id>/reviews``."""
+    if 'ids' not in request.args:
+        raise ApiError('ids is required; page through /resources/<id>/reviews instead.')
+    return _list(lambda ids, *_: ReviewDAL.get_visible_reviews(ids, _viewer_id()), REVIEW_FIELDS, 'review_id')
+
+
+@api_bp.route('/bookings')
+@api_login_required
+def bookings():
+    """The signed-in user's own bookings, newest first, optionally one ``status``."""
+    status = request.args.get('status') or None
+    if status and status not in BookingDAL.STATUSES:
+        raise ApiError(f"Unknown status '{status}'; choose from {', '.join(BookingDAL.STATUSES)}.")
+
+    def fetch(ids, after_id, limit):
+        return BookingDAL.iter_for_requester(current_user.user_id, status=status, after_id=after_id, ids=ids,
+                                             limit=limit)
+
+    return _list(fetch, BOOKING_FIELDS, 'booking_id')
+
+
+@api_bp.route('/notifications')
+@api_login_required
+def notifications():
+    def fetch(ids, after_id, limit):
+        rows = NotificationDAL.list_for_user(current_user.user_id, limit=limit, before_id=after_id, ids=ids)
+        return [dict(row, is_read=bool(row['is_read'])) for row in rows]
+
+    return _list(fetch, NOTIFICATION_FIELDS, 'notification_id')
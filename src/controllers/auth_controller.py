@@ -3,10 +3,22 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_user, logout_user, login_required, current_user
 
 from src.data_access.user_dal import UserDAL
+from src.utils.password_hasher import HasherBusy, get_hasher
 from src.utils.validators import Validator
 
 auth_bp = Blueprint('auth', __name__)
 AVAILABLE_SIGNUP_ROLES = {'student', 'staff'}
+BUSY_MESSAGE = 'Sign-in is busy right now. Please try again in a few seconds.'
+
+
+def _login_throttled(email: str) -> int:
+    """Seconds the caller must wait, or 0; checked before any password hashing happens."""
+    limits = current_app.extensions['login_limits']
+    for name, key in (('ip', request.remote_addr or 'unknown'), ('account', email)):
+        if not limits[name].allow(key):
+            get_hasher().metrics.count('rate_limited')
+            return max(limits[name].retry_after(key), 1)
+    return 0
 
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
@@ -62,13 +74,17 @@ def register():
             flash('Please select a valid role.', 'danger')
             return render_template('auth/register.html', form=request.form)
 
-        user = UserDAL.create_user(
-            name=name,
-            email=email,
-            password=password,
-            role=role,
-            department=department or None,
-        )
+        try:
+            user = UserDAL.create_user(
+                name=name,
+                email=email,
+                password=password,
+                role=role,
+                department=department or None,
+            )
+        except HasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth/register.html', form=request.form), 503
         login_user(user)
         flash('Welcome aboard! Start by creating your first resource listing.', 'success')
         return redirect(url_for('dashboard.overview'))
@@ -90,12 +106,23 @@ def login():
             flash('Email and password are required.', 'danger')
             return render_template('auth/login.html', form=request.form)
 
-        user = UserDAL.verify_password(email, password)
+        wait = _login_throttled(email)
+        if wait:
+            flash(f'Too many sign-in attempts. Try again in {wait} seconds.', 'danger')
+            return render_template('auth/login.html', form=request.form), 429, {'Retry-After': str(wait)}
+
+        try:
+            user = UserDAL.verify_password(email, password)
+        except HasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth/login.html', form=request.form), 503
         if not user:
             flash('Invalid credentials. Please try again.', 'danger')
             return render_template('auth/login.html', form=request.form)
 
-        login_user(user, remember=remember)
+        if not login_user(user, remember=remember):
+            flash('This account is suspended. Contact an administrator.', 'danger')
+            return render_template('auth/login.html', form=request.form)
         flash('Signed in successfully.', 'success')
         return redirect(url_for('dashboard.overview'))
 
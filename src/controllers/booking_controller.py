@@ -7,6 +7,7 @@ from flask import Blueprint, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 
 from src.data_access.booking_dal import BookingDAL
+from src.data_access.db import transaction
 from src.data_access.notification_dal import NotificationDAL
 from src.data_access.resource_dal import ResourceDAL
 from src.data_access.user_dal import UserDAL
@@ -42,7 +43,7 @@ def request_booking(resource_id: int):
     if not resource or resource.status != 'published':
         flash('Resource is not available for booking.', 'warning')
         return redirect(url_for('resource.browse'))
-    owner_user = UserDAL.get_user_by_id(resource.owner_id)
+    owner_user = UserDAL.get_cached_user(resource.owner_id)
 
     if request.method == 'POST':
         start_raw = request.form.get('start_datetime')
@@ -66,21 +67,27 @@ def request_booking(resource_id: int):
         if resource.owner_id == current_user.user_id and _user_can_approve(current_user):
             status = 'approved'
 
-        booking = BookingDAL.create_booking(
-            resource_id=resource.resource_id,
-            requester_id=current_user.user_id,
-            start=start_dt.isoformat(),
-            end=end_dt.isoformat(),
-            notes=notes,
-            status=status
-        )
-
-        if resource.owner_id != current_user.user_id and owner_user:
-            NotificationDAL.create_notification(
-                resource.owner_id,
-                f'New booking request for {resource.title} from {current_user.name}.'
+        with transaction():
+            booking = BookingDAL.create_booking(
+                resource_id=resource.resource_id,
+                requester_id=current_user.user_id,
+                start=start_dt.isoformat(),
+                end=end_dt.isoformat(),
+                notes=notes,
+                status=status
             )
 
+            if resource.owner_id != current_user.user_id and owner_user:
+                NotificationDAL.create_notification(
+                    resource.owner_id,
+                    f'New booking request for {resource.title} from {current_user.name}.',
+                    email_subject=f'New booking request: {resource.title}',
+                    kind='booking_request',
+                    resource_id=resource.resource_id,
+                    item_id=booking.booking_id,
+                    digest=f'{{count}} new booking requests for {resource.title}.',
+                )
+
         flash('Booking submitted.', 'success')
         return redirect(url_for('booking.my_bookings'))
 
@@ -91,8 +98,7 @@ def request_booking(resource_id: int):
 @login_required
 def my_bookings():
     bookings = BookingDAL.get_bookings_by_requester(current_user.user_id)
-    resources = {b.resource_id: ResourceDAL.get_resource_by_id(b.resource_id) for b in bookings}
-    return render_template('bookings/list.html', bookings=bookings, resources=resources)
+    return render_template('bookings/list.html', bookings=bookings)
 
 
 @booking_bp.route('/inbox')
@@ -101,8 +107,7 @@ def owner_inbox():
     if not _require_approver_role():
         return redirect(url_for('booking.my_bookings'))
     pending = BookingDAL.get_actionable_for_owner(current_user.user_id)
-    resources = {b.resource_id: ResourceDAL.get_resource_by_id(b.resource_id) for b in pending}
-    return render_template('bookings/owner_queue.html', bookings=pending, resources=resources)
+    return render_template('bookings/owner_queue.html', bookings=pending)
 
 
 @booking_bp.route('/<int:booking_id>/decision', methods=['POST'])
@@ -128,10 +133,12 @@ def decide_booking(booking_id: int):
         return redirect(url_for('booking.owner_inbox'))
 
     new_status = 'approved' if action == 'approve' else 'rejected'
-    BookingDAL.update_status(booking_id, new_status, owner_notes=note)
-    NotificationDAL.create_notification(
-        booking.requester_id,
-        f'Your booking for {resource.title} was {new_status}.'
-    )
+    with transaction():
+        BookingDAL.update_status(booking_id, new_status, owner_notes=note)
+        NotificationDAL.create_notification(
+            booking.requester_id,
+            f'Your booking for {resource.title} was {new_status}.',
+            email_subject=f'Booking {new_status}: {resource.title}',
+        )
     flash(f'Booking {new_status}.', 'success')
     return redirect(url_for('booking.owner_inbox'))
@@ -1,7 +1,7 @@
 """Dashboard routes for authenticated users."""
 from datetime import datetime
 
-from flask import Blueprint, render_template
+from flask import Blueprint, flash, redirect, render_template, url_for
 from flask_login import login_required, current_user
 
 from src.data_access.booking_dal import BookingDAL
@@ -29,3 +29,21 @@ def overview():
         pending_actions=pending_actions,
         notifications=notifications,
     )
+
+
+@dashboard_bp.route('/notifications/read', methods=['POST'])
+@login_required
+def mark_notifications_read():
+    NotificationDAL.mark_all_read(current_user.user_id)
+    return redirect(url_for('dashboard.overview'))
+
+
+@dashboard_bp.route('/notifications/<int:notification_id>')
+@login_required
+def notification_detail(notification_id: int):
+    note = NotificationDAL.get_notification(notification_id, current_user.user_id)
+    if not note:
+        flash('Notification not found.', 'warning')
+        return redirect(url_for('dashboard.overview'))
+    items = NotificationDAL.expand(notification_id, current_user.user_id)
+    return render_template('dashboard/notification.html', note=note, items=items)
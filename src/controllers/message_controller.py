@@ -1,34 +1,62 @@
 """Messaging routes."""
 from __future__ import annotations
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
 from flask_login import current_user, login_required
 
 from src.data_access.message_dal import MessageDAL
 from src.data_access.resource_dal import ResourceDAL
 from src.data_access.user_dal import UserDAL
+from src.utils.message_broker import event_stream
 from src.utils.validators import Validator
 
 message_bp = Blueprint('message', __name__, url_prefix='/messages')
+THREAD_PAGE_SIZE = 50
+SEARCH_PAGE_SIZE = 20
+EVENT_PAGE_SIZE = 100  # change-table rows per SSE catch-up read
 
 
 def _resolve_other_user(thread):
     if current_user.user_id not in {thread.owner_id, thread.participant_id}:
         return None
     other_id = thread.participant_id if thread.owner_id == current_user.user_id else thread.owner_id
-    return UserDAL.get_user_by_id(other_id)
+    return UserDAL.get_cached_user(other_id)
 
 
 @message_bp.route('/')
 @login_required
 def inbox():
-    threads = MessageDAL.list_threads_for_user(current_user.user_id)
-    thread_cards = []
-    for thread in threads:
-        resource = ResourceDAL.get_resource_by_id(thread.resource_id) if thread.resource_id else None
-        other_user = _resolve_other_user(thread)
-        thread_cards.append({'thread': thread, 'resource': resource, 'other_user': other_user})
-    return render_template('messages/inbox.html', thread_cards=thread_cards)
+    query = request.args.get('q', '').strip()
+    if query:
+        page = max(request.args.get('page', 1, type=int), 1)
+        hits = MessageDAL.search_messages(
+            query,
+            user_id=current_user.user_id,
+            limit=SEARCH_PAGE_SIZE + 1,
+            offset=(page - 1) * SEARCH_PAGE_SIZE,
+        )
+        return render_template(
+            'messages/inbox.html',
+            entries=[],
+            query=query,
+            hits=hits[:SEARCH_PAGE_SIZE],
+            page=page,
+            has_next=len(hits) > SEARCH_PAGE_SIZE,
+        )
+    entries = MessageDAL.list_inbox(current_user.user_id)
+    return render_template('messages/inbox.html', entries=entries, query='')
 
 
 @message_bp.route('/start/<int:owner_id>', methods=['GET', 'POST'])
@@ -39,7 +67,7 @@ def start(owner_id: int):
         return redirect(url_for('message.inbox'))
     resource_id = request.args.get('resource_id', type=int)
     resource = ResourceDAL.get_resource_by_id(resource_id) if resource_id else None
-    owner = UserDAL.get_user_by_id(owner_id)
+    owner = UserDAL.get_cached_user(owner_id)
     if not owner:
         flash('Recipient not found.', 'danger')
         return redirect(url_for('message.inbox'))
@@ -83,5 +111,89 @@ def thread(thread_id: int):
             flash('Sent.', 'success')
         return redirect(url_for('message.thread', thread_id=thread.thread_id))
 
-    messages = MessageDAL.get_messages_for_thread(thread.thread_id, limit=200)
-    return render_template('messages/thread.html', thread=thread, messages=messages, other_user=other_user, resource=resource)
+    before_id = request.args.get('before', type=int)
+    if before_id is None:
+        MessageDAL.mark_thread_read(thread.thread_id, current_user.user_id)
+    messages, earlier_cursor = MessageDAL.get_thread_page(thread.thread_id, limit=THREAD_PAGE_SIZE, before_id=before_id)
+    return render_template(
+        'messages/thread.html',
+        thread=thread,
+        messages=messages,
+        earlier_cursor=earlier_cursor,
+        other_user=other_user,
+        resource=resource,
+        last_event_id=MessageDAL.latest_event_id(MessageDAL.thread_channel(thread.thread_id)),
+    )
+
+
+@message_bp.route('/thread/<int:thread_id>/updates')
+@login_required
+def thread_updates(thread_id: int):
+    """Return messages posted after the ``since`` cursor so open threads can refresh incrementally."""
+    thread = MessageDAL.get_thread_by_id(thread_id)
+    if not thread or current_user.user_id not in {thread.owner_id, thread.participant_id}:
+        abort(404)
+    since_id = request.args.get('since', 0, type=int)
+    messages = MessageDAL.get_messages_since(thread.thread_id, since_id, limit=THREAD_PAGE_SIZE)
+    return jsonify({
+        'messages': [
+            {
+                'message_id': msg.message_id,
+                'sender_id': msg.sender_id,
+                'body': msg.display_body,
+                'created_at': msg.created_at,
+            }
+            for msg in messages
+        ],
+        'since': messages[-1].message_id if messages else since_id,
+    })
+
+
+@message_bp.route('/thread/<int:thread_id>/read', methods=['POST'])
+@login_required
+def mark_read(thread_id: int):
+    """Advance the read cursor for messages delivered live while the thread is open."""
+    thread = MessageDAL.get_thread_by_id(thread_id)
+    if not thread or current_user.user_id not in {thread.owner_id, thread.participant_id}:
+        abort(404)
+    MessageDAL.mark_thread_read(thread.thread_id, current_user.user_id, request.form.get('message_id', type=int))
+    return '', 204
+
+
+def _sse_response(channel: str):
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('last_event_id', type=int)
+    if last_event_id is None:
+        last_event_id = MessageDAL.latest_event_id(channel)
+    config = current_app.config
+    stream = event_stream(
+        channel,
+        last_event_id,
+        fetch_since=lambda after_id: MessageDAL.get_events_since(channel, after_id, limit=EVENT_PAGE_SIZE),
+        heartbeat=config['SSE_HEARTBEAT_SECONDS'],
+        poll_interval=config['SSE_POLL_SECONDS'],
+        max_duration=config['SSE_MAX_STREAM_SECONDS'],
+        queue_size=config['SSE_QUEUE_SIZE'],
+        page_size=EVENT_PAGE_SIZE,
+    )
+    return Response(
+        stream_with_context(stream),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@message_bp.route('/thread/<int:thread_id>/stream')
+@login_required
+def thread_stream(thread_id: int):
+    thread = MessageDAL.get_thread_by_id(thread_id)
+    if not thread or current_user.user_id not in {thread.owner_id, thread.participant_id}:
+        abort(404)
+    return _sse_response(MessageDAL.thread_channel(thread.thread_id))
+
+
+@message_bp.route('/stream')
+@login_required
+def inbox_stream():
+    return _sse_response(MessageDAL.user_channel(current_user.user_id))
@@ -41,6 +41,8 @@ BLANK_FORM = {
     'status': 'draft',
 }
 RESOURCE_OWNER_ROLES = {'staff', 'admin'}
+REVIEW_PAGE_SIZE = 10
+BROWSE_PAGE_SIZE = 24
 
 
 def _save_images(files) -> List[str]:
@@ -85,8 +87,11 @@ def browse():
         'category': request.args.get('category', '').strip(),
         'location': request.args.get('location', '').strip(),
         'min_capacity': request.args.get('min_capacity', '').strip(),
+        'sort': request.args.get('sort', 'newest'),
         'status': 'published'
     }
+    if filters['sort'] not in ResourceDAL.SORTS:
+        filters['sort'] = 'newest'
 
     min_capacity = None
     if filters['min_capacity']:
@@ -96,17 +101,36 @@ def browse():
         else:
             flash(value, 'warning')
 
-    resources = ResourceDAL.search_resources(
+    page = max(request.args.get('page', 1, type=int), 1)
+    resources, total = ResourceDAL.search_page(
         keyword=filters['keyword'] or None,
         category=filters['category'] or None,
         location=filters['location'] or None,
         min_capacity=min_capacity,
         status='published',
+        sort=filters['sort'],
+        page=page,
+        page_size=BROWSE_PAGE_SIZE,
     )
+    # Nothing contains the words as typed; offer the closest spellings instead of an empty page.
+    close_matches = not total and page == 1 and bool(filters['keyword'] or filters['location'])
+    if close_matches:
+        resources = ResourceDAL.fuzzy_search(
+            keyword=filters['keyword'] or None,
+            category=filters['category'] or None,
+            location=filters['location'] or None,
+            min_capacity=min_capacity,
+            status='published',
+            limit=BROWSE_PAGE_SIZE,
+        )
 
     return render_template(
         'resources/list.html',
         resources=resources,
+        total=total,
+        close_matches=close_matches and bool(resources),
+        page=page,
+        has_next=page * BROWSE_PAGE_SIZE < total,
         filters=filters,
         categories=RESOURCE_CATEGORIES,
     )
@@ -212,9 +236,18 @@ def detail(resource_id: int):
         return redirect(url_for('resource.browse'))
 
     related = ResourceDAL.get_related_resources(resource.category, exclude_id=resource_id)
-    reviews = ReviewDAL.list_for_resource(resource_id)
+    reviews, older_cursor = ReviewDAL.get_review_page(
+        resource_id, limit=REVIEW_PAGE_SIZE, before_id=request.args.get('before', type=int)
+    )
     rating_stats = ReviewDAL.get_average_for_resource(resource_id)
-    return render_template('resources/detail.html', resource=resource, related=related, reviews=reviews, rating_stats=rating_stats)
+    return render_template(
+        'resources/detail.html',
+        resource=resource,
+        related=related,
+        reviews=reviews,
+        older_cursor=older_cursor,
+        rating_stats=rating_stats,
+    )
 
 
 def _extract_form_data(form):
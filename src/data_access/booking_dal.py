@@ -3,12 +3,12 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional, Sequence, Tuple
 
-from src.data_access.db import get_connection
+from src.data_access.db import commit, fetch_all, fetch_one, get_connection, iter_rows, model_factory
 
 
-@dataclass
+@dataclass(slots=True)
 class Booking:
     booking_id: int
     resource_id: int
@@ -22,25 +22,37 @@ class Booking:
     created_at: str
 
 
+BOOKING_COLUMNS = ('booking_id', 'resource_id', 'requester_id', 'start_datetime', 'end_datetime', 'status', 'notes',
+                   'owner_notes', 'decision_at', 'created_at')
+_booking = model_factory(Booking, BOOKING_COLUMNS, intern=('status',))
+_SELECT = f"SELECT {', '.join(BOOKING_COLUMNS)} FROM bookings"
+
+
+@dataclass(slots=True)
+class BookingRow:
+    """A line in a booking list: no free-text notes, with the resource's title and location joined in."""
+    booking_id: int
+    resource_id: int
+    requester_id: int
+    start_datetime: str
+    end_datetime: str
+    status: str
+    created_at: str
+    resource_title: str | None
+    resource_location: str | None
+
+
+BOOKING_ROW_COLUMNS = ('booking_id', 'resource_id', 'requester_id', 'start_datetime', 'end_datetime', 'status',
+                       'created_at', 'resource_title', 'resource_location')
+_booking_row = model_factory(BookingRow, BOOKING_ROW_COLUMNS, intern=('status', 'resource_location'))
+_SELECT_ROW = '''SELECT b.booking_id, b.resource_id, b.requester_id, b.start_datetime, b.end_datetime, b.status,
+                        b.created_at, r.title, r.location
+                 FROM bookings b LEFT JOIN resources r ON r.resource_id = b.resource_id'''
+
+
 class BookingDAL:
     STATUSES = ('pending', 'approved', 'rejected', 'cancelled', 'completed')
-
-    @staticmethod
-    def _row(row) -> Optional[Booking]:
-        if not row:
-            return None
-        return Booking(
-            booking_id=row['booking_id'],
-            resource_id=row['resource_id'],
-            requester_id=row['requester_id'],
-            start_datetime=row['start_datetime'],
-            end_datetime=row['end_datetime'],
-            status=row['status'],
-            notes=row['notes'],
-            owner_notes=row['owner_notes'],
-            decision_at=row['decision_at'],
-            created_at=row['created_at'],
-        )
+    COLUMNS = BOOKING_COLUMNS  # order of ``iter_bookings(raw=True)`` tuples
 
     @staticmethod
     def create_booking(resource_id: int, requester_id: int, start: str, end: str, notes: str | None, status: str = 'pending'):
@@ -50,44 +62,94 @@ class BookingDAL:
                VALUES (?, ?, ?, ?, ?, ?)''',
             (resource_id, requester_id, start, end, status, notes)
         )
-        conn.commit()
+        commit(conn)
         return BookingDAL.get_booking_by_id(cursor.lastrowid)
 
     @staticmethod
     def get_booking_by_id(booking_id: int) -> Optional[Booking]:
-        conn = get_connection()
-        row = conn.execute('SELECT * FROM bookings WHERE booking_id = ?', (booking_id,)).fetchone()
-        return BookingDAL._row(row)
+        return fetch_one(_booking, f'{_SELECT} WHERE booking_id = ?', (booking_id,))
 
     @staticmethod
-    def get_bookings_by_requester(user_id: int) -> List[Booking]:
-        conn = get_connection()
-        rows = conn.execute('SELECT * FROM bookings WHERE requester_id = ? ORDER BY start_datetime DESC', (user_id,)).fetchall()
-        return [BookingDAL._row(row) for row in rows]
+    def get_bookings_by_requester(user_id: int) -> List[BookingRow]:
+        """Served from idx_bookings_requester, which covers every booking column a row needs."""
+        return fetch_all(
+            _booking_row, f'{_SELECT_ROW} WHERE b.requester_id = ? ORDER BY b.start_datetime DESC', (user_id,)
+        )
 
     @staticmethod
     def get_bookings_for_resource(resource_id: int) -> List[Booking]:
-        conn = get_connection()
-        rows = conn.execute('SELECT * FROM bookings WHERE resource_id = ? ORDER BY start_datetime DESC', (resource_id,)).fetchall()
-        return [BookingDAL._row(row) for row in rows]
+        return fetch_all(_booking, f'{_SELECT} WHERE resource_id = ? ORDER BY start_datetime DESC', (resource_id,))
 
     @staticmethod
-    def get_actionable_for_owner(owner_id: int) -> List[Booking]:
+    def get_actionable_for_owner(owner_id: int) -> List[BookingRow]:
+        return fetch_all(
+            _booking_row,
+            f'''{_SELECT_ROW} WHERE r.owner_id = ? AND b.status = 'pending'
+                ORDER BY b.start_datetime ASC''',
+            (owner_id,)
+        )
+
+    @staticmethod
+    def iter_for_requester(user_id: int, status: str | None = None, after_id: int | None = None,
+                           ids: Sequence[int] | None = None, limit: int | None = None,
+                           batch_size: int = 500) -> Iterator[BookingRow]:
+        """A requester's booking rows, newest first; ``after_id`` is the keyset cursor."""
+        clauses, params = ['b.requester_id = ?'], [user_id]
+        if status:
+            clauses.append('b.status = ?')
+            params.append(status)
+        if after_id is not None:
+            clauses.append('b.booking_id < ?')
+            params.append(after_id)
+        if ids is not None:
+            clauses.append(f"b.booking_id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        query = f"{_SELECT_ROW} WHERE {' AND '.join(clauses)} ORDER BY b.booking_id DESC"
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return iter_rows(query, params, batch_size, factory=_booking_row)
+
+    @staticmethod
+    def busy_intervals(resource_id: int, start: str, end: str) -> List[Tuple[str, str, str]]:
+        """``(start, end, status)`` of the pending/approved bookings overlapping ``[start, end)``."""
         conn = get_connection()
         rows = conn.execute(
-            '''SELECT b.* FROM bookings b
-               JOIN resources r ON r.resource_id = b.resource_id
-               WHERE r.owner_id = ? AND b.status = 'pending'
-               ORDER BY b.start_datetime ASC''',
-            (owner_id,)
+            '''SELECT start_datetime, end_datetime, status FROM bookings
+               WHERE resource_id = ? AND status IN ('pending', 'approved')
+                 AND end_datetime > ? AND start_datetime < ?
+               ORDER BY start_datetime''',
+            (resource_id, start, end)
         ).fetchall()
-        return [BookingDAL._row(row) for row in rows]
+        return [tuple(row) for row in rows]
 
     @staticmethod
-    def list_recent(limit: int = 15) -> List[Booking]:
-        conn = get_connection()
-        rows = conn.execute('SELECT * FROM bookings ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
-        return [BookingDAL._row(row) for row in rows]
+    def list_recent(limit: int = 15) -> List[BookingRow]:
+        return fetch_all(_booking_row, f'{_SELECT_ROW} ORDER BY b.created_at DESC LIMIT ?', (limit,))
+
+    @staticmethod
+    def iter_bookings(status: str | None = None, resource_id: int | None = None, since: str | None = None,
+                      until: str | None = None, raw: bool = False, batch_size: int = 500) -> Iterator[Booking | tuple]:
+        """Stream bookings in id order, optionally filtered by status, resource and start time range.
+
+        For jobs that walk the whole table; ``raw`` skips building ``Booking`` objects.
+        """
+        clauses, params = [], []
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        if resource_id is not None:
+            clauses.append('resource_id = ?')
+            params.append(resource_id)
+        if since:
+            clauses.append('start_datetime >= ?')
+            params.append(since)
+        if until:
+            clauses.append('start_datetime < ?')
+            params.append(until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        return iter_rows(f'{_SELECT}{where} ORDER BY booking_id', params, batch_size, raw,
+                         None if raw else _booking)
 
     @staticmethod
     def update_status(booking_id: int, status: str, owner_notes: str | None = None):
@@ -98,7 +160,7 @@ class BookingDAL:
             'UPDATE bookings SET status = ?, owner_notes = ?, decision_at = CURRENT_TIMESTAMP WHERE booking_id = ?',
             (status, owner_notes, booking_id)
         )
-        conn.commit()
+        commit(conn)
 
     @staticmethod
     def mark_completed_for_past_reservations(now_iso: str):
@@ -109,7 +171,7 @@ class BookingDAL:
                WHERE status = 'approved' AND end_datetime < ?''',
             (now_iso,)
         )
-        conn.commit()
+        commit(conn)
 
     @staticmethod
     def has_conflict(resource_id: int, start: str, end: str, exclude_booking_id: int | None = None) -> bool:
@@ -1,12 +1,17 @@
 """SQLite helpers and schema management."""
 from __future__ import annotations
 
+import dataclasses
 import sqlite3
+import sys
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
 
 from flask import current_app, g
 
+RowFactory = Callable[[sqlite3.Cursor, tuple], object]
+
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS users (
     user_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -16,6 +21,7 @@ CREATE TABLE IF NOT EXISTS users (
     role TEXT NOT NULL CHECK(role IN ('student','staff','admin')),
     department TEXT,
     email_verified INTEGER DEFAULT 0,
+    is_suspended INTEGER NOT NULL DEFAULT 0,
     created_at TEXT DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -29,6 +35,14 @@ CREATE TABLE IF NOT EXISTS resources (
     capacity INTEGER NOT NULL,
     availability_notes TEXT,
     status TEXT NOT NULL DEFAULT 'draft',
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    stars_1 INTEGER NOT NULL DEFAULT 0,
+    stars_2 INTEGER NOT NULL DEFAULT 0,
+    stars_3 INTEGER NOT NULL DEFAULT 0,
+    stars_4 INTEGER NOT NULL DEFAULT 0,
+    stars_5 INTEGER NOT NULL DEFAULT 0,
+    rating_score REAL NOT NULL DEFAULT 3.0,
     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
     updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY(owner_id) REFERENCES users(user_id)
@@ -62,6 +76,8 @@ CREATE TABLE IF NOT EXISTS message_threads (
     resource_id INTEGER,
     owner_id INTEGER NOT NULL,
     participant_id INTEGER NOT NULL,
+    thread_key TEXT,
+    last_message_id INTEGER,
     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
     updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY(resource_id) REFERENCES resources(resource_id),
@@ -74,17 +90,50 @@ CREATE TABLE IF NOT EXISTS messages (
     thread_id INTEGER NOT NULL,
     sender_id INTEGER NOT NULL,
     body TEXT NOT NULL,
+    is_hidden INTEGER NOT NULL DEFAULT 0,
     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY(thread_id) REFERENCES message_threads(thread_id),
     FOREIGN KEY(sender_id) REFERENCES users(user_id)
 );
 
+CREATE TABLE IF NOT EXISTS thread_participants (
+    user_id INTEGER NOT NULL,
+    thread_id INTEGER NOT NULL,
+    other_user_id INTEGER NOT NULL,
+    other_user_name TEXT NOT NULL,
+    resource_id INTEGER,
+    resource_title TEXT,
+    last_message_preview TEXT,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    last_read_message_id INTEGER,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY(user_id, thread_id),
+    FOREIGN KEY(user_id) REFERENCES users(user_id),
+    FOREIGN KEY(thread_id) REFERENCES message_threads(thread_id)
+);
+
+CREATE TABLE IF NOT EXISTS user_message_stats (
+    user_id INTEGER PRIMARY KEY,
+    unread_messages INTEGER NOT NULL DEFAULT 0,
+    unread_threads INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY(user_id) REFERENCES users(user_id)
+);
+
+CREATE TABLE IF NOT EXISTS message_events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(message_id) REFERENCES messages(message_id)
+);
+
 CREATE TABLE IF NOT EXISTS reviews (
     review_id INTEGER PRIMARY KEY AUTOINCREMENT,
     resource_id INTEGER NOT NULL,
     reviewer_id INTEGER NOT NULL,
     rating INTEGER NOT NULL CHECK(rating BETWEEN 1 AND 5),
     comment TEXT,
+    is_hidden INTEGER NOT NULL DEFAULT 0,
     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY(resource_id) REFERENCES resources(resource_id),
     FOREIGN KEY(reviewer_id) REFERENCES users(user_id)
@@ -95,9 +144,277 @@ CREATE TABLE IF NOT EXISTS notifications (
     user_id INTEGER NOT NULL,
     message TEXT NOT NULL,
     is_read INTEGER NOT NULL DEFAULT 0,
+    kind TEXT,
+    resource_id INTEGER,
+    item_count INTEGER NOT NULL DEFAULT 1,
+    first_item_id INTEGER,
+    last_item_id INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(user_id) REFERENCES users(user_id)
+);
+
+CREATE TABLE IF NOT EXISTS notification_read_marks (
+    user_id INTEGER PRIMARY KEY,
+    read_through_id INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY(user_id) REFERENCES users(user_id)
+);
+
+CREATE TABLE IF NOT EXISTS notifications_archive (
+    notification_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    is_read INTEGER NOT NULL DEFAULT 0,
+    kind TEXT,
+    resource_id INTEGER,
+    item_count INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT,
+    updated_at TEXT,
+    archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    outbox_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    notification_id INTEGER,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending','sending','sent','dead')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    claimed_at TEXT,
+    last_error TEXT,
+    sent_at TEXT,
     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY(user_id) REFERENCES users(user_id)
 );
+
+CREATE TABLE IF NOT EXISTS content_signatures (
+    signature_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL CHECK(kind IN ('review','message')),
+    ref_id INTEGER NOT NULL,
+    signature BLOB NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(kind, ref_id)
+);
+
+CREATE TABLE IF NOT EXISTS content_flags (
+    flag_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL CHECK(kind IN ('review','message')),
+    ref_id INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    matched_kind TEXT,
+    matched_ref_id INTEGER,
+    score REAL,
+    detail TEXT,
+    status TEXT NOT NULL DEFAULT 'open' CHECK(status IN ('open','dismissed','actioned')),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    resolved_at TEXT,
+    UNIQUE(kind, ref_id, reason)
+);
+
+CREATE TABLE IF NOT EXISTS moderation_terms (
+    term_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    term TEXT NOT NULL UNIQUE,
+    action TEXT NOT NULL DEFAULT 'flag' CHECK(action IN ('flag','hide')),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS stats_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(body, content='messages', content_rowid='message_id');
+
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, body) VALUES (new.message_id, new.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, body) VALUES ('delete', old.message_id, old.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF body ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, body) VALUES ('delete', old.message_id, old.body);
+    INSERT INTO messages_fts(rowid, body) VALUES (new.message_id, new.body);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(comment, content='reviews', content_rowid='review_id');
+
+CREATE TRIGGER IF NOT EXISTS reviews_fts_insert AFTER INSERT ON reviews BEGIN
+    INSERT INTO reviews_fts(rowid, comment) VALUES (new.review_id, new.comment);
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_fts_delete AFTER DELETE ON reviews BEGIN
+    INSERT INTO reviews_fts(reviews_fts, rowid, comment) VALUES ('delete', old.review_id, old.comment);
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_fts_update AFTER UPDATE OF comment ON reviews BEGIN
+    INSERT INTO reviews_fts(reviews_fts, rowid, comment) VALUES ('delete', old.review_id, old.comment);
+    INSERT INTO reviews_fts(rowid, comment) VALUES (new.review_id, new.comment);
+END;
+"""
+
+# Columns added after the first release; re-running them on an up-to-date database is a no-op.
+MIGRATIONS = [
+    'ALTER TABLE message_threads ADD COLUMN thread_key TEXT',
+    'ALTER TABLE message_threads ADD COLUMN last_message_id INTEGER',
+    'ALTER TABLE thread_participants ADD COLUMN last_read_message_id INTEGER',
+    'ALTER TABLE notifications ADD COLUMN kind TEXT',
+    'ALTER TABLE notifications ADD COLUMN resource_id INTEGER',
+    'ALTER TABLE notifications ADD COLUMN item_count INTEGER NOT NULL DEFAULT 1',
+    'ALTER TABLE notifications ADD COLUMN first_item_id INTEGER',
+    'ALTER TABLE notifications ADD COLUMN last_item_id INTEGER',
+    'ALTER TABLE notifications ADD COLUMN updated_at TEXT',
+    'ALTER TABLE notification_outbox ADD COLUMN notification_id INTEGER',
+    'ALTER TABLE reviews ADD COLUMN is_hidden INTEGER NOT NULL DEFAULT 0',
+    'ALTER TABLE resources ADD COLUMN rating_sum INTEGER NOT NULL DEFAULT 0',
+    'ALTER TABLE resources ADD COLUMN rating_count INTEGER NOT NULL DEFAULT 0',
+    *[f'ALTER TABLE resources ADD COLUMN stars_{stars} INTEGER NOT NULL DEFAULT 0' for stars in range(1, 6)],
+    'ALTER TABLE resources ADD COLUMN rating_score REAL NOT NULL DEFAULT 3.0',
+    'ALTER TABLE messages ADD COLUMN is_hidden INTEGER NOT NULL DEFAULT 0',
+    'ALTER TABLE content_flags ADD COLUMN detail TEXT',
+    'ALTER TABLE users ADD COLUMN is_suspended INTEGER NOT NULL DEFAULT 0',
+]
+
+# Bayesian average: every resource starts with RATING_PRIOR_WEIGHT phantom reviews at RATING_PRIOR_MEAN,
+# so a single 5-star review cannot outrank a listing with dozens of 4.8s. The column default above
+# must match RATING_PRIOR_MEAN.
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_WEIGHT = 5
+
+
+def _rating_delta(sign: str, ref: str) -> str:
+    """SET clause adding (``+``) or removing (``-``) review ``ref`` from its resource's aggregates."""
+    stars = ', '.join(f'stars_{n} = stars_{n} {sign} ({ref}.rating = {n})' for n in range(1, 6))
+    return (
+        f'rating_sum = rating_sum {sign} {ref}.rating, rating_count = rating_count {sign} 1, {stars}, '
+        f'rating_score = (rating_sum {sign} {ref}.rating + {RATING_PRIOR_MEAN * RATING_PRIOR_WEIGHT}) '
+        f'/ (rating_count {sign} 1 + {RATING_PRIOR_WEIGHT}.0)'
+    )
+
+
+# Created after MIGRATIONS so the referenced columns exist on upgraded databases. Hidden reviews
+# never count; hiding, unhiding or re-rating a review moves it out of and back into the totals.
+RATING_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS reviews_rating_insert AFTER INSERT ON reviews WHEN new.is_hidden = 0 BEGIN
+    UPDATE resources SET {_rating_delta('+', 'new')} WHERE resource_id = new.resource_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_rating_delete AFTER DELETE ON reviews WHEN old.is_hidden = 0 BEGIN
+    UPDATE resources SET {_rating_delta('-', 'old')} WHERE resource_id = old.resource_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_rating_update AFTER UPDATE OF rating, is_hidden, resource_id ON reviews BEGIN
+    UPDATE resources SET {_rating_delta('-', 'old')} WHERE resource_id = old.resource_id AND old.is_hidden = 0;
+    UPDATE resources SET {_rating_delta('+', 'new')} WHERE resource_id = new.resource_id AND new.is_hidden = 0;
+END;
+"""
+
+def _bump(*deltas: Tuple[str, str]) -> str:
+    """Trigger statement adding each ``(name_expr, delta_expr)`` to its row in stats_counters."""
+    values = ', '.join(f'({name}, {delta})' for name, delta in deltas)
+    return (f'INSERT INTO stats_counters (name, value) VALUES {values} '
+            f'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;')
+
+
+# Keep admin totals O(1) to read; see stats_dal.COUNTER_SOURCES for the equivalent recount.
+COUNTER_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS users_counters_insert AFTER INSERT ON users BEGIN
+    {_bump(("'users'", '1'), ("'users:role:' || new.role", '1'), ("'users:suspended'", 'new.is_suspended'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_counters_delete AFTER DELETE ON users BEGIN
+    {_bump(("'users'", '-1'), ("'users:role:' || old.role", '-1'), ("'users:suspended'", '-old.is_suspended'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_counters_update AFTER UPDATE OF role, is_suspended ON users BEGIN
+    {_bump(("'users:role:' || old.role", '-1'), ("'users:role:' || new.role", '1'),
+           ("'users:suspended'", 'new.is_suspended - old.is_suspended'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS resources_counters_insert AFTER INSERT ON resources BEGIN
+    {_bump(("'resources'", '1'), ("'resources:status:' || new.status", '1'), ("'resources:capacity'", 'new.capacity'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS resources_counters_delete AFTER DELETE ON resources BEGIN
+    {_bump(("'resources'", '-1'), ("'resources:status:' || old.status", '-1'), ("'resources:capacity'", '-old.capacity'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS resources_counters_update AFTER UPDATE OF status, capacity ON resources BEGIN
+    {_bump(("'resources:status:' || old.status", '-1'), ("'resources:status:' || new.status", '1'),
+           ("'resources:capacity'", 'new.capacity - old.capacity'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS resources_catalog_insert AFTER INSERT ON resources BEGIN
+    {_bump(("'catalog:version'", '1'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS resources_catalog_delete AFTER DELETE ON resources BEGIN
+    {_bump(("'catalog:version'", '1'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS resources_catalog_update
+AFTER UPDATE OF title, summary, category, location, capacity, status, rating_score, created_at ON resources BEGIN
+    {_bump(("'catalog:version'", '1'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_accounts_update
+AFTER UPDATE OF name, email, role, department, email_verified, is_suspended ON users BEGIN
+    {_bump(("'accounts:version'", '1'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_accounts_delete AFTER DELETE ON users BEGIN
+    {_bump(("'accounts:version'", '1'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_counters_insert AFTER INSERT ON bookings BEGIN
+    {_bump(("'bookings'", '1'), ("'bookings:status:' || new.status", '1'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_counters_delete AFTER DELETE ON bookings BEGIN
+    {_bump(("'bookings'", '-1'), ("'bookings:status:' || old.status", '-1'))}
+END;
+
+CREATE TRIGGER IF NOT EXISTS bookings_counters_update AFTER UPDATE OF status ON bookings BEGIN
+    {_bump(("'bookings:status:' || old.status", '-1'), ("'bookings:status:' || new.status", '1'))}
+END;
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_messages_thread ON messages(thread_id, message_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_message_threads_key ON message_threads(thread_key);
+CREATE INDEX IF NOT EXISTS idx_thread_participants_inbox ON thread_participants(user_id, updated_at, thread_id);
+CREATE INDEX IF NOT EXISTS idx_thread_participants_resource ON thread_participants(resource_id);
+CREATE INDEX IF NOT EXISTS idx_message_events_channel ON message_events(channel, event_id);
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_recipient ON notification_outbox(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_notifications_group ON notifications(user_id, kind, resource_id, notification_id);
+CREATE INDEX IF NOT EXISTS idx_bookings_resource ON bookings(resource_id, booking_id);
+CREATE INDEX IF NOT EXISTS idx_bookings_requester ON bookings(requester_id, start_datetime, end_datetime, status, resource_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_bookings_pending ON bookings(resource_id, start_datetime) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_bookings_created ON bookings(created_at);
+CREATE INDEX IF NOT EXISTS idx_resources_owner ON resources(owner_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_resource_images_resource ON resource_images(resource_id, image_id);
+CREATE INDEX IF NOT EXISTS idx_notifications_feed ON notifications(user_id, updated_at, notification_id);
+CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id, notification_id);
+CREATE INDEX IF NOT EXISTS idx_notifications_unread ON notifications(user_id, notification_id) WHERE is_read = 0;
+CREATE INDEX IF NOT EXISTS idx_notifications_created ON notifications(created_at);
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_created ON notification_outbox(created_at) WHERE status IN ('sent', 'dead');
+CREATE INDEX IF NOT EXISTS idx_resources_status_created ON resources(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_resources_status_score ON resources(status, rating_score, resource_id);
+CREATE INDEX IF NOT EXISTS idx_resources_status_id ON resources(status, resource_id);
+CREATE INDEX IF NOT EXISTS idx_resources_updated ON resources(updated_at);
+CREATE INDEX IF NOT EXISTS idx_content_flags_status ON content_flags(status, flag_id);
+-- Replaces idx_reviews_resource(resource_id, created_at); IF NOT EXISTS would keep that older shape.
+DROP INDEX IF EXISTS idx_reviews_resource;
+CREATE INDEX IF NOT EXISTS idx_reviews_resource_visible ON reviews(resource_id, created_at, review_id) WHERE is_hidden = 0;
+CREATE INDEX IF NOT EXISTS idx_users_name ON users(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_department ON users(department COLLATE NOCASE, user_id);
 """
 
 
@@ -113,17 +430,182 @@ def get_connection(close_only: bool = False) -> Optional[sqlite3.Connection]:
     return conn
 
 
+def model_factory(cls: type, columns: Sequence[str], intern: Iterable[str] = (),
+                  convert: Optional[Dict[str, Callable[[object], object]]] = None) -> RowFactory:
+    """Generate a cursor ``row_factory`` building dataclass ``cls`` from rows selected in ``columns`` order.
+
+    The generated function indexes the raw tuple and calls ``cls`` positionally, so rows skip the
+    ``sqlite3.Row`` wrapper and per-column name lookups entirely. Values of ``intern`` columns
+    (low-cardinality strings such as status or role) go through ``sys.intern`` so a long list shares
+    one copy of each; ``convert`` maps a column to a function applied to its value.
+    """
+    convert = convert or {}
+    fields = [field.name for field in dataclasses.fields(cls) if field.init]
+    unknown = set(columns) - set(fields)
+    if unknown:
+        raise ValueError(f'{cls.__name__} has no field(s) {sorted(unknown)}')
+    namespace: Dict[str, object] = {'cls': cls, '_intern': sys.intern}
+    args = []
+    positional = True
+    for name in fields:
+        if name not in columns:
+            positional = False  # later fields must be passed by keyword
+            continue
+        expr = f'row[{list(columns).index(name)}]'
+        if name in convert:
+            namespace[f'_convert_{name}'] = convert[name]
+            expr = f'_convert_{name}({expr})'
+        elif name in intern:
+            expr = f'(None if {expr} is None else _intern({expr}))'
+        args.append(expr if positional else f'{name}={expr}')
+    source = f"def build(cursor, row):\n    return cls({', '.join(args)})\n"
+    exec(compile(source, f'<{cls.__name__} row factory>', 'exec'), namespace)
+    build = namespace['build']
+    build.columns = tuple(columns)  # type: ignore[attr-defined]
+    return build  # type: ignore[return-value]
+
+
+def fetch_all(factory: RowFactory, query: str, params: Sequence[object] = ()) -> list:
+    cursor = get_connection().cursor()
+    cursor.row_factory = factory
+    return cursor.execute(query, tuple(params)).fetchall()
+
+
+def fetch_one(factory: RowFactory, query: str, params: Sequence[object] = ()):
+    cursor = get_connection().cursor()
+    cursor.row_factory = factory
+    return cursor.execute(query, tuple(params)).fetchone()
+
+
+def iter_batches(query: str, params: Sequence[object] = (), batch_size: int = 500,
+                 raw: bool = False, factory: Optional[RowFactory] = None) -> Iterator[list]:
+    """Yield a query's rows in ``fetchmany`` lists of ``batch_size`` instead of materialising them all.
+
+    SQLite steps the statement only as batches are fetched, so memory is bounded by one batch.
+    ``raw`` returns plain tuples and ``factory`` models instead of ``sqlite3.Row``. Closing the
+    generator early (``break`` in the caller, or ``.close()``) finalises the statement. The open
+    statement keeps its read snapshot until then; the database is in WAL mode (``init_database``)
+    so writers on other connections carry on meanwhile.
+    """
+    cursor = get_connection().cursor()
+    if factory is not None:
+        cursor.row_factory = factory
+    elif raw:
+        cursor.row_factory = None
+    try:
+        cursor.execute(query, tuple(params))
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield batch
+    finally:
+        cursor.close()
+
+
+def iter_rows(query: str, params: Sequence[object] = (), batch_size: int = 500, raw: bool = False,
+              factory: Optional[RowFactory] = None) -> Iterator:
+    """Row-at-a-time view of ``iter_batches``."""
+    for batch in iter_batches(query, params, batch_size, raw, factory):
+        yield from batch
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """Group several DAL writes into a single commit.
+
+    DAL methods finish with ``commit(conn)``, which defers to the outermost ``transaction()`` block
+    when one is open, so e.g. a booking and its notification land (or roll back) together.
+    """
+    conn = get_connection()
+    depth = getattr(g, '_transaction_depth', 0)
+    g._transaction_depth = depth + 1
+    if depth == 0:
+        g._after_commit = []
+    try:
+        yield conn
+        if depth == 0:
+            conn.commit()
+    except Exception:
+        if depth == 0:
+            conn.rollback()
+            g._after_commit = []
+        raise
+    finally:
+        g._transaction_depth = depth
+    if depth == 0:
+        callbacks, g._after_commit = g._after_commit, []
+        for callback in callbacks:
+            callback()
+
+
+def in_transaction() -> bool:
+    return bool(getattr(g, '_transaction_depth', 0))
+
+
+def commit(conn: sqlite3.Connection) -> None:
+    if not in_transaction():
+        conn.commit()
+
+
+def on_commit(callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the current write is durable (immediately outside ``transaction()``)."""
+    if in_transaction():
+        g._after_commit.append(callback)
+    else:
+        callback()
+
+
 def init_database(force: bool = False) -> None:
     database_path = current_app.config['DATABASE_PATH']
     if force and database_path != ':memory:':
-        db_file = Path(database_path)
-        if db_file.exists():
-            db_file.unlink()
+        for suffix in ('', '-wal', '-shm'):
+            db_file = Path(database_path + suffix)
+            if db_file.exists():
+                db_file.unlink()
 
     conn = sqlite3.connect(database_path)
+    # Persistent per file. Readers then work from a snapshot and never block writers, so a slow
+    # client draining a streamed export or API page can't hold up bookings, messages or logins.
+    conn.execute('PRAGMA journal_mode=WAL')
     conn.executescript(SCHEMA)
+    _apply_migrations(conn)
+    conn.executescript(RATING_TRIGGERS)
+    conn.executescript(COUNTER_TRIGGERS)
     conn.commit()
     conn.close()
 
     from src.data_access.sample_data import ensure_seed_data
     ensure_seed_data()
+
+    conn = sqlite3.connect(database_path)
+    _backfill_read_models(conn)
+    conn.executescript(INDEXES)
+    conn.commit()
+    conn.close()
+
+
+def _apply_migrations(conn: sqlite3.Connection) -> None:
+    for statement in MIGRATIONS:
+        try:
+            conn.execute(statement)
+        except sqlite3.OperationalError:
+            pass  # column already exists
+
+
+def _backfill_read_models(conn: sqlite3.Connection) -> None:
+    """Populate denormalized tables for rows written before they existed (or by the seed script)."""
+    from src.data_access.message_dal import backfill_thread_participants
+    from src.data_access.review_dal import rebuild_rating_aggregates
+    from src.data_access.stats_dal import reconcile_counters
+    backfill_thread_participants(conn)
+    counted = conn.execute('SELECT IFNULL(SUM(rating_count), 0) FROM resources').fetchone()[0]
+    if counted != conn.execute('SELECT COUNT(*) FROM reviews WHERE is_hidden = 0').fetchone()[0]:
+        rebuild_rating_aggregates(conn)
+    reconcile_counters(conn)
+    conn.execute('UPDATE notifications SET updated_at = created_at WHERE updated_at IS NULL')
+    for source, index in (('messages', 'messages_fts'), ('reviews', 'reviews_fts')):
+        indexed = conn.execute(f'SELECT 1 FROM {index}_docsize LIMIT 1').fetchone()
+        if not indexed and conn.execute(f'SELECT 1 FROM {source} LIMIT 1').fetchone():
+            conn.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+    conn.commit()
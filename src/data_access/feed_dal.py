@@ -0,0 +1,106 @@
+"""Blended activity feed for the navbar alerts menu."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List
+
+from flask import url_for
+
+from src.data_access.db import get_connection
+
+RECENT_RESOURCE_DAYS = 7
+
+# Each branch is pre-limited through its own index; the outer query merges them on a shared sort key.
+# The unread-message total rides along as a scalar column so a cache miss costs a single statement.
+FEED_SQL = '''
+SELECT feed.*, (SELECT unread_messages FROM user_message_stats WHERE user_id = :user_id) AS unread_total
+FROM (
+    SELECT * FROM (
+        SELECT 'notification' AS kind, notification_id AS ref_id, message AS title, NULL AS detail,
+               item_count AS count, updated_at AS sort_at
+        FROM notifications
+        WHERE user_id = :user_id
+        ORDER BY updated_at DESC, notification_id DESC
+        LIMIT :limit
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'message', thread_id, other_user_name, resource_title, unread_count, updated_at
+        FROM thread_participants
+        WHERE user_id = :user_id AND unread_count > 0
+        ORDER BY updated_at DESC
+        LIMIT :limit
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'resource', resource_id, title, category, NULL, created_at
+        FROM resources
+        WHERE status = 'published' AND owner_id != :user_id AND created_at >= datetime('now', :recent)
+        ORDER BY created_at DESC
+        LIMIT :limit
+    )
+) AS feed
+ORDER BY sort_at DESC, ref_id DESC
+LIMIT :limit
+'''
+
+_ROUTES = {
+    'notification': ('dashboard.notification_detail', 'notification_id'),
+    'message': ('message.thread', 'thread_id'),
+    'resource': ('resource.detail', 'resource_id'),
+}
+
+
+@dataclass
+class FeedItem:
+    kind: str
+    ref_id: int
+    title: str
+    detail: str | None
+    count: int | None
+    sort_at: str
+
+    @property
+    def text(self) -> str:
+        if self.kind == 'message':
+            noun = 'message' if self.count == 1 else 'messages'
+            return f'{self.count} new {noun} from {self.title}'
+        if self.kind == 'resource':
+            return f'New listing: {self.title}'
+        return self.title
+
+    @property
+    def url(self) -> str | None:
+        """Built on access so only rendered items pay for ``url_for``."""
+        if self.kind == 'notification' and (self.count or 1) <= 1:
+            return None
+        endpoint, param = _ROUTES[self.kind]
+        return url_for(endpoint, **{param: self.ref_id})
+
+
+@dataclass
+class Feed:
+    items: List[FeedItem] = field(default_factory=list)
+    unread_messages: int = 0
+
+
+class FeedDAL:
+    @staticmethod
+    def load(user_id: int, limit: int = 5) -> Feed:
+        conn = get_connection()
+        rows = conn.execute(
+            FEED_SQL,
+            {'user_id': user_id, 'limit': limit, 'recent': f'-{RECENT_RESOURCE_DAYS} days'}
+        ).fetchall()
+        items = [
+            FeedItem(
+                kind=row['kind'],
+                ref_id=row['ref_id'],
+                title=row['title'],
+                detail=row['detail'],
+                count=row['count'],
+                sort_at=row['sort_at'],
+            )
+            for row in rows
+        ]
+        return Feed(items=items, unread_messages=(rows[0]['unread_total'] or 0) if rows else 0)
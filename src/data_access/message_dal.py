@@ -2,12 +2,42 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
-from src.data_access.db import get_connection
+from src.data_access.db import commit, fetch_all, fetch_one, get_connection, iter_rows, model_factory, on_commit
+from src.utils.fts import SNIPPET_END, SNIPPET_START, build_match_query, highlight_snippet
+from src.utils.content_filter import ContentFilter
+from src.utils.message_broker import broker
+from src.utils.near_duplicates import NearDuplicateIndex
+from src.utils.notification_feed import NotificationFeed
 
+PREVIEW_LENGTH = 140
+HIDDEN_MESSAGE_TEXT = 'This message was hidden by moderation.'
 
-@dataclass
+# One inbox row per side of a thread, carrying the names the inbox renders.
+_PARTICIPANT_ROWS_SQL = '''
+INSERT OR IGNORE INTO thread_participants
+    (user_id, thread_id, other_user_id, other_user_name, resource_id, resource_title, last_message_preview,
+     last_read_message_id, updated_at)
+SELECT t.owner_id, t.thread_id, t.participant_id, other.name, t.resource_id, r.title,
+       (SELECT substr(CASE WHEN m.is_hidden THEN '{hidden}' ELSE m.body END, 1, {preview}) FROM messages m WHERE m.thread_id = t.thread_id ORDER BY m.message_id DESC LIMIT 1),
+       IFNULL(t.last_message_id, 0), t.updated_at
+FROM message_threads t
+JOIN users other ON other.user_id = t.participant_id
+LEFT JOIN resources r ON r.resource_id = t.resource_id
+WHERE {where}
+UNION ALL
+SELECT t.participant_id, t.thread_id, t.owner_id, other.name, t.resource_id, r.title,
+       (SELECT substr(CASE WHEN m.is_hidden THEN '{hidden}' ELSE m.body END, 1, {preview}) FROM messages m WHERE m.thread_id = t.thread_id ORDER BY m.message_id DESC LIMIT 1),
+       IFNULL(t.last_message_id, 0), t.updated_at
+FROM message_threads t
+JOIN users other ON other.user_id = t.owner_id
+LEFT JOIN resources r ON r.resource_id = t.resource_id
+WHERE {where}
+'''
+
+
+@dataclass(slots=True)
 class MessageThread:
     thread_id: int
     resource_id: int | None
@@ -15,100 +45,398 @@ class MessageThread:
     participant_id: int
     created_at: str
     updated_at: str
+    last_message_id: int | None = None
+
+
+@dataclass(slots=True)
+class InboxEntry:
+    thread_id: int
+    other_user_id: int
+    other_user_name: str
+    resource_id: int | None
+    resource_title: str | None
+    last_message_preview: str | None
+    unread_count: int
+    updated_at: str
+    last_read_message_id: int | None = None
 
 
 @dataclass
+class MessageSearchHit:
+    message_id: int
+    thread_id: int
+    sender_id: int
+    sender_name: str
+    resource_title: str | None
+    snippet: str
+    created_at: str
+
+
+@dataclass(slots=True)
 class Message:
     message_id: int
     thread_id: int
     sender_id: int
     body: str
     created_at: str
+    is_hidden: bool = False
+
+    @property
+    def display_body(self) -> str:
+        return HIDDEN_MESSAGE_TEXT if self.is_hidden else self.body
+
+
+THREAD_COLUMNS = ('thread_id', 'resource_id', 'owner_id', 'participant_id', 'created_at', 'updated_at',
+                  'last_message_id')
+MESSAGE_COLUMNS = ('message_id', 'thread_id', 'sender_id', 'body', 'created_at', 'is_hidden')
+INBOX_COLUMNS = ('thread_id', 'other_user_id', 'other_user_name', 'resource_id', 'resource_title',
+                 'last_message_preview', 'unread_count', 'updated_at', 'last_read_message_id')
+_thread = model_factory(MessageThread, THREAD_COLUMNS)
+_message = model_factory(Message, MESSAGE_COLUMNS, convert={'is_hidden': bool})
+_inbox_entry = model_factory(InboxEntry, INBOX_COLUMNS)
+_SELECT_THREAD = f"SELECT {', '.join(THREAD_COLUMNS)} FROM message_threads"
+_SELECT_MESSAGE = f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM messages"
 
 
 class MessageDAL:
+    MESSAGE_COLUMNS = MESSAGE_COLUMNS
+
     @staticmethod
-    def _thread_row(row) -> Optional[MessageThread]:
-        if not row:
-            return None
-        return MessageThread(
-            thread_id=row['thread_id'],
-            resource_id=row['resource_id'],
-            owner_id=row['owner_id'],
-            participant_id=row['participant_id'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at'],
+    def thread_key(user_a: int, user_b: int, resource_id: int | None) -> str:
+        """Canonical key for a conversation: the same two people about the same resource share one thread."""
+        low, high = sorted((user_a, user_b))
+        return f'{low}:{high}:{resource_id or 0}'
+
+    @staticmethod
+    def find_or_create_thread(owner_id: int, participant_id: int, resource_id: int | None = None) -> MessageThread:
+        conn = get_connection()
+        key = MessageDAL.thread_key(owner_id, participant_id, resource_id)
+        cursor = conn.execute(
+            '''INSERT INTO message_threads (owner_id, participant_id, resource_id, thread_key)
+               VALUES (?, ?, ?, ?)
+               ON CONFLICT(thread_key) DO NOTHING''',
+            (owner_id, participant_id, resource_id, key)
         )
+        if cursor.rowcount:
+            conn.execute(
+                _PARTICIPANT_ROWS_SQL.format(where='t.thread_id = ?', preview=PREVIEW_LENGTH,
+                                             hidden=HIDDEN_MESSAGE_TEXT),
+                (cursor.lastrowid, cursor.lastrowid)
+            )
+            commit(conn)
+        return fetch_one(_thread, f'{_SELECT_THREAD} WHERE thread_key = ?', (key,))
 
     @staticmethod
-    def _message_row(row) -> Optional[Message]:
-        if not row:
-            return None
-        return Message(
-            message_id=row['message_id'],
-            thread_id=row['thread_id'],
-            sender_id=row['sender_id'],
-            body=row['body'],
-            created_at=row['created_at'],
+    def get_thread_by_id(thread_id: int) -> Optional[MessageThread]:
+        return fetch_one(_thread, f'{_SELECT_THREAD} WHERE thread_id = ?', (thread_id,))
+
+    @staticmethod
+    def list_threads_for_user(user_id: int) -> List[MessageThread]:
+        columns = ', '.join(f't.{column}' for column in THREAD_COLUMNS)
+        return fetch_all(
+            _thread,
+            f'''SELECT {columns} FROM thread_participants p
+               JOIN message_threads t ON t.thread_id = p.thread_id
+               WHERE p.user_id = ?
+               ORDER BY p.updated_at DESC, p.thread_id DESC''',
+            (user_id,)
         )
 
     @staticmethod
-    def find_or_create_thread(owner_id: int, participant_id: int, resource_id: int | None = None) -> MessageThread:
+    def list_inbox(user_id: int, limit: int = 50) -> List[InboxEntry]:
+        """Inbox rows for ``user_id``, newest activity first, from a single range scan."""
+        return fetch_all(
+            _inbox_entry,
+            f'''SELECT {', '.join(INBOX_COLUMNS)} FROM thread_participants
+               WHERE user_id = ?
+               ORDER BY updated_at DESC, thread_id DESC
+               LIMIT ?''',
+            (user_id, limit)
+        )
+
+    @staticmethod
+    def mark_thread_read(thread_id: int, user_id: int, up_to_message_id: int | None = None):
+        """Advance the user's read cursor (to the newest message by default) and settle unread totals."""
         conn = get_connection()
         row = conn.execute(
-            '''SELECT * FROM message_threads
-               WHERE owner_id = ? AND participant_id = ? AND IFNULL(resource_id, 0) = IFNULL(?, 0)
-               LIMIT 1''',
-            (owner_id, participant_id, resource_id)
+            '''SELECT p.unread_count, IFNULL(p.last_read_message_id, 0) AS read_id, IFNULL(t.last_message_id, 0) AS last_id
+               FROM thread_participants p JOIN message_threads t ON t.thread_id = p.thread_id
+               WHERE p.user_id = ? AND p.thread_id = ?''',
+            (user_id, thread_id)
         ).fetchone()
-        if row:
-            return MessageDAL._thread_row(row)
+        if not row:
+            return
+        target = row['last_id'] if up_to_message_id is None else min(up_to_message_id, row['last_id'])
+        if target <= row['read_id']:
+            return
+        remaining = 0
+        if target < row['last_id'] and row['unread_count']:
+            remaining = conn.execute(
+                'SELECT COUNT(*) FROM messages WHERE thread_id = ? AND message_id > ? AND sender_id != ?',
+                (thread_id, target, user_id)
+            ).fetchone()[0]
+        conn.execute(
+            'UPDATE thread_participants SET last_read_message_id = ?, unread_count = ? WHERE user_id = ? AND thread_id = ?',
+            (target, remaining, user_id, thread_id)
+        )
+        cleared = row['unread_count'] - remaining
+        if cleared > 0:
+            conn.execute(
+                '''UPDATE user_message_stats
+                   SET unread_messages = MAX(unread_messages - ?, 0),
+                       unread_threads = MAX(unread_threads - ?, 0)
+                   WHERE user_id = ?''',
+                (cleared, 1 if remaining == 0 else 0, user_id)
+            )
+        commit(conn)
+        on_commit(lambda: NotificationFeed.invalidate(user_id))
+
+    @staticmethod
+    def get_unread_total(user_id: int) -> int:
+        """Unread message count for the nav badge, read from the per-user aggregate row."""
+        conn = get_connection()
+        row = conn.execute('SELECT unread_messages FROM user_message_stats WHERE user_id = ?', (user_id,)).fetchone()
+        return row['unread_messages'] if row else 0
+
+    @staticmethod
+    def post_message(thread_id: int, sender_id: int, body: str) -> Message:
+        conn = get_connection()
+        screening = ContentFilter.screen(body)
         cursor = conn.execute(
-            'INSERT INTO message_threads (owner_id, participant_id, resource_id) VALUES (?, ?, ?)',
-            (owner_id, participant_id, resource_id)
+            'INSERT INTO messages (thread_id, sender_id, body, is_hidden) VALUES (?, ?, ?, ?)',
+            (thread_id, sender_id, body, int(screening.hidden))
+        )
+        message_id = cursor.lastrowid
+        ContentFilter.record('message', message_id, screening)
+        conn.execute(
+            'UPDATE message_threads SET updated_at = CURRENT_TIMESTAMP, last_message_id = ? WHERE thread_id = ?',
+            (message_id, thread_id)
+        )
+        conn.execute(
+            '''INSERT INTO user_message_stats (user_id, unread_messages, unread_threads)
+               SELECT user_id, 1, unread_count = 0 FROM thread_participants
+               WHERE thread_id = ? AND user_id != ?
+               ON CONFLICT(user_id) DO UPDATE SET
+                   unread_messages = unread_messages + 1,
+                   unread_threads = unread_threads + excluded.unread_threads''',
+            (thread_id, sender_id)
         )
-        conn.commit()
-        return MessageDAL.get_thread_by_id(cursor.lastrowid)
+        conn.execute(
+            '''UPDATE thread_participants
+               SET last_message_preview = ?,
+                   unread_count = unread_count + (user_id != ?),
+                   last_read_message_id = CASE WHEN user_id = ? AND unread_count = 0 THEN ? ELSE last_read_message_id END,
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE thread_id = ?''',
+            ((HIDDEN_MESSAGE_TEXT if screening.hidden else body)[:PREVIEW_LENGTH], sender_id, sender_id, message_id, thread_id)
+        )
+        thread = MessageDAL.get_thread_by_id(thread_id)
+        channels = [MessageDAL.thread_channel(thread_id)]
+        channels += [MessageDAL.user_channel(uid) for uid in (thread.owner_id, thread.participant_id)]
+        event_ids = {}
+        for channel in channels:
+            event_cursor = conn.execute(
+                'INSERT INTO message_events (channel, message_id) VALUES (?, ?)',
+                (channel, message_id)
+            )
+            event_ids[channel] = event_cursor.lastrowid
+        NearDuplicateIndex.check('message', message_id, body)
+        commit(conn)
+        message = MessageDAL.get_message_by_id(message_id)
+
+        def announce():
+            NotificationFeed.invalidate(thread.owner_id, thread.participant_id)
+            for channel, event_id in event_ids.items():
+                broker.publish(channel, MessageDAL._event_payload(event_id, message))
+
+        on_commit(announce)
+        return message
 
     @staticmethod
-    def get_thread_by_id(thread_id: int) -> Optional[MessageThread]:
+    def set_hidden(message_id: int, hidden: bool = True):
+        """Hide or restore a message; if it is the thread's latest, both inbox previews follow."""
         conn = get_connection()
-        row = conn.execute('SELECT * FROM message_threads WHERE thread_id = ?', (thread_id,)).fetchone()
-        return MessageDAL._thread_row(row)
+        row = conn.execute(
+            '''SELECT m.thread_id, m.body, t.owner_id, t.participant_id,
+                      (SELECT MAX(message_id) FROM messages WHERE thread_id = m.thread_id) AS last_id
+               FROM messages m JOIN message_threads t ON t.thread_id = m.thread_id
+               WHERE m.message_id = ?''',
+            (message_id,)
+        ).fetchone()
+        if row is None:
+            return
+        conn.execute('UPDATE messages SET is_hidden = ? WHERE message_id = ?', (int(hidden), message_id))
+        if row['last_id'] == message_id:
+            conn.execute(
+                'UPDATE thread_participants SET last_message_preview = ? WHERE thread_id = ?',
+                ((HIDDEN_MESSAGE_TEXT if hidden else row['body'])[:PREVIEW_LENGTH], row['thread_id'])
+            )
+        commit(conn)
+        on_commit(lambda: NotificationFeed.invalidate(row['owner_id'], row['participant_id']))
 
     @staticmethod
-    def list_threads_for_user(user_id: int) -> List[MessageThread]:
+    def search_messages(text: str, user_id: int | None, limit: int = 20, offset: int = 0) -> List[MessageSearchHit]:
+        """Ranked full-text search over message bodies.
+
+        ``user_id`` limits results to that user's threads; pass ``None`` for moderator-wide search.
+        """
+        match = build_match_query(text)
+        if not match:
+            return []
+        scope = ''
+        params: List[object] = [match]
+        if user_id is not None:
+            scope = 'JOIN thread_participants p ON p.thread_id = m.thread_id AND p.user_id = ? AND m.is_hidden = 0'
+            params.insert(0, user_id)
+        params.extend([limit, offset])
         conn = get_connection()
         rows = conn.execute(
-            '''SELECT * FROM message_threads
-               WHERE owner_id = ? OR participant_id = ?
-               ORDER BY updated_at DESC''',
-            (user_id, user_id)
+            f'''SELECT m.message_id, m.thread_id, m.sender_id, m.created_at, u.name AS sender_name, r.title AS resource_title,
+                       snippet(messages_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16) AS snippet
+                FROM messages_fts
+                JOIN messages m ON m.message_id = messages_fts.rowid
+                {scope}
+                JOIN message_threads t ON t.thread_id = m.thread_id
+                JOIN users u ON u.user_id = m.sender_id
+                LEFT JOIN resources r ON r.resource_id = t.resource_id
+                WHERE messages_fts MATCH ?
+                ORDER BY messages_fts.rank
+                LIMIT ? OFFSET ?''',
+            tuple(params)
         ).fetchall()
-        return [MessageDAL._thread_row(row) for row in rows]
+        return [
+            MessageSearchHit(
+                message_id=row['message_id'],
+                thread_id=row['thread_id'],
+                sender_id=row['sender_id'],
+                sender_name=row['sender_name'],
+                resource_title=row['resource_title'],
+                snippet=highlight_snippet(row['snippet']),
+                created_at=row['created_at'],
+            )
+            for row in rows
+        ]
 
     @staticmethod
-    def post_message(thread_id: int, sender_id: int, body: str) -> Message:
+    def thread_channel(thread_id: int) -> str:
+        return f'thread:{thread_id}'
+
+    @staticmethod
+    def user_channel(user_id: int) -> str:
+        return f'user:{user_id}'
+
+    @staticmethod
+    def _event_payload(event_id: int, message: Message) -> dict:
+        return {
+            'event_id': event_id,
+            'message_id': message.message_id,
+            'thread_id': message.thread_id,
+            'sender_id': message.sender_id,
+            'body': message.display_body,
+            'created_at': message.created_at,
+        }
+
+    @staticmethod
+    def get_events_since(channel: str, after_event_id: int, limit: int = 100) -> List[dict]:
+        """Change-table read used to resume SSE streams and to relay messages posted by other workers."""
+        conn = get_connection()
+        columns = ', '.join(f'm.{column}' for column in MESSAGE_COLUMNS)
+        rows = conn.execute(
+            f'''SELECT {columns}, e.event_id FROM message_events e
+               JOIN messages m ON m.message_id = e.message_id
+               WHERE e.channel = ? AND e.event_id > ?
+               ORDER BY e.event_id ASC
+               LIMIT ?''',
+            (channel, after_event_id, limit)
+        ).fetchall()
+        return [MessageDAL._event_payload(row['event_id'], _message(None, row)) for row in rows]
+
+    @staticmethod
+    def latest_event_id(channel: str) -> int:
+        conn = get_connection()
+        row = conn.execute('SELECT MAX(event_id) AS latest FROM message_events WHERE channel = ?', (channel,)).fetchone()
+        return row['latest'] or 0
+
+    @staticmethod
+    def prune_events(max_age_hours: int = 24) -> int:
         conn = get_connection()
         cursor = conn.execute(
-            'INSERT INTO messages (thread_id, sender_id, body) VALUES (?, ?, ?)',
-            (thread_id, sender_id, body)
+            "DELETE FROM message_events WHERE created_at < datetime('now', ?)",
+            (f'-{max_age_hours} hours',)
         )
-        conn.execute('UPDATE message_threads SET updated_at = CURRENT_TIMESTAMP WHERE thread_id = ?', (thread_id,))
-        conn.commit()
-        return MessageDAL.get_message_by_id(cursor.lastrowid)
+        commit(conn)
+        return cursor.rowcount
 
     @staticmethod
     def get_message_by_id(message_id: int) -> Optional[Message]:
-        conn = get_connection()
-        row = conn.execute('SELECT * FROM messages WHERE message_id = ?', (message_id,)).fetchone()
-        return MessageDAL._message_row(row)
+        return fetch_one(_message, f'{_SELECT_MESSAGE} WHERE message_id = ?', (message_id,))
 
     @staticmethod
-    def get_messages_for_thread(thread_id: int, limit: int = 50) -> List[Message]:
-        conn = get_connection()
-        rows = conn.execute(
-            'SELECT * FROM messages WHERE thread_id = ? ORDER BY created_at ASC LIMIT ?',
-            (thread_id, limit)
-        ).fetchall()
-        return [MessageDAL._message_row(row) for row in rows]
+    def get_messages_for_thread(thread_id: int, limit: int = 50, before_id: int | None = None) -> List[Message]:
+        """Return the newest ``limit`` messages (older than ``before_id`` when given), oldest first."""
+        if before_id is None:
+            messages = fetch_all(
+                _message, f'{_SELECT_MESSAGE} WHERE thread_id = ? ORDER BY message_id DESC LIMIT ?', (thread_id, limit)
+            )
+        else:
+            messages = fetch_all(
+                _message,
+                f'{_SELECT_MESSAGE} WHERE thread_id = ? AND message_id < ? ORDER BY message_id DESC LIMIT ?',
+                (thread_id, before_id, limit)
+            )
+        messages.reverse()
+        return messages
+
+    @staticmethod
+    def get_thread_page(thread_id: int, limit: int = 50, before_id: int | None = None) -> Tuple[List[Message], int | None]:
+        """Return a page of messages plus the ``before`` cursor for the next older page, if any."""
+        messages = MessageDAL.get_messages_for_thread(thread_id, limit=limit + 1, before_id=before_id)
+        if len(messages) > limit:
+            messages = messages[1:]
+            return messages, messages[0].message_id
+        return messages, None
+
+    @staticmethod
+    def get_messages_since(thread_id: int, after_id: int, limit: int = 100) -> List[Message]:
+        """Return messages newer than ``after_id`` in posting order, for incremental refresh."""
+        return fetch_all(
+            _message,
+            f'{_SELECT_MESSAGE} WHERE thread_id = ? AND message_id > ? ORDER BY message_id ASC LIMIT ?',
+            (thread_id, after_id, limit)
+        )
+
+    @staticmethod
+    def iter_thread_messages(thread_id: int, after_id: int = 0, raw: bool = False,
+                             batch_size: int = 500) -> Iterator[Message | tuple]:
+        """Stream a whole thread in posting order; ``raw`` yields ``MESSAGE_COLUMNS`` tuples."""
+        return iter_rows(
+            f'{_SELECT_MESSAGE} WHERE thread_id = ? AND message_id > ? ORDER BY message_id',
+            (thread_id, after_id), batch_size, raw, None if raw else _message
+        )
+
+
+def backfill_thread_participants(conn) -> None:
+    """Assign canonical keys and inbox rows to threads created outside ``MessageDAL``."""
+    key_expr = "MIN({t}.owner_id, {t}.participant_id) || ':' || MAX({t}.owner_id, {t}.participant_id) || ':' || IFNULL({t}.resource_id, 0)"
+    conn.execute(
+        f'''UPDATE message_threads SET thread_key = {key_expr.format(t='message_threads')}
+            WHERE thread_key IS NULL
+              AND NOT EXISTS (SELECT 1 FROM message_threads keyed
+                              WHERE keyed.thread_key = {key_expr.format(t='message_threads')})
+              AND thread_id = (SELECT MIN(dup.thread_id) FROM message_threads dup
+                               WHERE {key_expr.format(t='dup')} = {key_expr.format(t='message_threads')})'''
+    )
+    conn.execute(
+        '''UPDATE message_threads
+           SET last_message_id = (SELECT MAX(m.message_id) FROM messages m WHERE m.thread_id = message_threads.thread_id)
+           WHERE last_message_id IS NULL'''
+    )
+    missing = 'NOT EXISTS (SELECT 1 FROM thread_participants p WHERE p.thread_id = t.thread_id)'
+    conn.execute(_PARTICIPANT_ROWS_SQL.format(where=missing, preview=PREVIEW_LENGTH, hidden=HIDDEN_MESSAGE_TEXT))
+    conn.execute(
+        '''UPDATE thread_participants
+           SET last_read_message_id = (SELECT IFNULL(t.last_message_id, 0) FROM message_threads t
+                                       WHERE t.thread_id = thread_participants.thread_id)
+           WHERE last_read_message_id IS NULL'''
+    )
+    conn.commit()
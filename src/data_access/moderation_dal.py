@@ -0,0 +1,177 @@
+"""Moderation flags and the persisted text signatures behind automatic flagging."""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from src.data_access.db import commit, get_connection, iter_rows
+
+FLAG_STATUSES = ('open', 'dismissed', 'actioned')
+TERM_ACTIONS = ('flag', 'hide')
+EXCERPT_LENGTH = 200
+
+
+@dataclass
+class ModerationTerm:
+    term_id: int
+    term: str
+    action: str
+    created_at: str
+
+
+@dataclass
+class ContentFlag:
+    flag_id: int
+    kind: str
+    ref_id: int
+    reason: str
+    matched_kind: str | None
+    matched_ref_id: int | None
+    score: float | None
+    status: str
+    created_at: str
+    detail: str | None = None
+    excerpt: str | None = None
+    matched_excerpt: str | None = None
+
+    @property
+    def matched_terms(self) -> List[str]:
+        """Distinct terms from a ``blocked_term`` flag's ``[[start, end, term], ...]`` spans."""
+        if not self.detail:
+            return []
+        return list(dict.fromkeys(span[2] for span in json.loads(self.detail)))
+
+
+# Text for either side of a flag, resolved by kind without a UNION over both tables.
+_EXCERPT_SQL = '''CASE {kind} WHEN 'review' THEN (SELECT substr(comment, 1, {length}) FROM reviews WHERE review_id = {ref})
+                              ELSE (SELECT substr(body, 1, {length}) FROM messages WHERE message_id = {ref}) END'''
+
+
+class ModerationDAL:
+    @staticmethod
+    def _flag_row(row) -> Optional[ContentFlag]:
+        if not row:
+            return None
+        return ContentFlag(
+            flag_id=row['flag_id'],
+            kind=row['kind'],
+            ref_id=row['ref_id'],
+            reason=row['reason'],
+            matched_kind=row['matched_kind'],
+            matched_ref_id=row['matched_ref_id'],
+            score=row['score'],
+            status=row['status'],
+            created_at=row['created_at'],
+            detail=row['detail'],
+            excerpt=row['excerpt'],
+            matched_excerpt=row['matched_excerpt'],
+        )
+
+    @staticmethod
+    def save_signatures(rows: Iterable[Tuple[str, int, bytes]]) -> None:
+        """Store packed signatures as ``(kind, ref_id, blob)``; existing rows are left alone."""
+        conn = get_connection()
+        conn.executemany(
+            'INSERT OR IGNORE INTO content_signatures (kind, ref_id, signature) VALUES (?, ?, ?)',
+            list(rows)
+        )
+
+    @staticmethod
+    def signatures_since(after_id: int, batch_size: int = 500) -> Iterator[tuple]:
+        """Stream ``(signature_id, kind, ref_id, blob)`` rows appended after ``after_id``, oldest first."""
+        return iter_rows(
+            'SELECT signature_id, kind, ref_id, signature FROM content_signatures WHERE signature_id > ? ORDER BY signature_id',
+            (after_id,), batch_size, raw=True
+        )
+
+    @staticmethod
+    def last_signature_id() -> int:
+        conn = get_connection()
+        return conn.execute('SELECT IFNULL(MAX(signature_id), 0) FROM content_signatures').fetchone()[0]
+
+    @staticmethod
+    def flag(kind: str, ref_id: int, reason: str, matched_kind: str | None = None,
+             matched_ref_id: int | None = None, score: float | None = None, detail: str | None = None) -> None:
+        """Open a flag; a row already flagged for the same reason keeps its original flag."""
+        conn = get_connection()
+        conn.execute(
+            '''INSERT OR IGNORE INTO content_flags (kind, ref_id, reason, matched_kind, matched_ref_id, score, detail)
+               VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            (kind, ref_id, reason, matched_kind, matched_ref_id, score, detail)
+        )
+
+    @staticmethod
+    def list_flags(status: str = 'open', limit: int = 50, offset: int = 0) -> List[ContentFlag]:
+        conn = get_connection()
+        rows = conn.execute(
+            f'''SELECT f.*,
+                       {_EXCERPT_SQL.format(kind='f.kind', ref='f.ref_id', length=EXCERPT_LENGTH)} AS excerpt,
+                       {_EXCERPT_SQL.format(kind='f.matched_kind', ref='f.matched_ref_id', length=EXCERPT_LENGTH)} AS matched_excerpt
+                FROM content_flags f
+                WHERE f.status = ?
+                ORDER BY f.flag_id DESC
+                LIMIT ? OFFSET ?''',
+            (status, limit, offset)
+        ).fetchall()
+        return [ModerationDAL._flag_row(row) for row in rows]
+
+    @staticmethod
+    def get_flag(flag_id: int) -> Optional[ContentFlag]:
+        conn = get_connection()
+        row = conn.execute(
+            'SELECT *, NULL AS excerpt, NULL AS matched_excerpt FROM content_flags WHERE flag_id = ?', (flag_id,)
+        ).fetchone()
+        return ModerationDAL._flag_row(row)
+
+    @staticmethod
+    def flags_for(kind: str, ref_id: int) -> List[ContentFlag]:
+        conn = get_connection()
+        rows = conn.execute(
+            'SELECT *, NULL AS excerpt, NULL AS matched_excerpt FROM content_flags WHERE kind = ? AND ref_id = ? ORDER BY flag_id',
+            (kind, ref_id)
+        ).fetchall()
+        return [ModerationDAL._flag_row(row) for row in rows]
+
+    @staticmethod
+    def resolve_flag(flag_id: int, status: str) -> None:
+        if status not in FLAG_STATUSES:
+            raise ValueError(f'Unknown flag status: {status}')
+        conn = get_connection()
+        conn.execute(
+            'UPDATE content_flags SET status = ?, resolved_at = CURRENT_TIMESTAMP WHERE flag_id = ?',
+            (status, flag_id)
+        )
+        commit(conn)
+
+    @staticmethod
+    def list_terms() -> List[ModerationTerm]:
+        conn = get_connection()
+        rows = conn.execute('SELECT * FROM moderation_terms ORDER BY term').fetchall()
+        return [
+            ModerationTerm(term_id=row['term_id'], term=row['term'], action=row['action'], created_at=row['created_at'])
+            for row in rows
+        ]
+
+    @staticmethod
+    def terms_version() -> tuple:
+        """Changes on every add, removal or re-action: saves always take a fresh, never-reused id."""
+        conn = get_connection()
+        return tuple(conn.execute('SELECT COUNT(*), IFNULL(MAX(term_id), 0) FROM moderation_terms').fetchone())
+
+    @staticmethod
+    def save_term(term: str, action: str = 'flag') -> None:
+        if action not in TERM_ACTIONS:
+            raise ValueError(f'Unknown term action: {action}')
+        conn = get_connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO moderation_terms (term, action) VALUES (?, ?)',
+            (term.strip().lower(), action)
+        )
+        commit(conn)
+
+    @staticmethod
+    def delete_term(term_id: int) -> None:
+        conn = get_connection()
+        conn.execute('DELETE FROM moderation_terms WHERE term_id = ?', (term_id,))
+        commit(conn)
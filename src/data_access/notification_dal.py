@@ -1,29 +1,248 @@
 """Notification helpers."""
 from __future__ import annotations
 
-from typing import List
+import time
+from typing import List, Sequence
 
-from src.data_access.db import get_connection
+from flask import current_app
+
+from src.data_access.db import commit, get_connection, in_transaction, on_commit
+from src.utils.notification_feed import NotificationFeed
+
+DEFAULT_EMAIL_SUBJECT = 'Campus Resource Hub update'
+NOTIFICATION_COLUMNS = (
+    'n.notification_id, n.user_id, n.message, n.kind, n.resource_id, n.item_count, '
+    'n.first_item_id, n.last_item_id, n.created_at, n.updated_at'
+)
+
+# Read-time expansion queries per coalescible kind: (resource_id, first_item_id, last_item_id, recipient).
+_EXPANSIONS = {
+    'booking_request': '''SELECT b.booking_id, b.start_datetime, b.end_datetime, b.status, b.created_at,
+                                 u.name AS requester_name
+                          FROM bookings b JOIN users u ON u.user_id = b.requester_id
+                          WHERE b.resource_id = ? AND b.booking_id BETWEEN ? AND ? AND b.requester_id != ?
+                          ORDER BY b.booking_id''',
+}
 
 
 class NotificationDAL:
     @staticmethod
-    def create_notification(user_id: int, message: str):
+    def create_notification(user_id: int, message: str, email_subject: str | None = DEFAULT_EMAIL_SUBJECT,
+                            kind: str | None = None, resource_id: int | None = None,
+                            item_id: int | None = None, digest: str | None = None):
+        """Record an in-app notification and, when mail is configured, queue its email in the outbox.
+
+        Both rows are written on the caller's connection, so inside ``transaction()`` they commit
+        atomically with the business change; delivery happens later on the outbox workers.
+
+        Notifications with a ``kind`` and ``digest`` coalesce: while an unread one for the same
+        (recipient, kind, resource) is younger than ``NOTIFICATION_COALESCE_WINDOW_MINUTES``, new
+        items fold into it and its text becomes ``digest`` with ``{count}`` filled in. The group's
+        email is held until the window closes so a single digest goes out.
+        """
+        conn = get_connection()
+        config = current_app.config
+        window = config['NOTIFICATION_COALESCE_WINDOW_MINUTES']
+        if kind and digest and window:
+            group = conn.execute(
+                '''SELECT notification_id, item_count FROM notifications
+                   WHERE user_id = ? AND kind = ? AND resource_id IS ? AND is_read = 0
+                     AND created_at >= datetime('now', ?)
+                     AND notification_id > IFNULL((SELECT read_through_id FROM notification_read_marks WHERE user_id = ?), 0)
+                   ORDER BY notification_id DESC
+                   LIMIT 1''',
+                (user_id, kind, resource_id, f'-{window} minutes', user_id)
+            ).fetchone()
+            if group:
+                count = group['item_count'] + 1
+                text = digest.replace('{count}', str(count))
+                conn.execute(
+                    '''UPDATE notifications
+                       SET message = ?, item_count = ?, last_item_id = IFNULL(?, last_item_id), updated_at = CURRENT_TIMESTAMP
+                       WHERE notification_id = ?''',
+                    (text, count, item_id, group['notification_id'])
+                )
+                conn.execute(
+                    "UPDATE notification_outbox SET body = ? WHERE notification_id = ? AND status = 'pending'",
+                    (text, group['notification_id'])
+                )
+                commit(conn)
+                on_commit(lambda: NotificationFeed.invalidate(user_id))
+                return
+
+        cursor = conn.execute(
+            '''INSERT INTO notifications (user_id, message, kind, resource_id, first_item_id, last_item_id)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            (user_id, message, kind, resource_id, item_id, item_id)
+        )
+        queued = False
+        if email_subject and config.get('MAIL_SERVER') and NotificationDAL._under_email_limit(conn, user_id):
+            hold_minutes = window if kind and digest else 0
+            outbox = conn.execute(
+                '''INSERT INTO notification_outbox (user_id, notification_id, recipient, subject, body, next_attempt_at)
+                   SELECT user_id, ?, email, ?, ?, datetime('now', ?) FROM users WHERE user_id = ?''',
+                (cursor.lastrowid, email_subject, message, f'+{hold_minutes} minutes', user_id)
+            )
+            queued = bool(outbox.rowcount) and not hold_minutes
+        commit(conn)
+        on_commit(lambda: NotificationFeed.invalidate(user_id))
+        dispatcher = current_app.extensions.get('notification_outbox')
+        if queued and dispatcher:
+            on_commit(dispatcher.wake)
+
+    @staticmethod
+    def _under_email_limit(conn, user_id: int) -> bool:
+        limit = current_app.config['NOTIFICATION_EMAIL_HOURLY_LIMIT']
+        if not limit:
+            return True
+        recent = conn.execute(
+            "SELECT COUNT(*) FROM notification_outbox WHERE user_id = ? AND created_at >= datetime('now', '-1 hour')",
+            (user_id,)
+        ).fetchone()[0]
+        return recent < limit
+
+    @staticmethod
+    def expand(notification_id: int, user_id: int) -> List[dict]:
+        """Individual items behind a (possibly coalesced) notification, resolved from the source rows."""
         conn = get_connection()
-        conn.execute('INSERT INTO notifications (user_id, message) VALUES (?, ?)', (user_id, message))
-        conn.commit()
+        note = conn.execute(
+            'SELECT * FROM notifications WHERE notification_id = ? AND user_id = ?',
+            (notification_id, user_id)
+        ).fetchone()
+        if not note or note['kind'] not in _EXPANSIONS or note['first_item_id'] is None:
+            return []
+        rows = conn.execute(
+            _EXPANSIONS[note['kind']],
+            (note['resource_id'], note['first_item_id'], note['last_item_id'], user_id)
+        ).fetchall()
+        return [dict(row) for row in rows]
 
     @staticmethod
-    def list_for_user(user_id: int, limit: int = 10) -> List[dict]:
+    def list_for_user(user_id: int, limit: int = 10, before_id: int | None = None,
+                      ids: Sequence[int] | None = None) -> List[dict]:
+        """Newest notifications first; ``is_read`` folds in the user's mark-all-read high-water mark.
+
+        ``before_id`` continues after that notification's ``(updated_at, notification_id)``
+        position; ``ids`` restricts the list to those notifications.
+        """
         conn = get_connection()
+        clauses, params = ['n.user_id = ?'], [user_id]
+        if before_id is not None:
+            clauses.append('(n.updated_at, n.notification_id) < '
+                           '(SELECT updated_at, notification_id FROM notifications WHERE notification_id = ?)')
+            params.append(before_id)
+        if ids is not None:
+            clauses.append(f"n.notification_id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
         rows = conn.execute(
-            'SELECT * FROM notifications WHERE user_id = ? ORDER BY created_at DESC LIMIT ?',
-            (user_id, limit)
+            f'''SELECT {NOTIFICATION_COLUMNS},
+                       (n.is_read OR n.notification_id <= IFNULL(m.read_through_id, 0)) AS is_read
+                FROM notifications n
+                LEFT JOIN notification_read_marks m ON m.user_id = n.user_id
+                WHERE {' AND '.join(clauses)}
+                ORDER BY n.updated_at DESC, n.notification_id DESC
+                LIMIT ?''',
+            (*params, limit)
         ).fetchall()
         return [dict(row) for row in rows]
 
+    @staticmethod
+    def count_unread(user_id: int) -> int:
+        conn = get_connection()
+        return conn.execute(
+            '''SELECT COUNT(*) FROM notifications
+               WHERE user_id = ? AND is_read = 0
+                 AND notification_id > IFNULL((SELECT read_through_id FROM notification_read_marks WHERE user_id = ?), 0)''',
+            (user_id, user_id)
+        ).fetchone()[0]
+
     @staticmethod
     def mark_all_read(user_id: int):
+        """Move the user's read high-water mark to their newest notification instead of touching every row."""
+        conn = get_connection()
+        conn.execute(
+            '''INSERT INTO notification_read_marks (user_id, read_through_id)
+               SELECT ?, IFNULL(MAX(notification_id), 0) FROM notifications WHERE user_id = ?
+               ON CONFLICT(user_id) DO UPDATE SET read_through_id = MAX(read_through_id, excluded.read_through_id)''',
+            (user_id, user_id)
+        )
+        commit(conn)
+        on_commit(lambda: NotificationFeed.invalidate(user_id))
+
+    @staticmethod
+    def compact(retention_days: int, batch_size: int = 500, archive: bool = True, pause: float = 0.05) -> int:
+        """Archive (or delete) notifications older than ``retention_days`` in short batches.
+
+        Each batch commits on its own and the loop sleeps ``pause`` seconds between batches, so
+        request writers are never blocked behind one long-running delete.
+        """
+        if in_transaction():
+            raise RuntimeError('compact() commits batch by batch and cannot run inside transaction()')
+        conn = get_connection()
+        moved = 0
+        while True:
+            ids = [
+                row[0] for row in conn.execute(
+                    '''SELECT notification_id FROM notifications
+                       WHERE created_at < datetime('now', ?)
+                       ORDER BY created_at
+                       LIMIT ?''',
+                    (f'-{retention_days} days', batch_size)
+                ).fetchall()
+            ]
+            if not ids:
+                return moved
+            placeholders = ', '.join('?' for _ in ids)
+            if archive:
+                conn.execute(
+                    f'''INSERT OR IGNORE INTO notifications_archive
+                            (notification_id, user_id, message, is_read, kind, resource_id, item_count, created_at, updated_at)
+                        SELECT notification_id, user_id, message, is_read, kind, resource_id, item_count, created_at, updated_at
+                        FROM notifications WHERE notification_id IN ({placeholders})''',
+                    ids
+                )
+            conn.execute(f'DELETE FROM notifications WHERE notification_id IN ({placeholders})', ids)
+            conn.commit()
+            moved += len(ids)
+            if len(ids) < batch_size:
+                return moved
+            time.sleep(pause)
+
+    @staticmethod
+    def purge_outbox(retention_days: int, batch_size: int = 500) -> int:
+        """Drop delivered and dead-lettered outbox rows past the retention window, one committed batch at a time."""
+        if in_transaction():
+            raise RuntimeError('purge_outbox() commits batch by batch and cannot run inside transaction()')
+        conn = get_connection()
+        removed = 0
+        while True:
+            cursor = conn.execute(
+                '''DELETE FROM notification_outbox WHERE outbox_id IN (
+                       SELECT outbox_id FROM notification_outbox
+                       WHERE status IN ('sent', 'dead') AND created_at < datetime('now', ?)
+                       LIMIT ?)''',
+                (f'-{retention_days} days', batch_size)
+            )
+            conn.commit()
+            removed += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return removed
+
+    @staticmethod
+    def outbox_counts() -> dict:
+        conn = get_connection()
+        rows = conn.execute('SELECT status, COUNT(*) AS total FROM notification_outbox GROUP BY status').fetchall()
+        return {row['status']: row['total'] for row in rows}
+
+    @staticmethod
+    def get_notification(notification_id: int, user_id: int) -> dict | None:
         conn = get_connection()
-        conn.execute('UPDATE notifications SET is_read = 1 WHERE user_id = ?', (user_id,))
-        conn.commit()
+        row = conn.execute(
+            f'''SELECT {NOTIFICATION_COLUMNS},
+                       (n.is_read OR n.notification_id <= IFNULL(m.read_through_id, 0)) AS is_read
+                FROM notifications n
+                LEFT JOIN notification_read_marks m ON m.user_id = n.user_id
+                WHERE n.notification_id = ? AND n.user_id = ?''',
+            (notification_id, user_id)
+        ).fetchone()
+        return dict(row) if row else None
@@ -1,13 +1,20 @@
 """Data access helpers for resources."""
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterator, List, Optional, Sequence, Tuple
 
-from src.data_access.db import get_connection
+from flask import current_app
 
+from src.data_access.db import commit, fetch_all, fetch_one, get_connection, iter_rows, model_factory, on_commit
+from src.data_access.stats_dal import CATALOG_VERSION, StatsDAL
+from src.utils.fuzzy_search import FuzzyResourceIndex
+from src.utils.notification_feed import NotificationFeed
+from src.utils.search_cache import SearchCache
 
-@dataclass
+
+@dataclass(slots=True)
 class Resource:
     resource_id: int
     owner_id: int
@@ -19,35 +26,94 @@ class Resource:
     availability_notes: str | None
     status: str
     gallery: List[str]
+    rating_sum: int = 0
+    rating_count: int = 0
+    rating_score: float = 0
 
+    @property
+    def rating_average(self) -> float:
+        return self.rating_sum / self.rating_count if self.rating_count else 0
 
-class ResourceDAL:
-    @staticmethod
-    def _row_to_resource(row) -> Optional[Resource]:
-        if row is None:
-            return None
-        gallery_rows = ResourceDAL._fetch_gallery(row['resource_id'])
-        return Resource(
-            resource_id=row['resource_id'],
-            owner_id=row['owner_id'],
-            title=row['title'],
-            summary=row['summary'],
-            category=row['category'],
-            location=row['location'],
-            capacity=row['capacity'],
-            availability_notes=row['availability_notes'],
-            status=row['status'],
-            gallery=gallery_rows,
-        )
 
-    @staticmethod
-    def _fetch_gallery(resource_id: int) -> List[str]:
-        conn = get_connection()
-        rows = conn.execute(
-            'SELECT file_path FROM resource_images WHERE resource_id = ? ORDER BY image_id ASC',
-            (resource_id,)
-        ).fetchall()
-        return [row['file_path'] for row in rows]
+RESOURCE_COLUMNS = ('resource_id', 'owner_id', 'title', 'summary', 'category', 'location', 'capacity',
+                    'availability_notes', 'status', 'rating_sum', 'rating_count', 'rating_score')
+GALLERY_SEPARATOR = '\x1f'
+# A resource's image paths, in upload order, folded into one column so listings need no per-row query.
+_GALLERY_SQL = (
+    "(SELECT group_concat(file_path, char(31)) FROM "
+    "(SELECT file_path FROM resource_images i WHERE i.resource_id = resources.resource_id ORDER BY i.image_id))"
+)
+_resource = model_factory(
+    Resource, (*RESOURCE_COLUMNS, 'gallery'),
+    intern=('category', 'location', 'status'),
+    convert={'gallery': lambda paths: paths.split(GALLERY_SEPARATOR) if paths else []},
+)
+_SELECT = f"SELECT {', '.join(RESOURCE_COLUMNS)}, {_GALLERY_SQL} AS gallery FROM resources"
+
+
+@dataclass(slots=True)
+class ResourceCard:
+    """What browse, dashboard and related-resource lists render: no gallery, long text clipped."""
+    resource_id: int
+    owner_id: int
+    title: str
+    summary: str
+    category: str
+    location: str
+    capacity: int
+    availability_notes: str | None
+    status: str
+    rating_sum: int = 0
+    rating_count: int = 0
+
+    @property
+    def rating_average(self) -> float:
+        return self.rating_sum / self.rating_count if self.rating_count else 0
+
+
+# Cards show at most this much of summary/availability_notes; one extra character is kept so
+# templates can still tell whether to add an ellipsis.
+CARD_TEXT_LENGTH = 160
+CARD_COLUMNS = ('resource_id', 'owner_id', 'title', 'summary', 'category', 'location', 'capacity',
+                'availability_notes', 'status', 'rating_sum', 'rating_count')
+_CLIPPED = ('summary', 'availability_notes')
+_card = model_factory(ResourceCard, CARD_COLUMNS, intern=('category', 'location', 'status'))
+_SELECT_CARD = 'SELECT {} FROM resources'.format(', '.join(
+    f'substr({column}, 1, {CARD_TEXT_LENGTH + 1}) AS {column}' if column in _CLIPPED else column
+    for column in CARD_COLUMNS
+))
+
+
+def _search_filters(keyword, category, location, min_capacity, status) -> Tuple[str, List[object]]:
+    clauses = []
+    params: List[object] = []
+    if status:
+        clauses.append('status = ?')
+        params.append(status)
+    if keyword:
+        clauses.append('(title LIKE ? OR summary LIKE ?)')
+        params.extend([f'%{keyword}%', f'%{keyword}%'])
+    if category:
+        clauses.append('category = ?')
+        params.append(category)
+    if location:
+        clauses.append('location LIKE ?')
+        params.append(f'%{location}%')
+    if min_capacity is not None:
+        clauses.append('capacity >= ?')
+        params.append(min_capacity)
+    return ' AND '.join(clauses) if clauses else '1=1', params
+
+
+class ResourceDAL:
+    # Browse orderings; "top_rated" walks idx_resources_status_score instead of aggregating reviews.
+    # "id" is the keyset order ``after_id`` pages through.
+    SORTS = {
+        'newest': 'created_at DESC',
+        'top_rated': 'rating_score DESC, resource_id DESC',
+        'id': 'resource_id DESC',
+    }
+    COLUMNS = RESOURCE_COLUMNS  # order of ``iter_resources(raw=True)`` tuples
 
     @staticmethod
     def create_resource(owner_id: int, title: str, summary: str, category: str, location: str,
@@ -64,7 +130,8 @@ class ResourceDAL:
                 'INSERT INTO resource_images (resource_id, file_path) VALUES (?, ?)',
                 (resource_id, path)
             )
-        conn.commit()
+        commit(conn)
+        on_commit(NotificationFeed.invalidate_all)
         return ResourceDAL.get_resource_by_id(resource_id)
 
     @staticmethod
@@ -82,84 +149,161 @@ class ResourceDAL:
                 f"UPDATE resources SET {', '.join(clauses)}, updated_at = CURRENT_TIMESTAMP WHERE resource_id = ?",
                 params
             )
+            if 'title' in fields:
+                conn.execute(
+                    'UPDATE thread_participants SET resource_title = ? WHERE resource_id = ?',
+                    (fields['title'], resource_id)
+                )
         if gallery is not None:
             conn.execute('DELETE FROM resource_images WHERE resource_id = ?', (resource_id,))
             for path in gallery:
                 conn.execute('INSERT INTO resource_images (resource_id, file_path) VALUES (?, ?)', (resource_id, path))
-        conn.commit()
+        commit(conn)
+        on_commit(NotificationFeed.invalidate_all)
 
     @staticmethod
     def get_resource_by_id(resource_id: int) -> Optional[Resource]:
-        conn = get_connection()
-        row = conn.execute('SELECT * FROM resources WHERE resource_id = ?', (resource_id,)).fetchone()
-        return ResourceDAL._row_to_resource(row)
+        return fetch_one(_resource, f'{_SELECT} WHERE resource_id = ?', (resource_id,))
 
     @staticmethod
-    def get_resources_by_owner(owner_id: int) -> List[Resource]:
-        conn = get_connection()
-        rows = conn.execute(
-            'SELECT * FROM resources WHERE owner_id = ? ORDER BY created_at DESC',
-            (owner_id,)
-        ).fetchall()
-        return [ResourceDAL._row_to_resource(row) for row in rows]
+    def get_resources_by_owner(owner_id: int) -> List[ResourceCard]:
+        return fetch_all(_card, f'{_SELECT_CARD} WHERE owner_id = ? ORDER BY created_at DESC', (owner_id,))
 
     @staticmethod
-    def search_resources(keyword=None, category=None, location=None, min_capacity=None, status='published') -> List[Resource]:
-        clauses = []
-        params: List[object] = []
-        if status:
-            clauses.append('status = ?')
-            params.append(status)
-        if keyword:
-            clauses.append('(title LIKE ? OR summary LIKE ?)')
-            params.extend([f'%{keyword}%', f'%{keyword}%'])
-        if category:
-            clauses.append('category = ?')
-            params.append(category)
-        if location:
-            clauses.append('location LIKE ?')
-            params.append(f'%{location}%')
-        if min_capacity is not None:
-            clauses.append('capacity >= ?')
-            params.append(min_capacity)
-        where = ' AND '.join(clauses) if clauses else '1=1'
-        query = f'SELECT * FROM resources WHERE {where} ORDER BY created_at DESC'
-        conn = get_connection()
-        rows = conn.execute(query, tuple(params)).fetchall()
-        return [ResourceDAL._row_to_resource(row) for row in rows]
+    def search_resources(keyword=None, category=None, location=None, min_capacity=None, status='published',
+                         sort: str = 'newest', limit: int | None = None,
+                         after_id: int | None = None) -> List[ResourceCard]:
+        if not current_app.config['SEARCH_CACHE_BYTES']:
+            return list(ResourceDAL.iter_resources(keyword, category, location, min_capacity, status, sort, limit,
+                                                   after_id=after_id))
+        ids = ResourceDAL.search_ids(keyword, category, location, min_capacity, status, sort)
+        if after_id is not None:
+            ids = [resource_id for resource_id in ids if resource_id < after_id]
+        return ResourceDAL.get_cards(ids[:limit] if limit is not None else ids)
 
     @staticmethod
-    def get_featured_resources(limit: int = 4) -> List[Resource]:
-        conn = get_connection()
-        rows = conn.execute(
-            'SELECT * FROM resources WHERE status = ? ORDER BY created_at DESC LIMIT ?',
-            ('published', limit)
-        ).fetchall()
-        return [ResourceDAL._row_to_resource(row) for row in rows]
+    def search_page(keyword=None, category=None, location=None, min_capacity=None, status='published',
+                    sort: str = 'newest', page: int = 1, page_size: int = 24) -> Tuple[List[ResourceCard], int]:
+        """One page of matching cards and the total match count; only the page's cards are loaded."""
+        ids = ResourceDAL.search_ids(keyword, category, location, min_capacity, status, sort)
+        start = (max(page, 1) - 1) * page_size
+        return ResourceDAL.get_cards(ids[start:start + page_size]), len(ids)
+
+    @staticmethod
+    def fuzzy_search(keyword=None, category=None, location=None, min_capacity=None, status='published',
+                     limit: int = 24) -> List[ResourceCard]:
+        """Closest cards for a misspelt keyword/location, best first (see ``FuzzyResourceIndex``).
+
+        The words of ``keyword`` and ``location`` are matched against titles, locations and
+        categories with a few typos allowed; the remaining filters are applied exactly. The index
+        holds every resource, drafts included, so ranked hits are pulled in widening windows until
+        ``limit`` of them pass the filters or the index runs out.
+        """
+        text = ' '.join(part for part in (keyword, location) if part)
+        matches: List[ResourceCard] = []
+        checked, window = 0, limit * 4
+        while True:
+            hits = FuzzyResourceIndex.search(text, window)
+            cards = ResourceDAL.get_cards([resource_id for resource_id, _, _ in hits[checked:]])
+            matches.extend(
+                card for card in cards
+                if (status is None or card.status == status) and (not category or card.category == category)
+                and (min_capacity is None or card.capacity >= min_capacity)
+            )
+            if len(matches) >= limit or len(hits) < window:
+                return matches[:limit]
+            checked, window = len(hits), window * 4
+
+    @staticmethod
+    def search_ids(keyword=None, category=None, location=None, min_capacity=None, status='published',
+                   sort: str = 'newest') -> Sequence[int]:
+        """Ordered ids of every match, cached per normalised filter set (see ``SearchCache``).
+
+        Keywords and locations match case-insensitively anyway, so ASCII ones are lowercased
+        (and spaces collapsed) before they reach the key or the query; ``LIKE`` only folds ASCII
+        case, so anything else is left as typed. ``min_capacity`` is widened
+        to a power-of-two bucket for the cached entry, which keeps each id's capacity so the exact
+        bound is applied on the way out: "4 seats" and "5 seats" share one entry.
+        """
+        keyword = ' '.join((keyword or '').split()) or None
+        if keyword and keyword.isascii():
+            keyword = keyword.lower()
+        location = ' '.join((location or '').split()) or None
+        if location and location.isascii():
+            location = location.lower()
+        bucket = None if min_capacity is None else 1 << (max(min_capacity, 1).bit_length() - 1)
+        sort = sort if sort in ResourceDAL.SORTS else 'newest'
+        key = (keyword, category or None, location, bucket, status, sort)
+        max_bytes = current_app.config['SEARCH_CACHE_BYTES']
+        version = StatsDAL.get(CATALOG_VERSION) if max_bytes else None
+        cached = SearchCache.lookup(key, version) if max_bytes else None
+        if cached is None:
+            where, params = _search_filters(keyword, category, location, bucket, status)
+            rows = get_connection().execute(
+                f'SELECT resource_id, capacity FROM resources WHERE {where} ORDER BY {ResourceDAL.SORTS[sort]}', params
+            ).fetchall()
+            cached = (array('q', [row[0] for row in rows]), array('l', [row[1] for row in rows]))
+            if max_bytes:
+                SearchCache.store(key, version, cached, max_bytes)
+        ids, capacities = cached
+        if bucket == min_capacity:
+            return ids
+        return [resource_id for resource_id, capacity in zip(ids, capacities) if capacity >= min_capacity]
+
+    @staticmethod
+    def get_cards(ids: Sequence[int]) -> List[ResourceCard]:
+        """Cards for ``ids`` in that order; ids that no longer exist are skipped."""
+        cards: dict = {}
+        for start in range(0, len(ids), 500):
+            chunk = list(ids[start:start + 500])
+            cards.update((card.resource_id, card) for card in fetch_all(
+                _card, f"{_SELECT_CARD} WHERE resource_id IN ({', '.join('?' * len(chunk))})", chunk))
+        return [cards[resource_id] for resource_id in ids if resource_id in cards]
+
+    @staticmethod
+    def iter_resources(keyword=None, category=None, location=None, min_capacity=None, status='published',
+                       sort: str = 'newest', limit: int | None = None, raw: bool = False,
+                       batch_size: int = 500, after_id: int | None = None,
+                       ids: Sequence[int] | None = None) -> Iterator[ResourceCard | tuple]:
+        """Stream ``search_resources`` results as cards; ``raw`` yields full ``COLUMNS`` tuples instead.
+
+        ``after_id`` continues a ``sort='id'`` walk below that resource; ``ids`` restricts the
+        results to those resources.
+        """
+        where, params = _search_filters(keyword, category, location, min_capacity, status)
+        if ids is not None:
+            where += f" AND resource_id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        if after_id is not None:
+            where += ' AND resource_id < ?'
+            params.append(after_id)
+        order = ResourceDAL.SORTS.get(sort, ResourceDAL.SORTS['newest'])
+        select = f"SELECT {', '.join(RESOURCE_COLUMNS)} FROM resources" if raw else _SELECT_CARD
+        query = f'{select} WHERE {where} ORDER BY {order}'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return iter_rows(query, params, batch_size, raw, None if raw else _card)
+
+    @staticmethod
+    def get_featured_resources(limit: int = 4) -> List[ResourceCard]:
+        return fetch_all(_card, f'{_SELECT_CARD} WHERE status = ? ORDER BY created_at DESC LIMIT ?', ('published', limit))
 
     @staticmethod
     def get_resource_stats():
-        conn = get_connection()
-        totals = conn.execute(
-            """SELECT
-                    COUNT(*) AS total,
-                    SUM(CASE WHEN status = 'published' THEN 1 ELSE 0 END) AS published,
-                    AVG(capacity) AS avg_capacity
-                FROM resources"""
-        ).fetchone()
-        if not totals:
-            return {'total': 0, 'published': 0, 'avg_capacity': 0}
+        """Home-page totals from the trigger-maintained counters; no scan of ``resources``."""
+        counts = StatsDAL.counters('resources')
+        total = counts.get('', 0)
         return {
-            'total': totals['total'] or 0,
-            'published': totals['published'] or 0,
-            'avg_capacity': totals['avg_capacity'] or 0,
+            'total': total,
+            'published': counts.get('status:published', 0),
+            'avg_capacity': counts.get('capacity', 0) / total if total else 0,
         }
 
     @staticmethod
-    def get_related_resources(category: str, exclude_id: int, limit: int = 3) -> List[Resource]:
-        conn = get_connection()
-        rows = conn.execute(
-            'SELECT * FROM resources WHERE category = ? AND resource_id != ? AND status = ? ORDER BY created_at DESC LIMIT ?',
+    def get_related_resources(category: str, exclude_id: int, limit: int = 3) -> List[ResourceCard]:
+        return fetch_all(
+            _card,
+            f'{_SELECT_CARD} WHERE category = ? AND resource_id != ? AND status = ? ORDER BY created_at DESC LIMIT ?',
             (category, exclude_id, 'published', limit)
-        ).fetchall()
-        return [ResourceDAL._row_to_resource(row) for row in rows]
+        )
@@ -2,12 +2,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 
-from src.data_access.db import get_connection
+from src.data_access.db import (
+    RATING_PRIOR_MEAN, RATING_PRIOR_WEIGHT, commit, fetch_all, fetch_one, get_connection, model_factory
+)
+from src.utils.content_filter import ContentFilter
+from src.utils.near_duplicates import NearDuplicateIndex
+from src.utils.fts import SNIPPET_END, SNIPPET_START, build_match_query, highlight_snippet
 
 
-@dataclass
+@dataclass(slots=True)
 class Review:
     review_id: int
     resource_id: int
@@ -15,49 +20,113 @@ class Review:
     rating: int
     comment: str | None
     created_at: str
+    is_hidden: bool = False
 
 
-class ReviewDAL:
-    @staticmethod
-    def _row(row) -> Optional[Review]:
-        if not row:
-            return None
-        return Review(
-            review_id=row['review_id'],
-            resource_id=row['resource_id'],
-            reviewer_id=row['reviewer_id'],
-            rating=row['rating'],
-            comment=row['comment'],
-            created_at=row['created_at'],
-        )
+@dataclass
+class RatingStats:
+    avg_rating: float
+    total_reviews: int
+    score: float
+    histogram: dict  # stars -> count, 5 down to 1
+
+    @property
+    def peak(self) -> int:
+        return max(self.histogram.values(), default=0)
+
+
+@dataclass
+class ReviewSearchHit:
+    review_id: int
+    resource_id: int
+    resource_title: str
+    reviewer_id: int
+    reviewer_name: str
+    rating: int
+    snippet: str
+    created_at: str
 
+
+REVIEW_COLUMNS = ('review_id', 'resource_id', 'reviewer_id', 'rating', 'comment', 'created_at', 'is_hidden')
+_review = model_factory(Review, REVIEW_COLUMNS, convert={'is_hidden': bool})
+_SELECT = f"SELECT {', '.join(REVIEW_COLUMNS)} FROM reviews"
+
+
+class ReviewDAL:
     @staticmethod
     def create_review(resource_id: int, reviewer_id: int, rating: int, comment: str | None):
         conn = get_connection()
+        screening = ContentFilter.screen(comment)
         cursor = conn.execute(
-            'INSERT INTO reviews (resource_id, reviewer_id, rating, comment) VALUES (?, ?, ?, ?)',
-            (resource_id, reviewer_id, rating, comment)
+            'INSERT INTO reviews (resource_id, reviewer_id, rating, comment, is_hidden) VALUES (?, ?, ?, ?, ?)',
+            (resource_id, reviewer_id, rating, comment, int(screening.hidden))
         )
-        conn.commit()
+        ContentFilter.record('review', cursor.lastrowid, screening)
+        NearDuplicateIndex.check('review', cursor.lastrowid, comment)
+        commit(conn)
         return ReviewDAL.get_review_by_id(cursor.lastrowid)
 
     @staticmethod
     def get_review_by_id(review_id: int) -> Optional[Review]:
-        conn = get_connection()
-        row = conn.execute('SELECT * FROM reviews WHERE review_id = ?', (review_id,)).fetchone()
-        return ReviewDAL._row(row)
+        return fetch_one(_review, f'{_SELECT} WHERE review_id = ?', (review_id,))
 
     @staticmethod
-    def list_for_resource(resource_id: int) -> List[Review]:
-        conn = get_connection()
-        rows = conn.execute('SELECT * FROM reviews WHERE resource_id = ? ORDER BY created_at DESC', (resource_id,)).fetchall()
-        return [ReviewDAL._row(row) for row in rows]
+    def list_for_resource(resource_id: int, limit: int = 10, before_id: int | None = None) -> List[Review]:
+        """Newest visible reviews first, reading a bounded range of ``idx_reviews_resource_visible``.
+
+        ``before_id`` is a keyset cursor: the page continues strictly after that review's
+        ``(created_at, review_id)`` position, so deep pages cost the same as the first one. A
+        cursor whose review has since been deleted falls back to the first page.
+        """
+        anchor = None
+        if before_id is not None:
+            anchor = get_connection().execute(
+                'SELECT created_at, review_id FROM reviews WHERE review_id = ?', (before_id,)
+            ).fetchone()
+        if anchor is None:
+            return fetch_all(
+                _review,
+                f'''{_SELECT}
+                   WHERE resource_id = ? AND is_hidden = 0
+                   ORDER BY created_at DESC, review_id DESC
+                   LIMIT ?''',
+                (resource_id, limit)
+            )
+        return fetch_all(
+            _review,
+            f'''{_SELECT}
+               WHERE resource_id = ? AND is_hidden = 0
+                 AND (created_at, review_id) < (?, ?)
+               ORDER BY created_at DESC, review_id DESC
+               LIMIT ?''',
+            (resource_id, anchor['created_at'], anchor['review_id'], limit)
+        )
+
+    @staticmethod
+    def get_review_page(resource_id: int, limit: int = 10, before_id: int | None = None) -> Tuple[List[Review], int | None]:
+        """Return a page of reviews plus the ``before`` cursor for the next older page, if any."""
+        reviews = ReviewDAL.list_for_resource(resource_id, limit=limit + 1, before_id=before_id)
+        if len(reviews) > limit:
+            reviews = reviews[:limit]
+            return reviews, reviews[-1].review_id
+        return reviews, None
+
+    @staticmethod
+    def get_visible_reviews(ids: Sequence[int], viewer_id: int | None = None) -> List[Review]:
+        """Unhidden reviews among ``ids`` whose resource is published or owned by ``viewer_id``."""
+        columns = ', '.join(f'v.{column}' for column in REVIEW_COLUMNS)
+        return fetch_all(
+            _review,
+            f'''SELECT {columns} FROM reviews v
+               JOIN resources r ON r.resource_id = v.resource_id
+               WHERE v.review_id IN ({', '.join('?' * len(ids))}) AND v.is_hidden = 0
+                 AND (r.status = 'published' OR r.owner_id = ?)''',
+            (*ids, viewer_id)
+        )
 
     @staticmethod
     def list_recent(limit: int = 10) -> List[Review]:
-        conn = get_connection()
-        rows = conn.execute('SELECT * FROM reviews ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
-        return [ReviewDAL._row(row) for row in rows]
+        return fetch_all(_review, f'{_SELECT} ORDER BY created_at DESC LIMIT ?', (limit,))
 
     @staticmethod
     def user_has_reviewed(resource_id: int, reviewer_id: int) -> bool:
@@ -72,16 +141,85 @@ class ReviewDAL:
     def delete_review(review_id: int):
         conn = get_connection()
         conn.execute('DELETE FROM reviews WHERE review_id = ?', (review_id,))
-        conn.commit()
+        commit(conn)
 
     @staticmethod
-    def get_average_for_resource(resource_id: int) -> dict:
+    def set_hidden(review_id: int, hidden: bool = True):
+        """Hide a review from listings; the rating triggers drop it from (or restore it to) the aggregates."""
+        conn = get_connection()
+        conn.execute('UPDATE reviews SET is_hidden = ? WHERE review_id = ?', (int(hidden), review_id))
+        commit(conn)
+
+    @staticmethod
+    def get_average_for_resource(resource_id: int) -> RatingStats:
+        """Reads the trigger-maintained aggregates on ``resources``; no scan of ``reviews``."""
         conn = get_connection()
         row = conn.execute(
-            'SELECT AVG(rating) AS avg_rating, COUNT(*) AS total_reviews FROM reviews WHERE resource_id = ?',
+            '''SELECT rating_sum, rating_count, rating_score, stars_1, stars_2, stars_3, stars_4, stars_5
+               FROM resources WHERE resource_id = ?''',
             (resource_id,)
         ).fetchone()
-        return {
-            'avg_rating': row['avg_rating'] or 0,
-            'total_reviews': row['total_reviews'] or 0,
-        }
+        if not row:
+            return RatingStats(avg_rating=0, total_reviews=0, score=RATING_PRIOR_MEAN, histogram={})
+        count = row['rating_count']
+        return RatingStats(
+            avg_rating=row['rating_sum'] / count if count else 0,
+            total_reviews=count,
+            score=row['rating_score'],
+            histogram={stars: row[f'stars_{stars}'] for stars in range(5, 0, -1)},
+        )
+
+    @staticmethod
+    def search_reviews(text: str, limit: int = 20, offset: int = 0) -> List[ReviewSearchHit]:
+        """Ranked full-text search over review comments for moderators."""
+        match = build_match_query(text)
+        if not match:
+            return []
+        conn = get_connection()
+        rows = conn.execute(
+            f'''SELECT rv.review_id, rv.resource_id, rv.reviewer_id, rv.rating, rv.created_at,
+                       res.title AS resource_title, u.name AS reviewer_name,
+                       snippet(reviews_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16) AS snippet
+                FROM reviews_fts
+                JOIN reviews rv ON rv.review_id = reviews_fts.rowid
+                JOIN resources res ON res.resource_id = rv.resource_id
+                JOIN users u ON u.user_id = rv.reviewer_id
+                WHERE reviews_fts MATCH ?
+                ORDER BY reviews_fts.rank
+                LIMIT ? OFFSET ?''',
+            (match, limit, offset)
+        ).fetchall()
+        return [
+            ReviewSearchHit(
+                review_id=row['review_id'],
+                resource_id=row['resource_id'],
+                resource_title=row['resource_title'],
+                reviewer_id=row['reviewer_id'],
+                reviewer_name=row['reviewer_name'],
+                rating=row['rating'],
+                snippet=highlight_snippet(row['snippet']),
+                created_at=row['created_at'],
+            )
+            for row in rows
+        ]
+
+
+def rebuild_rating_aggregates(conn) -> None:
+    """Recompute every resource's rating columns from visible reviews (upgrades and repairs)."""
+    stars = ', '.join(
+        f'stars_{n} = (SELECT COUNT(*) FROM reviews r WHERE r.resource_id = resources.resource_id '
+        f'AND r.is_hidden = 0 AND r.rating = {n})'
+        for n in range(1, 6)
+    )
+    conn.execute(
+        f'''UPDATE resources SET
+               rating_sum = (SELECT IFNULL(SUM(rating), 0) FROM reviews r
+                             WHERE r.resource_id = resources.resource_id AND r.is_hidden = 0),
+               rating_count = (SELECT COUNT(*) FROM reviews r
+                               WHERE r.resource_id = resources.resource_id AND r.is_hidden = 0),
+               {stars}'''
+    )
+    conn.execute(
+        'UPDATE resources SET rating_score = (rating_sum + ? * ?) / (rating_count + ?)',
+        (RATING_PRIOR_MEAN, RATING_PRIOR_WEIGHT, float(RATING_PRIOR_WEIGHT))
+    )
@@ -0,0 +1,88 @@
+"""Trigger-maintained counters for admin totals that would otherwise need a full-table COUNT."""
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Tuple
+
+from src.data_access.db import get_connection, in_transaction
+
+# Bumped by the resources triggers on any insert, delete or change to a searchable column;
+# ``SearchCache`` entries stamped with an older value are discarded. Not a recountable total.
+CATALOG_VERSION = 'catalog:version'
+# Bumped by the users triggers whenever a row ``UserCache`` holds changes or disappears.
+ACCOUNTS_VERSION = 'accounts:version'
+# Epoch second until which some worker owns the scheduled retention run (see ``claim_lease``).
+RETENTION_LEASE = 'lease:retention'
+
+# Each group's query returns the true ``(name, value)`` pairs; triggers in db.py keep the stored
+# copies in step, and ``reconcile_counters`` repairs any drift from writes that bypassed them.
+COUNTER_SOURCES = {
+    'users': '''
+        SELECT 'users', COUNT(*) FROM users
+        UNION ALL SELECT 'users:role:' || role, COUNT(*) FROM users GROUP BY role
+        UNION ALL SELECT 'users:suspended', COUNT(*) FROM users WHERE is_suspended = 1
+    ''',
+    'resources': '''
+        SELECT 'resources', COUNT(*) FROM resources
+        UNION ALL SELECT 'resources:status:' || status, COUNT(*) FROM resources GROUP BY status
+        UNION ALL SELECT 'resources:capacity', IFNULL(SUM(capacity), 0) FROM resources
+    ''',
+    'bookings': '''
+        SELECT 'bookings', COUNT(*) FROM bookings
+        UNION ALL SELECT 'bookings:status:' || status, COUNT(*) FROM bookings GROUP BY status
+    ''',
+}
+
+
+def reconcile_counters(conn) -> List[Tuple[str, int, int]]:
+    """Recount every group and overwrite stored values; returns ``(name, stored, actual)`` for drifted ones."""
+    stored = {row[0]: row[1] for row in conn.execute('SELECT name, value FROM stats_counters')}
+    actual: Dict[str, int] = {}
+    for group, query in COUNTER_SOURCES.items():
+        actual.update({name: 0 for name in stored if name == group or name.startswith(group + ':')})
+        actual.update({name: value for name, value in conn.execute(query)})
+    drifted = [(name, stored.get(name, 0), value) for name, value in actual.items() if stored.get(name, 0) != value]
+    conn.executemany(
+        'INSERT INTO stats_counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value',
+        [(name, value) for name, _, value in drifted]
+    )
+    return drifted
+
+
+class StatsDAL:
+    @staticmethod
+    def counters(group: str) -> Dict[str, int]:
+        """Counters under ``group`` keyed by the name suffix, ``''`` for the group total.
+
+        ``counters('users')`` -> ``{'': 812, 'role:student': 790, ..., 'suspended': 3}``.
+        """
+        conn = get_connection()
+        rows = conn.execute(
+            "SELECT name, value FROM stats_counters WHERE name = ? OR name BETWEEN ? AND ?",
+            (group, group + ':', group + ';')
+        ).fetchall()
+        return {row['name'][len(group) + 1:]: row['value'] for row in rows}
+
+    @staticmethod
+    def claim_lease(name: str, seconds: int) -> bool:
+        """Take the ``name`` lease for ``seconds`` unless another process holds an unexpired one.
+
+        The claim is a single conditional UPDATE, so of several workers racing for the same lease
+        exactly one gets ``True``. It commits straight away, so it cannot run inside ``transaction()``.
+        """
+        if in_transaction():
+            raise RuntimeError('claim_lease() must commit on its own and cannot run inside transaction()')
+        conn = get_connection()
+        now = int(time.time())
+        conn.execute('INSERT OR IGNORE INTO stats_counters (name, value) VALUES (?, 0)', (name,))
+        cursor = conn.execute(
+            'UPDATE stats_counters SET value = ? WHERE name = ? AND value <= ?', (now + seconds, name, now)
+        )
+        conn.commit()
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def get(name: str) -> int:
+        conn = get_connection()
+        row = conn.execute('SELECT value FROM stats_counters WHERE name = ?', (name,)).fetchone()
+        return row['value'] if row else 0
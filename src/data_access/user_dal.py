@@ -2,15 +2,21 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+from flask import current_app
 from flask_login import UserMixin
-from werkzeug.security import check_password_hash, generate_password_hash
+from src.data_access.db import commit, fetch_all, fetch_one, get_connection, iter_rows, model_factory, on_commit, transaction
+from src.data_access.stats_dal import ACCOUNTS_VERSION, StatsDAL
+from src.utils.notification_feed import NotificationFeed
+from src.utils.password_hasher import get_hasher
+from src.utils.user_cache import UserCache
 
-from src.data_access.db import get_connection
+ROLES = ('student', 'staff', 'admin')
+DELETED_USER_NAME = 'Deleted user'
 
 
-@dataclass
+@dataclass(slots=True)
 class User(UserMixin):
     user_id: int
     name: str
@@ -18,59 +24,213 @@ class User(UserMixin):
     role: str
     department: str | None
     email_verified: int
+    is_suspended: bool = False
 
     def get_id(self) -> str:
         return str(self.user_id)
 
+    @property
+    def is_active(self) -> bool:
+        return not self.is_suspended
+
+
+USER_COLUMNS = ('user_id', 'name', 'email', 'role', 'department', 'email_verified', 'is_suspended')
+_user = model_factory(User, USER_COLUMNS, intern=('role', 'department'), convert={'is_suspended': bool})
+_SELECT = f"SELECT {', '.join(USER_COLUMNS)} FROM users"
+
 
 class UserDAL:
-    @staticmethod
-    def _row_to_user(row) -> Optional[User]:
-        if row is None:
-            return None
-        return User(
-            user_id=row['user_id'],
-            name=row['name'],
-            email=row['email'],
-            role=row['role'],
-            department=row['department'],
-            email_verified=row['email_verified'],
-        )
+    COLUMNS = USER_COLUMNS  # order of ``iter_users(raw=True)`` tuples; never includes the password hash
 
     @staticmethod
     def create_user(name: str, email: str, password: str, role: str = 'student', department: str | None = None):
-        password_hash = generate_password_hash(password)
+        password_hash = get_hasher().hash(password)
         conn = get_connection()
         cursor = conn.execute(
             'INSERT INTO users (name, email, password_hash, role, department, email_verified) VALUES (?, ?, ?, ?, ?, ?)',
             (name, email, password_hash, role, department, 1 if role == 'admin' else 0)
         )
-        conn.commit()
+        commit(conn)
         user_id = cursor.lastrowid
         return UserDAL.get_user_by_id(user_id)
 
     @staticmethod
     def get_user_by_email(email: str) -> Optional[User]:
-        conn = get_connection()
-        row = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
-        return UserDAL._row_to_user(row)
+        return fetch_one(_user, f'{_SELECT} WHERE email = ?', (email,))
 
     @staticmethod
     def get_user_by_id(user_id: int) -> Optional[User]:
-        conn = get_connection()
-        row = conn.execute('SELECT * FROM users WHERE user_id = ?', (user_id,)).fetchone()
-        return UserDAL._row_to_user(row)
+        return fetch_one(_user, f'{_SELECT} WHERE user_id = ?', (user_id,))
+
+    @staticmethod
+    def get_cached_user(user_id: int) -> Optional[User]:
+        """``get_user_by_id`` through the per-worker ``UserCache``; used by the login loader.
+
+        Costs one ``stats_counters`` primary-key read per request, so changes made by other
+        workers are seen straight away rather than after ``USER_CACHE_SECONDS``.
+        """
+        return UserCache.get(user_id, UserDAL.get_user_by_id, ttl=current_app.config['USER_CACHE_SECONDS'],
+                             version=StatsDAL.get(ACCOUNTS_VERSION))
 
     @staticmethod
     def verify_password(email: str, password: str) -> Optional[User]:
+        """Check credentials in the hashing pool, upgrading the stored hash if its parameters are stale.
+
+        Raises ``HasherBusy`` when the pool's queue is full.
+        """
         conn = get_connection()
-        row = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
-        if row and check_password_hash(row['password_hash'], password):
-            return UserDAL._row_to_user(row)
-        return None
+        row = conn.execute(f"SELECT {', '.join(USER_COLUMNS)}, password_hash FROM users WHERE email = ?",
+                           (email,)).fetchone()
+        if not row:
+            return None
+        hasher = get_hasher()
+        if not hasher.verify(row['password_hash'], password):
+            return None
+        if hasher.needs_rehash(row['password_hash']):
+            conn.execute(
+                'UPDATE users SET password_hash = ? WHERE user_id = ?',
+                (hasher.hash(password), row['user_id'])
+            )
+            commit(conn)
+            hasher.metrics.count('rehashed')
+        return _user(None, tuple(row)[:len(USER_COLUMNS)])
+
+    @staticmethod
+    def directory(search: str | None = None, role: str | None = None, department: str | None = None,
+                  after_id: int | None = None, limit: int = 50) -> Tuple[List[User], Optional[int]]:
+        """One page of users, newest first, and the cursor for the next page (``None`` on the last).
+
+        ``search`` is a case-insensitive prefix of the name or email, answered from the NOCASE
+        indexes; the keyset bound is written ``+user_id`` so SQLite does not trade those for a
+        rowid walk that would scan every non-matching account.
+        """
+        clauses, params = [], []
+        search = (search or '').strip()
+        if search:
+            prefix = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            clauses.append("(name LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\')")
+            params += [prefix, prefix]
+        if role:
+            clauses.append('role = ?')
+            params.append(role)
+        if department:
+            clauses.append('department = ? COLLATE NOCASE')
+            params.append(department.strip())
+        if after_id is not None:
+            clauses.append('+user_id < ?' if search else 'user_id < ?')
+            params.append(after_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        users = fetch_all(_user, f'{_SELECT} {where} ORDER BY user_id DESC LIMIT ?', (*params, limit + 1))
+        return users[:limit], (users[limit - 1].user_id if len(users) > limit else None)
 
     @staticmethod
-    def list_users():
+    def iter_users(role: str | None = None, after_id: int = 0, raw: bool = False,
+                   batch_size: int = 500) -> Iterator[User | tuple]:
+        """Stream users (optionally one role) with ids above ``after_id``, in id order, without loading the table."""
+        where, params = (' AND role = ?', [role]) if role else ('', [])
+        return iter_rows(f'{_SELECT} WHERE user_id > ?{where} ORDER BY user_id', [after_id, *params], batch_size, raw,
+                         None if raw else _user)
+
+    @staticmethod
+    def update_role(user_id: int, role: str) -> bool:
+        if role not in ROLES:
+            raise ValueError(f'Unknown role: {role}')
+        conn = get_connection()
+        cursor = conn.execute('UPDATE users SET role = ? WHERE user_id = ?', (role, user_id))
+        commit(conn)
+        on_commit(lambda: UserCache.invalidate(user_id))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def set_suspension(user_id: int, is_suspended: bool) -> bool:
+        """Suspend or reinstate a user; suspended users fail ``is_active`` and are signed out."""
+        conn = get_connection()
+        cursor = conn.execute('UPDATE users SET is_suspended = ? WHERE user_id = ?', (int(is_suspended), user_id))
+        commit(conn)
+        on_commit(lambda: UserCache.invalidate(user_id))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def delete_user(user_id: int) -> bool:
+        """Close an account without orphaning the bookings, reviews, threads and resources that name it.
+
+        The row stays (exports and history join on it) but is suspended and anonymised, with an
+        unusable password and its email address released. The user's resources are archived, pending
+        requests for them rejected, and the user's own upcoming requests cancelled, all in one commit.
+        """
+        with transaction() as conn:
+            cursor = conn.execute(
+                '''UPDATE users SET name = ?, email = 'deleted-' || user_id || '@invalid', password_hash = '!',
+                                     email_verified = 0, is_suspended = 1
+                   WHERE user_id = ?''',
+                (DELETED_USER_NAME, user_id)
+            )
+            if not cursor.rowcount:
+                return False
+            conn.execute(
+                'UPDATE thread_participants SET other_user_name = ? WHERE other_user_id = ?', (DELETED_USER_NAME, user_id)
+            )
+            conn.execute(
+                '''UPDATE bookings SET status = 'rejected', owner_notes = 'Resource owner account closed',
+                                        decision_at = CURRENT_TIMESTAMP
+                   WHERE status = 'pending' AND resource_id IN (SELECT resource_id FROM resources WHERE owner_id = ?)''',
+                (user_id,)
+            )
+            conn.execute(
+                '''UPDATE bookings SET status = 'cancelled', decision_at = CURRENT_TIMESTAMP
+                   WHERE requester_id = ? AND status IN ('pending', 'approved')
+                     AND end_datetime > strftime('%Y-%m-%dT%H:%M:%S', 'now')''',
+                (user_id,)
+            )
+            conn.execute(
+                "UPDATE resources SET status = 'archived', updated_at = CURRENT_TIMESTAMP "
+                "WHERE owner_id = ? AND status != 'archived'",
+                (user_id,)
+            )
+        UserCache.invalidate(user_id)
+        NotificationFeed.invalidate_all()
+        return True
+
+    @staticmethod
+    def existing_user_ids(emails: Sequence[str]) -> Dict[str, int]:
+        conn = get_connection()
+        placeholders = ', '.join('?' for _ in emails)
+        rows = conn.execute(f'SELECT email, user_id FROM users WHERE email IN ({placeholders})', tuple(emails)).fetchall()
+        return {row['email']: row['user_id'] for row in rows}
+
+    @staticmethod
+    def upsert_many(rows: Iterable[Tuple[str, str, str, str | None, str]], updated_ids: Iterable[int] = ()) -> None:
+        """Insert or update ``(name, email, role, department, password_hash)`` rows in one transaction.
+
+        Existing emails get the new name and department; an empty ``role`` or ``password_hash``
+        keeps the stored one (new accounts default to student). Inbox rows naming a renamed user
+        follow, and ``updated_ids`` are dropped from ``UserCache`` once the batch commits.
+        """
+        rows = list(rows)
+        unknown = {row[2] for row in rows} - set(ROLES) - {''}
+        if unknown:
+            raise ValueError(f"Unknown role: {', '.join(sorted(unknown))}")
+        updated_ids = tuple(updated_ids)
         conn = get_connection()
-        rows = conn.execute('SELECT * FROM users ORDER BY created_at DESC').fetchall()
-        return [UserDAL._row_to_user(row) for row in rows]
+        conn.executemany(
+            '''INSERT INTO users (name, email, role, department, password_hash, email_verified)
+               VALUES (?1, ?2, COALESCE(NULLIF(?3, ''), 'student'), ?4, ?5, 0)
+               ON CONFLICT(email) DO UPDATE SET
+                   name = excluded.name,
+                   role = COALESCE(NULLIF(?3, ''), users.role),
+                   department = excluded.department,
+                   password_hash = CASE WHEN excluded.password_hash = '' THEN users.password_hash
+                                        ELSE excluded.password_hash END''',
+            rows
+        )
+        if updated_ids:
+            placeholders = ', '.join('?' for _ in updated_ids)
+            conn.execute(
+                f'''UPDATE thread_participants
+                    SET other_user_name = (SELECT name FROM users WHERE user_id = other_user_id)
+                    WHERE other_user_id IN ({placeholders})
+                      AND other_user_name IS NOT (SELECT name FROM users WHERE user_id = other_user_id)''',
+                updated_ids
+            )
+        commit(conn)
+        on_commit(lambda: UserCache.invalidate(*updated_ids))
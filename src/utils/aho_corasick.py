@@ -0,0 +1,101 @@
+"""Aho-Corasick automaton for scanning text against many terms in a single pass.
+
+Matching is case-insensitive and whole-word: a term only matches when the characters on either
+side of it are not word characters, so "ass" does not fire inside "class". Failure links are folded
+into a full transition table at build time, so scanning costs one dict lookup per character plus
+the matches reported, however many terms are loaded.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Generic, Iterable, List, Tuple, TypeVar
+
+Payload = TypeVar('Payload')
+
+
+@dataclass(frozen=True)
+class Match(Generic[Payload]):
+    start: int
+    end: int  # exclusive
+    term: str
+    payload: Payload
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class Automaton(Generic[Payload]):
+    """Immutable once built, so a scan never sees a half-updated term list."""
+
+    def __init__(self, terms: Iterable[Tuple[str, Payload]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (term length, term, payload) for every term ending here, including those
+        # inherited through failure links, so a scan never walks the failure chain to report.
+        self._output: List[List[Tuple[int, str, Payload]]] = [[]]
+        self._delta: List[Dict[str, int]] = []
+        self.size = 0
+        for term, payload in terms:
+            self._insert(term, payload)
+        self._link()
+
+    def _insert(self, term: str, payload: Payload) -> None:
+        term = term.strip().lower()
+        if not term:
+            return
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        if not any(existing[1] == term for existing in self._output[state]):
+            self._output[state].append((len(term), term, payload))
+            self.size += 1
+
+    def _link(self) -> None:
+        self._delta = [dict(self._goto[0])] + [{} for _ in range(len(self._goto) - 1)]
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            if state:
+                # Breadth-first order guarantees the failure state's row is already complete. Leaves
+                # (most states) have no edges of their own and share that row instead of copying it.
+                fallback_row = self._delta[self._fail[state]]
+                self._delta[state] = {**fallback_row, **self._goto[state]} if self._goto[state] else fallback_row
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def scan(self, text: str) -> List[Match[Payload]]:
+        text = text or ''
+        folded = text.lower()
+        if len(folded) != len(text):
+            folded = ''.join(char.lower()[0] for char in text)  # keep spans aligned with the original
+        delta, output = self._delta, self._output
+        matches: List[Match[Payload]] = []
+        state = 0
+        last = len(folded)
+        for index, char in enumerate(folded):
+            state = delta[state].get(char, 0)
+            if not output[state]:
+                continue
+            end = index + 1
+            if end != last and _is_word(folded[end]):
+                continue  # every term ending here would end mid-word
+            for length, term, payload in output[state]:
+                start = end - length
+                if start == 0 or not _is_word(folded[start - 1]):
+                    matches.append(Match(start, end, term, payload))
+        return matches
@@ -0,0 +1,68 @@
+"""Write-time screening of reviews and messages against the moderation term list."""
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import List
+
+from src.data_access.moderation_dal import ModerationDAL
+from src.utils.aho_corasick import Automaton, Match
+
+REASON = 'blocked_term'
+
+
+@dataclass
+class Screening:
+    matches: List[Match[str]] = field(default_factory=list)
+
+    @property
+    def hidden(self) -> bool:
+        return any(match.payload == 'hide' for match in self.matches)
+
+    @property
+    def detail(self) -> str:
+        """Match spans as JSON ``[[start, end, term], ...]`` for the moderation queue."""
+        return json.dumps([[match.start, match.end, match.term] for match in self.matches])
+
+
+class ContentFilter:
+    """Per-worker automaton over ``moderation_terms``.
+
+    Each screen compares the table's version with the one the automaton was built from; on a change
+    a new automaton is built off to the side and swapped in with one assignment, so concurrent
+    scans keep using the old one until they finish.
+    """
+
+    _lock = threading.Lock()
+    _automaton: Automaton[str] = Automaton([])
+    _version: tuple | None = None
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._automaton = Automaton([])
+            cls._version = None
+
+    @classmethod
+    def automaton(cls) -> Automaton[str]:
+        version = ModerationDAL.terms_version()
+        if version != cls._version:
+            with cls._lock:
+                if version != cls._version:
+                    terms = [(term.term, term.action) for term in ModerationDAL.list_terms()]
+                    cls._automaton = Automaton(terms)
+                    cls._version = version
+        return cls._automaton
+
+    @classmethod
+    def screen(cls, text: str | None) -> Screening:
+        automaton = cls.automaton()
+        if not text or not automaton.size:
+            return Screening()
+        return Screening(automaton.scan(text))
+
+    @classmethod
+    def record(cls, kind: str, ref_id: int, screening: Screening) -> None:
+        if screening.matches:
+            ModerationDAL.flag(kind, ref_id, REASON, detail=screening.detail)
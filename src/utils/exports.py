@@ -0,0 +1,168 @@
+"""Streaming CSV/JSONL exports of bookings, resources and reviews for reporting.
+
+Rows come from ``iter_rows`` and are encoded into roughly ``CHUNK_BYTES`` pieces as they arrive,
+so memory stays flat however large the export is and the first bytes go out after the first batch.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.data_access.booking_dal import BookingDAL
+from src.data_access.db import iter_rows
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+CHUNK_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class Dataset:
+    select: str
+    columns: Tuple[str, ...]
+    date_column: str  # what the since/until range applies to
+    statuses: Dict[str, str]  # accepted ?status= value -> SQL condition
+    department_column: str = 'owner.department'
+    order: str = ''
+
+
+DATASETS = {
+    'bookings': Dataset(
+        select='''SELECT b.booking_id, b.resource_id, r.title AS resource_title, owner.department,
+                         requester.email AS requester_email, b.start_datetime, b.end_datetime, b.status,
+                         b.decision_at, b.created_at
+                  FROM bookings b
+                  JOIN resources r ON r.resource_id = b.resource_id
+                  JOIN users owner ON owner.user_id = r.owner_id
+                  JOIN users requester ON requester.user_id = b.requester_id''',
+        columns=('booking_id', 'resource_id', 'resource_title', 'department', 'requester_email', 'start_datetime',
+                 'end_datetime', 'status', 'decision_at', 'created_at'),
+        date_column='b.start_datetime',
+        statuses={status: f"b.status = '{status}'" for status in BookingDAL.STATUSES},
+        order='b.booking_id',
+    ),
+    'resources': Dataset(
+        select='''SELECT r.resource_id, r.title, r.category, r.location, r.capacity, r.status,
+                         owner.email AS owner_email, owner.department, r.rating_count,
+                         ROUND(r.rating_sum * 1.0 / NULLIF(r.rating_count, 0), 2) AS rating_average, r.created_at
+                  FROM resources r
+                  JOIN users owner ON owner.user_id = r.owner_id''',
+        columns=('resource_id', 'title', 'category', 'location', 'capacity', 'status', 'owner_email', 'department',
+                 'rating_count', 'rating_average', 'created_at'),
+        date_column='r.created_at',
+        statuses={status: f"r.status = '{status}'" for status in ('draft', 'published', 'archived')},
+        order='r.resource_id',
+    ),
+    'reviews': Dataset(
+        select='''SELECT v.review_id, v.resource_id, r.title AS resource_title, owner.department,
+                         reviewer.email AS reviewer_email, v.rating, v.comment, v.is_hidden, v.created_at
+                  FROM reviews v
+                  JOIN resources r ON r.resource_id = v.resource_id
+                  JOIN users owner ON owner.user_id = r.owner_id
+                  JOIN users reviewer ON reviewer.user_id = v.reviewer_id''',
+        columns=('review_id', 'resource_id', 'resource_title', 'department', 'reviewer_email', 'rating', 'comment',
+                 'is_hidden', 'created_at'),
+        date_column='v.created_at',
+        statuses={'visible': 'v.is_hidden = 0', 'hidden': 'v.is_hidden = 1'},
+        order='v.review_id',
+    ),
+}
+
+
+class ExportError(ValueError):
+    """Unknown dataset, format or filter value."""
+
+
+def _day(value: Optional[str], label: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ExportError(f'{label} must be a date (YYYY-MM-DD).') from None
+
+
+def export_query(name: str, since: str | None = None, until: str | None = None, status: str | None = None,
+                 department: str | None = None) -> Tuple[Dataset, str, List[object]]:
+    """Validated SQL and parameters for one dataset; ``until`` is inclusive."""
+    dataset = DATASETS.get(name)
+    if dataset is None:
+        raise ExportError(f"Unknown export '{name}'; choose from {', '.join(DATASETS)}.")
+    clauses: List[str] = []
+    params: List[object] = []
+    start, end = _day(since, 'since'), _day(until, 'until')
+    if start:
+        clauses.append(f'{dataset.date_column} >= ?')
+        params.append(start.isoformat())
+    if end:
+        clauses.append(f"{dataset.date_column} < date(?, '+1 day')")
+        params.append(end.isoformat())
+    if status:
+        if status not in dataset.statuses:
+            raise ExportError(f"Unknown status '{status}' for {name}.")
+        clauses.append(dataset.statuses[status])
+    if department:
+        clauses.append(f'{dataset.department_column} = ? COLLATE NOCASE')
+        params.append(department)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    return dataset, f'{dataset.select}{where} ORDER BY {dataset.order}', params
+
+
+def _csv_chunks(rows: Iterable, columns: Tuple[str, ...]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_chunks(rows: Iterable, columns: Tuple[str, ...]) -> Iterator[str]:
+    lines: List[str] = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(lines)
+            lines, size = [], 0
+    yield ''.join(lines)
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a byte stream incrementally into a single gzip member."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(name: str, fmt: str = 'csv', compress: bool = False, batch_size: int = 500,
+                  **filters) -> Iterator[bytes]:
+    """Encoded export as a byte stream. Filters are validated up front, before the first chunk."""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format '{fmt}'; choose from {', '.join(FORMATS)}.")
+    dataset, query, params = export_query(name, **filters)
+
+    def generate() -> Iterator[bytes]:
+        encode = _csv_chunks if fmt == 'csv' else _jsonl_chunks
+        for text in encode(iter_rows(query, params, batch_size), dataset.columns):
+            if text:
+                yield text.encode('utf-8')
+
+    return gzip_chunks(generate()) if compress else generate()
+
+
+def export_filename(name: str, fmt: str, compress: bool) -> str:
+    return f"{name}-{date.today().isoformat()}.{fmt}{'.gz' if compress else ''}"
@@ -0,0 +1,26 @@
+"""Helpers for SQLite FTS5 queries and snippet rendering."""
+from __future__ import annotations
+
+import re
+
+from markupsafe import Markup, escape
+
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+TOKEN_REGEX = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_query(text: str) -> str | None:
+    """Turn free-form input into a safe FTS5 expression: every word must match, the last one as a prefix."""
+    tokens = TOKEN_REGEX.findall(text or '')
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight_snippet(snippet: str | None) -> Markup:
+    """Escape an FTS snippet and swap the match markers for ``<mark>`` tags."""
+    safe = str(escape(snippet or ''))
+    return Markup(safe.replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>'))
@@ -0,0 +1,70 @@
+"""Typo-tolerant resource lookup, used when the regular search finds nothing.
+
+Each worker keeps a ``SymSpellIndex`` over resource titles, locations and categories. It is built
+on the first fallback lookup (a few seconds at 50k resources, so not at startup or on every CLI
+command) and brought up to date before every later one once the catalog version has moved: new
+rows are read by id and edited ones by ``updated_at``, both index range reads. A drop in the
+resource count means something was deleted, and the index is rebuilt.
+"""
+from __future__ import annotations
+
+import threading
+from typing import List, Tuple
+
+from src.data_access.db import get_connection
+from src.data_access.stats_dal import CATALOG_VERSION, StatsDAL
+from src.utils.symspell import SymSpellIndex, words
+
+_CHANGED = '''SELECT resource_id, title, location, category, updated_at FROM resources
+              WHERE resource_id > ? OR updated_at >= ?'''
+
+
+class FuzzyResourceIndex:
+    _lock = threading.Lock()
+    _index = SymSpellIndex()
+    _version: int | None = None
+    _loaded_through = 0
+    _updated_since = ''
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._index = SymSpellIndex()
+            cls._version = None
+            cls._loaded_through = 0
+            cls._updated_since = ''
+
+    @classmethod
+    def sync(cls) -> None:
+        """Index resources added or edited since the last sync; a no-op while the catalog is unchanged."""
+        version = StatsDAL.get(CATALOG_VERSION)
+        with cls._lock:
+            if version == cls._version:
+                return
+            if len(cls._index) > StatsDAL.get('resources'):
+                cls._index = SymSpellIndex()
+                cls._loaded_through = 0
+                cls._updated_since = ''
+            # Rows stamped in the same second as the last sync are re-read; re-adding is idempotent.
+            for resource_id, title, location, category, updated_at in get_connection().execute(
+                    _CHANGED, (cls._loaded_through, cls._updated_since)):
+                cls._index.add(resource_id, title, location, category)
+                cls._loaded_through = max(cls._loaded_through, resource_id)
+                cls._updated_since = max(cls._updated_since, updated_at or '')
+            cls._version = version
+
+    @classmethod
+    def search(cls, text: str | None, limit: int = 50) -> List[Tuple[int, int, int]]:
+        """``(resource_id, words_matched, edits)`` for resources matching at least half the words of ``text``."""
+        needed = (len(set(words(text))) + 1) // 2
+        if not needed:
+            return []
+        cls.sync()
+        with cls._lock:
+            hits = cls._index.search(text, limit)
+        return [hit for hit in hits if hit[1] >= needed]
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        with cls._lock:
+            return {'resources': len(cls._index), 'terms': cls._index.vocabulary, 'version': cls._version}
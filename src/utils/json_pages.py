@@ -0,0 +1,98 @@
+"""JSON encoding for the read-only API: sparse fieldsets, id batches and keyset-paged lists.
+
+A page is written as ``{"data": [...], "next_cursor": ...}`` in roughly ``CHUNK_BYTES`` pieces
+while the rows are still being read, so a large page can be streamed as it is encoded.
+"""
+from __future__ import annotations
+
+import json
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.utils.exports import CHUNK_BYTES
+
+
+class ApiError(ValueError):
+    """A malformed ``fields``, ``ids`` or paging parameter."""
+
+
+def parse_fields(raw: str | None, allowed: Sequence[str], key: str) -> Tuple[str, ...]:
+    """The requested subset of ``allowed`` (all of it when ``raw`` is empty); ``key`` is always included."""
+    if not raw:
+        return tuple(allowed)
+    requested = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise ApiError(f"Unknown field(s) {', '.join(unknown)}; choose from {', '.join(allowed)}.")
+    return tuple(dict.fromkeys([key, *requested]))
+
+
+def parse_ids(raw: str | None, limit: int) -> Optional[List[int]]:
+    """``ids=3,1,2`` as a de-duplicated list in request order, or ``None`` when absent."""
+    if raw is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(',') if part.strip()))
+    except ValueError:
+        raise ApiError('ids must be a comma-separated list of integers.') from None
+    if not ids or len(ids) > limit:
+        raise ApiError(f'ids takes between 1 and {limit} values.')
+    return ids
+
+
+def parse_limit(raw: str | None, default: int, maximum: int) -> int:
+    if raw is None or raw == '':
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ApiError('limit must be an integer.') from None
+    if not 1 <= limit <= maximum:
+        raise ApiError(f'limit must be between 1 and {maximum}.')
+    return limit
+
+
+def project(item, fields: Sequence[str]) -> dict:
+    """``fields`` of a model (attribute access) or of a DAL dict row."""
+    if isinstance(item, dict):
+        return {name: item[name] for name in fields}
+    return {name: getattr(item, name) for name in fields}
+
+
+def in_order(items: Iterable, ids: Sequence[int], key: str) -> list:
+    """Batch results rearranged into the order the ids were asked for; unknown ids are dropped."""
+    found = {(item[key] if isinstance(item, dict) else getattr(item, key)): item for item in items}
+    return [found[item_id] for item_id in ids if item_id in found]
+
+
+def encode_page(items: Iterable, fields: Sequence[str], key: str, limit: int | None = None) -> Iterator[str]:
+    """Encode up to ``limit`` items; reading one more decides whether ``next_cursor`` is set.
+
+    ``next_cursor`` is the ``key`` of the last item written, so the caller's keyset query can
+    continue strictly after it.
+    """
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    rows = iter(items)
+    parts: List[str] = ['{"data":[']
+    size = written = 0
+    last = None
+    try:
+        for item in rows:
+            if limit is not None and written == limit:
+                break
+            row = project(item, fields)
+            text = encode(row) if not written else ',' + encode(row)
+            parts.append(text)
+            size += len(text)
+            written += 1
+            last = row[key]
+            if size >= CHUNK_BYTES:
+                yield ''.join(parts)
+                parts, size = [], 0
+        else:
+            last = None
+    finally:
+        close = getattr(rows, 'close', None)
+        if close:
+            close()  # finalise a DAL iterator's statement when the page stops short of it
+    parts.append(f'],"next_cursor":{json.dumps(last)}}}')
+    yield ''.join(parts)
@@ -0,0 +1,68 @@
+"""Small per-worker LRU shared by the user and navbar feed caches."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Set, Tuple, TypeVar
+
+V = TypeVar('V')
+
+
+class KeyedCache(Generic[V]):
+    """Thread-safe LRU of loaded values with a TTL and an optional ``stamp`` per entry.
+
+    An entry is served while it is younger than its ``ttl`` and was stored under the same
+    ``stamp`` the caller passes now (e.g. a version counter read from the database). A load that
+    was still running when its key was invalidated is returned to its caller but never stored, so
+    a write cannot be papered over by a read that started before it. Only in-flight loads are
+    tracked for that, so the bookkeeping stays as small as the number of concurrent misses.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, Tuple[Hashable, float, V]]' = OrderedDict()
+        self._loading: Dict[Hashable, Set[object]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, load: Callable[[], V], ttl: float, stamp: Hashable = None) -> V:
+        now = time.monotonic()
+        token = object()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == stamp and entry[1] > now:
+                self._entries.move_to_end(key)
+                return entry[2]
+            self._loading.setdefault(key, set()).add(token)
+        loaded = False
+        try:
+            value = load()
+            loaded = True
+        finally:
+            with self._lock:
+                tokens = self._loading.get(key)
+                current = tokens is not None and token in tokens
+                if current:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._loading[key]
+                if current and loaded:
+                    self._entries[key] = (stamp, now + ttl, value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._loading.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._loading.clear()
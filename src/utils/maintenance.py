@@ -0,0 +1,66 @@
+"""Scheduled retention jobs for append-heavy tables."""
+from __future__ import annotations
+
+import threading
+
+from flask import Flask
+
+from src.data_access.message_dal import MessageDAL
+from src.data_access.notification_dal import NotificationDAL
+from src.data_access.stats_dal import RETENTION_LEASE, StatsDAL
+
+
+def run_retention(app: Flask) -> dict:
+    """Compact notifications and trim the outbox and SSE change table; returns rows removed per table."""
+    config = app.config
+    with app.app_context():
+        return {
+            'notifications': NotificationDAL.compact(
+                config['NOTIFICATION_RETENTION_DAYS'],
+                batch_size=config['RETENTION_BATCH_SIZE'],
+                archive=config['NOTIFICATION_ARCHIVE'],
+            ),
+            'notification_outbox': NotificationDAL.purge_outbox(
+                config['NOTIFICATION_RETENTION_DAYS'],
+                batch_size=config['RETENTION_BATCH_SIZE'],
+            ),
+            'message_events': MessageDAL.prune_events(config['MESSAGE_EVENT_RETENTION_HOURS']),
+        }
+
+
+class MaintenanceScheduler:
+    """Daemon thread that runs ``run_retention`` every ``interval_seconds``.
+
+    Every worker process starts one, but each run first claims the retention lease in
+    ``stats_counters`` for most of an interval, so only one worker compacts per interval.
+    """
+
+    def __init__(self, app: Flask, interval_seconds: float):
+        self.app = app
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='retention-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def tick(self) -> dict | None:
+        """Run retention if this process wins the lease; ``None`` when another worker has it."""
+        with self.app.app_context():
+            # Slightly short of an interval, so the next round's first waker can always claim it.
+            if not StatsDAL.claim_lease(RETENTION_LEASE, max(int(self.interval_seconds * 0.9), 1)):
+                return None
+        return run_retention(self.app)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.tick()
+            except Exception:  # keep the scheduler alive; the next run retries
+                self.app.logger.exception('Retention job failed')
@@ -0,0 +1,132 @@
+"""In-process pub/sub for pushing new messages to open Server-Sent Event streams."""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set
+
+
+class Subscription:
+    """Bounded per-connection queue; when it overflows the stream resyncs from the change table."""
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.overflowed = False
+        self._events: deque = deque(maxlen=maxsize)
+        self._ready = threading.Condition()
+
+    def put(self, event: dict) -> None:
+        with self._ready:
+            if len(self._events) == self._events.maxlen:
+                self.overflowed = True
+            self._events.append(event)
+            self._ready.notify()
+
+    def get(self, timeout: float) -> Optional[dict]:
+        with self._ready:
+            if not self._events:
+                self._ready.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    def drain(self) -> None:
+        with self._ready:
+            self._events.clear()
+            self.overflowed = False
+
+
+class MessageBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, channel: str, maxsize: int = 100) -> Subscription:
+        subscription = Subscription(channel, maxsize)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel: str, event: dict) -> int:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+        return len(subscribers)
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+broker = MessageBroker()
+
+
+def format_event(event: dict) -> str:
+    return f"id: {event['event_id']}\nevent: message\ndata: {json.dumps(event)}\n\n"
+
+
+def event_stream(
+    channel: str,
+    last_event_id: int,
+    fetch_since: Callable[[int], Iterable[dict]],
+    heartbeat: float = 15,
+    poll_interval: float = 10,
+    max_duration: float = 300,
+    queue_size: int = 100,
+    page_size: int = 100,
+) -> Iterator[str]:
+    """Yield SSE frames for ``channel`` starting after ``last_event_id``.
+
+    Live events come from the in-process broker. ``fetch_since`` reads the change table and is only
+    used to resume, to recover from queue overflow, and every ``poll_interval`` seconds to pick up
+    messages posted through other workers (``0`` disables polling for single-process deployments).
+    It returns at most ``page_size`` events, so a full page is followed by another read.
+    The stream closes after ``max_duration`` so the browser reconnects with ``Last-Event-ID``.
+    """
+    subscription = broker.subscribe(channel, maxsize=queue_size)
+    last_id = last_event_id
+
+    def catch_up() -> Iterator[str]:
+        nonlocal last_id
+        while True:
+            events = list(fetch_since(last_id))
+            for event in events:
+                last_id = event['event_id']
+                yield format_event(event)
+            if len(events) < page_size:
+                return
+
+    try:
+        yield 'retry: 3000\n\n'
+        yield from catch_up()
+        now = time.monotonic()
+        deadline = now + max_duration
+        next_heartbeat = now + heartbeat
+        next_poll = now + poll_interval if poll_interval else None
+        while now < deadline:
+            wake_at = min(t for t in (deadline, next_heartbeat, next_poll) if t is not None)
+            event = subscription.get(timeout=max(wake_at - now, 0))
+            if subscription.overflowed:
+                subscription.drain()
+                yield from catch_up()
+            elif event and event['event_id'] > last_id:
+                last_id = event['event_id']
+                yield format_event(event)
+            now = time.monotonic()
+            if next_poll is not None and now >= next_poll:
+                yield from catch_up()
+                next_poll = now + poll_interval
+            if now >= next_heartbeat:
+                yield ': heartbeat\n\n'
+                next_heartbeat = now + heartbeat
+    finally:
+        broker.unsubscribe(subscription)
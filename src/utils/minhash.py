@@ -0,0 +1,118 @@
+"""MinHash signatures and an in-memory LSH index for near-duplicate text detection.
+
+Text is reduced to a set of word shingles; each signature slot keeps the minimum of one universal
+hash over that set, so the fraction of equal slots between two signatures estimates their Jaccard
+similarity. Signatures are split into ``bands`` of ``rows`` slots and each band is bucketed, which
+makes candidate lookup a handful of dict probes instead of a scan over every stored text.
+"""
+from __future__ import annotations
+
+import random
+import re
+import zlib
+from array import array
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Sequence, Set, Tuple
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # candidate threshold is roughly (1 / BANDS) ** (1 / ROWS) ≈ 0.5
+SHINGLE_SIZE = 2
+MIN_TOKENS = 6  # shorter texts ("thanks!", "see you then") are too generic to call duplicates
+
+_MASK32 = (1 << 32) - 1
+_MASK64 = (1 << 64) - 1
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+# Multiply-shift hashing (top 32 bits of a*h + b mod 2**64) is cheaper in CPython than a prime
+# modulus. Fixed seed: signatures are persisted, so the hash family must never change between runs.
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(NUM_PERM)]
+
+Signature = Tuple[int, ...]
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """32-bit hashes of the lower-cased word ``size``-grams; empty when the text is too short."""
+    tokens = _TOKEN.findall((text or '').lower())
+    if len(tokens) < MIN_TOKENS:
+        return set()
+    return {
+        zlib.crc32(' '.join(tokens[index:index + size]).encode()) & _MASK32
+        for index in range(len(tokens) - size + 1)
+    }
+
+
+def signature(hashes: Iterable[int]) -> Signature | None:
+    hashes = list(hashes)
+    if not hashes:
+        return None
+    # The shift is monotonic, so it is applied once to each minimum rather than to every product.
+    return tuple(min([(a * h + b) & _MASK64 for h in hashes]) >> 32 for a, b in _PERMUTATIONS)
+
+
+def signature_for(text: str) -> Signature | None:
+    return signature(shingles(text))
+
+
+def similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    """Estimated Jaccard similarity: the share of slots where both signatures agree."""
+    return sum(1 for a, b in zip(left, right) if a == b) / NUM_PERM
+
+
+def pack(sig: Signature) -> bytes:
+    return array('I', sig).tobytes()
+
+
+def unpack(blob: bytes) -> Signature:
+    values = array('I')
+    values.frombytes(blob)
+    return tuple(values)
+
+
+def _band_keys(sig: Signature) -> List[Tuple[int, Signature]]:
+    return [(band, sig[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+class MinHashLSH:
+    """Banded LSH buckets over signatures; keys are whatever the caller uses to identify a text."""
+
+    def __init__(self):
+        self._buckets: List[Dict[Signature, List[Hashable]]] = [defaultdict(list) for _ in range(BANDS)]
+        self._signatures: Dict[Hashable, Signature] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def add(self, key: Hashable, sig: Signature) -> None:
+        if key in self._signatures:
+            return
+        self._signatures[key] = sig
+        for band, bucket in _band_keys(sig):
+            self._buckets[band][bucket].append(key)
+
+    def pop_oldest(self) -> Hashable:
+        """Forget the earliest-added key (signatures keep insertion order) and return it."""
+        key = next(iter(self._signatures))
+        sig = self._signatures.pop(key)
+        for band, bucket in _band_keys(sig):
+            keys = self._buckets[band][bucket]
+            keys.remove(key)
+            if not keys:
+                del self._buckets[band][bucket]
+        return key
+
+    def query(self, sig: Signature, threshold: float) -> List[Tuple[Hashable, float]]:
+        """Stored keys whose estimated similarity to ``sig`` reaches ``threshold``, best first."""
+        candidates: Set[Hashable] = set()
+        for band, bucket in _band_keys(sig):
+            candidates.update(self._buckets[band].get(bucket, ()))
+        matches = []
+        for key in candidates:
+            score = similarity(sig, self._signatures[key])
+            if score >= threshold:
+                matches.append((key, score))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
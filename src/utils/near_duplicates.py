@@ -0,0 +1,136 @@
+"""Near-duplicate flagging for reviews and messages.
+
+Signatures live in ``content_signatures``; each worker keeps them in a ``MinHashLSH`` index and
+tops it up from the table's autoincrement id before every lookup, so rows written by other
+workers are seen without reloading everything. Only the newest ``NEAR_DUPLICATE_MAX_ENTRIES``
+are held: older ones are evicted as new ones arrive, so a worker's memory stays flat and new
+text is compared against recent content (where reposted spam turns up).
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Tuple
+
+from flask import current_app
+
+from src.data_access.db import get_connection
+from src.data_access.moderation_dal import ModerationDAL
+from src.utils.minhash import MinHashLSH, pack, signature_for, unpack
+
+REASON = 'near_duplicate'
+
+Key = Tuple[str, int]
+
+
+def _window_start(max_entries: int) -> int:
+    """Signature id just before the newest ``max_entries``, so a fresh index never reads the whole table."""
+    return max(ModerationDAL.last_signature_id() - max_entries, 0)
+
+
+def _load(lsh: MinHashLSH, after_id: int, max_entries: int) -> int:
+    """Stream signatures after ``after_id`` into ``lsh``, evicting past ``max_entries``; returns the last id read."""
+    for signature_id, kind, ref_id, blob in ModerationDAL.signatures_since(after_id):
+        lsh.add((kind, ref_id), unpack(blob))
+        if len(lsh) > max_entries:
+            lsh.pop_oldest()
+        after_id = signature_id
+    return after_id
+
+
+class NearDuplicateIndex:
+    _lock = threading.Lock()
+    _lsh = MinHashLSH()
+    _loaded_through = 0
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._lsh = MinHashLSH()
+            cls._loaded_through = 0
+
+    @classmethod
+    def sync(cls) -> None:
+        """Load signatures stored since the last sync (a primary-key range read; usually empty)."""
+        max_entries = current_app.config['NEAR_DUPLICATE_MAX_ENTRIES']
+        with cls._lock:
+            if not cls._loaded_through:
+                cls._loaded_through = _window_start(max_entries)
+            cls._loaded_through = _load(cls._lsh, cls._loaded_through, max_entries)
+
+    @classmethod
+    def check(cls, kind: str, ref_id: int, text: str | None) -> List[Tuple[Key, float]]:
+        """Flag ``text`` if it nearly duplicates stored content, then remember its signature.
+
+        Runs inside the caller's write: the signature and any flag commit (or roll back) with the
+        review or message itself, and the in-memory index only learns the row on a later sync.
+        """
+        sig = signature_for(text)
+        if sig is None:
+            return []
+        cls.sync()
+        with cls._lock:
+            matches = [
+                (key, score)
+                for key, score in cls._lsh.query(sig, current_app.config['NEAR_DUPLICATE_THRESHOLD'])
+                if key != (kind, ref_id)
+            ]
+        if matches:
+            (matched_kind, matched_ref_id), score = matches[0]
+            ModerationDAL.flag(kind, ref_id, REASON, matched_kind, matched_ref_id, round(score, 3))
+        ModerationDAL.save_signatures([(kind, ref_id, pack(sig))])
+        return matches
+
+
+# Oldest first, so the later copy of a pair is the one flagged, as it would have been on write.
+# Rows that already have a signature are skipped through the (kind, ref_id) unique index.
+_BACKFILL_SOURCES = {
+    'review': '''SELECT review_id, comment FROM reviews
+                 WHERE review_id > ?
+                   AND NOT EXISTS (SELECT 1 FROM content_signatures WHERE kind = 'review' AND ref_id = review_id)
+                 ORDER BY review_id LIMIT ?''',
+    'message': '''SELECT message_id, body FROM messages
+                  WHERE message_id > ?
+                    AND NOT EXISTS (SELECT 1 FROM content_signatures WHERE kind = 'message' AND ref_id = message_id)
+                  ORDER BY message_id LIMIT ?''',
+}
+
+
+def backfill_signatures(batch_size: int = 500) -> Dict[str, int]:
+    """Sign and check every review and message written before detection existed.
+
+    Rows that already have a signature are skipped, so the command can be re-run after an
+    interruption. Each batch is stored with one ``executemany`` and committed on its own. Rows
+    are compared against the same bounded window of recent signatures the live index keeps.
+    """
+    conn = get_connection()
+    threshold = current_app.config['NEAR_DUPLICATE_THRESHOLD']
+    max_entries = current_app.config['NEAR_DUPLICATE_MAX_ENTRIES']
+    lsh = MinHashLSH()
+    _load(lsh, _window_start(max_entries), max_entries)
+    totals = {'signed': 0, 'flagged': 0}
+    for kind, query in _BACKFILL_SOURCES.items():
+        last_id = 0
+        while True:
+            rows = conn.execute(query, (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            batch = []
+            for ref_id, text in rows:
+                last_id = ref_id
+                sig = signature_for(text)
+                if sig is None:
+                    continue
+                matches = lsh.query(sig, threshold)
+                if matches:
+                    (matched_kind, matched_ref_id), score = matches[0]
+                    ModerationDAL.flag(kind, ref_id, REASON, matched_kind, matched_ref_id, round(score, 3))
+                    totals['flagged'] += 1
+                lsh.add((kind, ref_id), sig)
+                if len(lsh) > max_entries:
+                    lsh.pop_oldest()
+                batch.append((kind, ref_id, pack(sig)))
+            ModerationDAL.save_signatures(batch)
+            conn.commit()
+            totals['signed'] += len(batch)
+    NearDuplicateIndex.reset()
+    return totals
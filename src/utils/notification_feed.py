@@ -0,0 +1,27 @@
+"""Per-worker cache for the navbar feed with version-based invalidation."""
+from __future__ import annotations
+
+from src.data_access.feed_dal import Feed, FeedDAL
+from src.utils.keyed_cache import KeyedCache
+
+
+class NotificationFeed:
+    """Caches one ``Feed`` per user (the navbar always asks for the same ``limit``).
+
+    Writes in this worker drop the user's entry (or every entry for catalog changes) immediately;
+    ``ttl`` bounds staleness for writes made by other workers.
+    """
+
+    _cache: KeyedCache = KeyedCache()
+
+    @classmethod
+    def for_user(cls, user_id: int, limit: int = 5, ttl: float = 30) -> Feed:
+        return cls._cache.get(user_id, lambda: FeedDAL.load(user_id, limit=limit), ttl)
+
+    @classmethod
+    def invalidate(cls, *user_ids: int) -> None:
+        cls._cache.invalidate(*user_ids)
+
+    @classmethod
+    def invalidate_all(cls) -> None:
+        cls._cache.clear()
@@ -0,0 +1,252 @@
+"""Background delivery for the notification outbox.
+
+Requests only insert rows into ``notification_outbox``; the dispatcher's worker threads claim due
+rows in batches, deliver each batch over a single SMTP session, and retry failures with exponential
+backoff until ``OUTBOX_MAX_ATTEMPTS`` is reached, after which the row is parked as ``dead``.
+A claim left in ``sending`` by a worker that died mid-batch counts as a failed attempt when it is
+reclaimed, so a message that crashes delivery is eventually dead-lettered too.
+"""
+from __future__ import annotations
+
+import logging
+import smtplib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import Iterator, List, Optional
+
+STALE_CLAIM_MINUTES = 10
+MAX_ERROR_BACKOFF_SECONDS = 300
+# Failures that concern one message; the session stays usable for the rest of the batch.
+PER_MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused, ValueError)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboxSettings:
+    database_path: str
+    batch_size: int = 50
+    max_attempts: int = 5
+    retry_base_seconds: int = 30
+    poll_seconds: float = 5
+
+    @classmethod
+    def from_config(cls, config) -> 'OutboxSettings':
+        return cls(
+            database_path=config['DATABASE_PATH'],
+            batch_size=config['OUTBOX_BATCH_SIZE'],
+            max_attempts=config['OUTBOX_MAX_ATTEMPTS'],
+            retry_base_seconds=config['OUTBOX_RETRY_BASE_SECONDS'],
+            poll_seconds=config['OUTBOX_POLL_SECONDS'],
+        )
+
+
+class SMTPMailer:
+    def __init__(self, host: str, port: int = 25, sender: str = 'no-reply@campus.test',
+                 username: str | None = None, password: str | None = None,
+                 use_tls: bool = False, timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, config) -> 'SMTPMailer':
+        return cls(
+            host=config['MAIL_SERVER'],
+            port=config['MAIL_PORT'],
+            sender=config['MAIL_DEFAULT_SENDER'],
+            username=config['MAIL_USERNAME'],
+            password=config['MAIL_PASSWORD'],
+            use_tls=config['MAIL_USE_TLS'],
+        )
+
+    @contextmanager
+    def session(self) -> Iterator[smtplib.SMTP]:
+        """One SMTP connection reused for every message in a batch."""
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or '')
+            yield smtp
+        finally:
+            try:
+                smtp.quit()
+            except smtplib.SMTPException:
+                smtp.close()
+
+    def send(self, smtp: smtplib.SMTP, recipient: str, subject: str, body: str) -> None:
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = recipient
+        message['Subject'] = subject
+        message.set_content(body)
+        smtp.send_message(message)
+
+
+def _connect(database_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(database_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def claim_batch(conn: sqlite3.Connection, batch_size: int, max_attempts: int) -> List[sqlite3.Row]:
+    """Atomically move up to ``batch_size`` due rows to ``sending`` so no other worker picks them up."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(
+            '''UPDATE notification_outbox
+               SET status = CASE WHEN attempts + 1 >= ? THEN 'dead' ELSE 'pending' END,
+                   attempts = attempts + 1,
+                   last_error = 'Delivery interrupted; claim expired'
+               WHERE status = 'sending' AND claimed_at < datetime('now', ?)''',
+            (max_attempts, f'-{STALE_CLAIM_MINUTES} minutes')
+        )
+        rows = conn.execute(
+            '''SELECT * FROM notification_outbox
+               WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+               ORDER BY next_attempt_at, outbox_id
+               LIMIT ?''',
+            (batch_size,)
+        ).fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE notification_outbox SET status = 'sending', claimed_at = CURRENT_TIMESTAMP WHERE outbox_id = ?",
+                [(row['outbox_id'],) for row in rows]
+            )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return rows
+
+
+def _record_failure(conn: sqlite3.Connection, row: sqlite3.Row, error: str, settings: OutboxSettings) -> None:
+    attempts = row['attempts'] + 1
+    if attempts >= settings.max_attempts:
+        conn.execute(
+            "UPDATE notification_outbox SET status = 'dead', attempts = ?, last_error = ? WHERE outbox_id = ?",
+            (attempts, error, row['outbox_id'])
+        )
+        return
+    delay = settings.retry_base_seconds * 2 ** (attempts - 1)
+    conn.execute(
+        '''UPDATE notification_outbox
+           SET status = 'pending', attempts = ?, last_error = ?, next_attempt_at = datetime('now', ?)
+           WHERE outbox_id = ?''',
+        (attempts, error, f'+{delay} seconds', row['outbox_id'])
+    )
+
+
+def deliver_batch(mailer: SMTPMailer, settings: OutboxSettings, conn: Optional[sqlite3.Connection] = None) -> int:
+    """Claim and deliver one batch; returns how many rows were claimed."""
+    own_conn = conn is None
+    conn = conn or _connect(settings.database_path)
+    try:
+        rows = claim_batch(conn, settings.batch_size, settings.max_attempts)
+        if not rows:
+            return 0
+        sent_ids = []
+        failures = []
+        try:
+            with mailer.session() as smtp:
+                for row in rows:
+                    try:
+                        mailer.send(smtp, row['recipient'], row['subject'], row['body'])
+                        sent_ids.append(row['outbox_id'])
+                    except PER_MESSAGE_ERRORS as exc:
+                        failures.append((row, str(exc)))
+        except (OSError, smtplib.SMTPException) as exc:  # the connection itself failed
+            delivered = set(sent_ids)
+            failures = [(row, str(exc)) for row in rows if row['outbox_id'] not in delivered]
+        except Exception as exc:  # a bug, not a mail error: settle the batch, then let the caller log it
+            delivered = set(sent_ids)
+            _settle(conn, sent_ids, [(row, repr(exc)) for row in rows if row['outbox_id'] not in delivered], settings)
+            raise
+        _settle(conn, sent_ids, failures, settings)
+        return len(rows)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def _settle(conn: sqlite3.Connection, sent_ids: List[int], failures: list, settings: OutboxSettings) -> None:
+    conn.execute('BEGIN IMMEDIATE')
+    conn.executemany(
+        "UPDATE notification_outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL WHERE outbox_id = ?",
+        [(outbox_id,) for outbox_id in sent_ids]
+    )
+    for row, error in failures:
+        _record_failure(conn, row, error, settings)
+    conn.execute('COMMIT')
+
+
+def drain(mailer: SMTPMailer, settings: OutboxSettings) -> int:
+    """Deliver every currently due row; used by the CLI and tests."""
+    conn = _connect(settings.database_path)
+    total = 0
+    try:
+        while True:
+            claimed = deliver_batch(mailer, settings, conn)
+            if not claimed:
+                return total
+            total += claimed
+    finally:
+        conn.close()
+
+
+class OutboxDispatcher:
+    """Pool of daemon threads draining the outbox; ``wake()`` skips the poll delay after new writes."""
+
+    def __init__(self, mailer: SMTPMailer, settings: OutboxSettings, workers: int = 2):
+        self.mailer = mailer
+        self.settings = settings
+        self.workers = workers
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'outbox-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        conn = _connect(self.settings.database_path)
+        errors = 0
+        try:
+            while not self._stop.is_set():
+                try:
+                    claimed = deliver_batch(self.mailer, self.settings, conn)
+                    errors = 0
+                except Exception:  # keep the worker alive and back off; the failed batch was already settled
+                    logger.exception('Outbox delivery failed')
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    errors += 1
+                    self._stop.wait(min(self.settings.poll_seconds * 2 ** errors, MAX_ERROR_BACKOFF_SECONDS))
+                    continue
+                if not claimed:
+                    self._wake.wait(self.settings.poll_seconds)
+                    self._wake.clear()
+        finally:
+            conn.close()
@@ -0,0 +1,155 @@
+"""Password hashing off the request thread.
+
+KDF work runs in a small process pool so a burst of sign-ins cannot pin every request thread (or
+the GIL) on scrypt. Submissions beyond ``max_pending`` are refused with ``HasherBusy`` instead of
+queueing unboundedly. With ``workers=0`` hashing runs inline, which is what the tests use.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Deque, Dict, Iterable, Iterator, Tuple, TypeVar
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+METRIC_WINDOW = 500  # recent samples kept per metric
+
+Result = TypeVar('Result')
+
+
+class HasherBusy(RuntimeError):
+    """Raised when the hashing queue is full; callers should ask the user to retry shortly."""
+
+
+def _timed(func: Callable[..., Result], *args) -> Tuple[Result, float, float]:
+    """Runs in the worker: returns the result, the wall-clock start time and the CPU-side duration."""
+    started = time.time()
+    tick = time.perf_counter()
+    result = func(*args)
+    return result, started, time.perf_counter() - tick
+
+
+@lru_cache(maxsize=8)
+def method_prefix(method: str) -> str:
+    """Canonical stored prefix for ``method`` (e.g. ``scrypt`` -> ``scrypt:32768:8:1``)."""
+    return generate_password_hash('probe', method=method).split('$', 1)[0]
+
+
+def needs_rehash(pwhash: str, method: str) -> bool:
+    return pwhash.split('$', 1)[0] != method_prefix(method)
+
+
+class HashMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {'hash_seconds': deque(maxlen=METRIC_WINDOW),
+                                                  'queue_wait_seconds': deque(maxlen=METRIC_WINDOW)}
+        self.counts = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'busy': 0, 'rate_limited': 0}
+
+    def observe(self, hash_seconds: float, queue_wait: float) -> None:
+        with self._lock:
+            self._samples['hash_seconds'].append(hash_seconds)
+            self._samples['queue_wait_seconds'].append(max(queue_wait, 0.0))
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            summary: dict = dict(self.counts)
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                summary[name] = {
+                    'samples': len(ordered),
+                    'p50': ordered[len(ordered) // 2] if ordered else None,
+                    'p95': ordered[int(len(ordered) * 0.95)] if ordered else None,
+                    'max': ordered[-1] if ordered else None,
+                }
+        return summary
+
+
+class PasswordHasher:
+    def __init__(self, method: str, workers: int = 2, max_pending: int = 32):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.metrics = HashMetrics()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'PasswordHasher':
+        return cls(
+            method=config['PASSWORD_HASH_METHOD'],
+            workers=config['PASSWORD_HASH_WORKERS'],
+            max_pending=config['PASSWORD_HASH_MAX_PENDING'],
+        )
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = process_pool(self.workers)
+            return self._pool
+
+    def _run(self, func: Callable[..., Result], *args) -> Result:
+        if not self._slots.acquire(blocking=False):
+            self.metrics.count('busy')
+            raise HasherBusy('Password hashing queue is full')
+        try:
+            submitted = time.time()
+            if self.workers:
+                result, started, seconds = self._executor().submit(_timed, func, *args).result()
+            else:
+                result, started, seconds = _timed(func, *args)
+            self.metrics.observe(seconds, started - submitted)
+            return result
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        pwhash = self._run(generate_password_hash, password, self.method)
+        self.metrics.count('hashed')
+        return pwhash
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        ok = self._run(check_password_hash, pwhash, password)
+        self.metrics.count('verified')
+        return ok
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        return needs_rehash(pwhash, self.method)
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+def hash_many(passwords: Iterable[str], method: str, pool: Executor | None = None,
+              chunksize: int = 16) -> Iterator[str]:
+    """Hash a batch in order, in ``pool`` when given or inline otherwise.
+
+    With a pool every hash is submitted before this returns, so callers can do other work (write
+    the previous batch, say) while the workers run, and then consume the results.
+    """
+    passwords = list(passwords)
+    if pool is None:
+        return iter([generate_password_hash(password, method) for password in passwords])
+    return pool.map(generate_password_hash, passwords, [method] * len(passwords), chunksize=chunksize)
+
+
+def process_pool(processes: int | None = None) -> ProcessPoolExecutor:
+    # Spawned, not forked: the app runs outbox and scheduler threads a fork would copy mid-flight.
+    return ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'))
+
+
+def get_hasher() -> PasswordHasher:
+    return current_app.extensions['password_hasher']
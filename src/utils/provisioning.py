@@ -0,0 +1,145 @@
+"""Bulk user provisioning from a CSV roster.
+
+The roster is read as a stream and processed in chunks. Each chunk's new credentials are handed to
+a process pool and, while they hash, the previous chunk is written with a single ``executemany``
+upsert and commit, so hashing (the expensive part) and SQLite writes overlap.
+"""
+from __future__ import annotations
+
+import csv
+import secrets
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from src.data_access.user_dal import ROLES, UserDAL
+from src.utils.password_hasher import hash_many, process_pool
+from src.utils.validators import Validator
+
+REQUIRED_COLUMNS = {'name', 'email'}
+GENERATED_PASSWORD_BYTES = 12
+
+
+class RosterError(ValueError):
+    """The roster as a whole is unusable (e.g. missing required columns)."""
+
+
+@dataclass
+class RosterEntry:
+    line: int
+    name: str
+    email: str
+    role: str  # '' when the roster gives none: new accounts become students, existing ones keep theirs
+    department: str | None
+    password: str | None
+
+
+@dataclass
+class ProvisionReport:
+    created: int = 0
+    updated: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    credentials: List[Tuple[str, str]] = field(default_factory=list)  # generated (email, password) pairs
+
+    @property
+    def processed(self) -> int:
+        return self.created + self.updated
+
+
+def parse_roster(lines: Iterable[str], report: ProvisionReport) -> Iterator[RosterEntry]:
+    """Yield valid rows from CSV text with a header; invalid rows are recorded on ``report``."""
+    reader = csv.DictReader(lines)
+    columns = {name.strip().lower() for name in reader.fieldnames or []}
+    missing = REQUIRED_COLUMNS - columns
+    if missing:
+        raise RosterError(f"Roster is missing column(s): {', '.join(sorted(missing))}")
+    seen = set()
+    for raw in reader:
+        row = {(key or '').strip().lower(): (value or '').strip() for key, value in raw.items()}
+        line = reader.line_num
+        email = row.get('email', '').lower()
+        role = row.get('role', '').lower()
+        password = row.get('password') or None
+        valid, message = Validator.validate_string(row.get('name', ''), 2, 120, 'Name')
+        if valid and password is not None:
+            valid, message = Validator.validate_password(password)
+        if not valid:
+            report.errors.append((line, message))
+        elif not Validator.validate_email(email):
+            report.errors.append((line, f'Invalid email: {email or "(blank)"}'))
+        elif role and role not in ROLES:
+            report.errors.append((line, f'Unknown role: {role}'))
+        elif email in seen:
+            report.errors.append((line, f'Duplicate email in roster: {email}'))
+        else:
+            seen.add(email)
+            yield RosterEntry(line, row['name'], email, role, row.get('department') or None, password)
+
+
+def _chunks(entries: Iterator[RosterEntry], size: int) -> Iterator[List[RosterEntry]]:
+    chunk: List[RosterEntry] = []
+    for entry in entries:
+        chunk.append(entry)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def missing_passwords(lines: Iterable[str], chunk_size: int = 500) -> int:
+    """How many new accounts in the roster have no password, i.e. would get a generated one."""
+    missing = 0
+    for chunk in _chunks(parse_roster(lines, ProvisionReport()), chunk_size):
+        existing = UserDAL.existing_user_ids([entry.email for entry in chunk])
+        missing += sum(1 for entry in chunk if entry.password is None and entry.email not in existing)
+    return missing
+
+
+def provision_users(lines: Iterable[str], method: str, chunk_size: int = 500, processes: int | None = None,
+                    progress: Optional[Callable[[ProvisionReport], None]] = None) -> ProvisionReport:
+    """Create or update every valid roster row; ``processes=0`` hashes inline.
+
+    Existing accounts keep their password unless the roster supplies one, so re-running a roster
+    only re-hashes what it has to. New accounts without a password get a generated one, returned
+    in ``report.credentials`` for distribution.
+    """
+    report = ProvisionReport()
+    pending = None
+    with (process_pool(processes) if processes != 0 else nullcontext()) as pool:
+        for chunk in _chunks(parse_roster(lines, report), chunk_size):
+            existing = UserDAL.existing_user_ids([entry.email for entry in chunk])
+            to_hash = []
+            for entry in chunk:
+                if entry.password is None and entry.email not in existing:
+                    entry.password = secrets.token_urlsafe(GENERATED_PASSWORD_BYTES)
+                    report.credentials.append((entry.email, entry.password))
+                if entry.password is not None:
+                    to_hash.append(entry.password)
+            hashes = hash_many(to_hash, method, pool)
+            if pending:
+                _write(*pending, report)
+                if progress:
+                    progress(report)
+            pending = (chunk, existing, hashes)
+        if pending:
+            _write(*pending, report)
+            if progress:
+                progress(report)
+    return report
+
+
+def _write(chunk: List[RosterEntry], existing: dict, hashes: Iterator[str], report: ProvisionReport) -> None:
+    rows = [
+        (entry.name, entry.email, entry.role, entry.department, next(hashes) if entry.password is not None else '')
+        for entry in chunk
+    ]
+    UserDAL.upsert_many(rows, updated_ids=existing.values())
+    report.updated += len(existing)
+    report.created += len(chunk) - len(existing)
+
+
+def write_credentials(out: TextIO, credentials: Iterable[Tuple[str, str]]) -> None:
+    writer = csv.writer(out)
+    writer.writerow(['email', 'password'])
+    writer.writerows(credentials)
@@ -0,0 +1,47 @@
+"""In-process token buckets for throttling by key (client IP, account email, ...)."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+
+class TokenBucketLimiter:
+    """``capacity`` tokens per key, refilled continuously at ``per_minute``; one token per attempt.
+
+    Buckets live in a bounded LRU, so a spray of distinct keys costs memory ``max_keys`` at most;
+    an evicted key simply starts again with a full bucket.
+    """
+
+    def __init__(self, capacity: int, per_minute: float, max_keys: int = 50_000):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+
+    def allow(self, key: str) -> bool:
+        if self.capacity <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(self.capacity), now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def retry_after(self, key: str) -> int:
+        """Seconds until ``key`` has a whole token again."""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(self.capacity), time.monotonic()))
+        tokens = min(self.capacity, tokens + (time.monotonic() - updated) * self.rate)
+        if tokens >= 1 or not self.rate:
+            return 0
+        return int((1 - tokens) / self.rate) + 1
@@ -0,0 +1,77 @@
+"""Per-worker LRU of resource search results, invalidated by the catalog version."""
+from __future__ import annotations
+
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class SearchCache:
+    """Maps a normalised filter tuple to the ordered ids (plus any per-id columns) it matched.
+
+    Entries are stamped with the catalog version, a ``stats_counters`` row that triggers bump on
+    every resource insert, delete or change to a searchable column. A write from any worker
+    therefore retires every cached result at the next lookup, with no TTL. Columns are held as
+    ``array`` objects and the LRU is trimmed to the caller's byte budget.
+    """
+
+    _lock = threading.Lock()
+    _entries: 'OrderedDict[Hashable, Tuple[int, Tuple[array, ...], int]]' = OrderedDict()
+    _bytes = 0
+    _counts: Dict[str, int] = {'hits': 0, 'misses': 0, 'stale': 0, 'stored': 0, 'evicted': 0, 'too_large': 0}
+    max_ids = 50_000  # longer results are not cached; they would crowd out everything else
+
+    @classmethod
+    def lookup(cls, key: Hashable, version: int) -> Optional[Tuple[array, ...]]:
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                cls._counts['misses'] += 1
+                return None
+            if entry[0] != version:
+                cls._drop(key)
+                cls._counts['stale'] += 1
+                cls._counts['misses'] += 1
+                return None
+            cls._entries.move_to_end(key)
+            cls._counts['hits'] += 1
+            return entry[1]
+
+    @classmethod
+    def store(cls, key: Hashable, version: int, columns: Tuple[array, ...], max_bytes: int) -> None:
+        cost = sum(map(sys.getsizeof, columns)) + sys.getsizeof(key) + sum(sys.getsizeof(part) for part in key)
+        with cls._lock:
+            if len(columns[0]) > cls.max_ids or cost > max_bytes:
+                cls._counts['too_large'] += 1
+                return
+            if key in cls._entries:
+                cls._drop(key)
+            cls._entries[key] = (version, columns, cost)
+            cls._bytes += cost
+            cls._counts['stored'] += 1
+            while cls._bytes > max_bytes:
+                cls._drop(next(iter(cls._entries)))
+                cls._counts['evicted'] += 1
+
+    @classmethod
+    def _drop(cls, key: Hashable) -> None:
+        _, _, cost = cls._entries.pop(key)
+        cls._bytes -= cost
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        with cls._lock:
+            summary: dict = dict(cls._counts)
+            lookups = summary['hits'] + summary['misses']
+            summary.update(entries=len(cls._entries), bytes=cls._bytes,
+                           hit_rate=round(summary['hits'] / lookups, 4) if lookups else None)
+        return summary
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._entries.clear()
+            cls._bytes = 0
+            cls._counts = dict.fromkeys(cls._counts, 0)
@@ -0,0 +1,177 @@
+"""Typo-tolerant word lookup (symmetric delete spelling correction) plus per-word postings.
+
+Documents are tokenised into lowercase words. Each distinct word is stored under every string
+reachable from its first ``PREFIX`` letters by deleting up to ``MAX_EDITS`` of them. A query word
+generates the same deletes, so two words within that many edits always meet on a common
+delete, with no scan of the vocabulary. The candidates are then checked with an
+optimal-string-alignment distance, where swapping adjacent letters counts as one edit. The
+delete table grows with the vocabulary, not the number of documents.
+"""
+from __future__ import annotations
+
+import heapq
+import re
+import sys
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+_WORD = re.compile(r'[^\W_]+')
+MAX_EDITS = 2
+PREFIX = 7  # longer words only index deletes of their first letters; the full word is verified
+
+
+def words(text: str | None) -> List[str]:
+    return _WORD.findall((text or '').lower())
+
+
+def max_edits(word: str) -> int:
+    """Typos tolerated for a query word: none in very short words or ones with digits ("4th", "b12")."""
+    if len(word) <= 2 or not word.isalpha():
+        return 0
+    return 1 if len(word) <= 5 else MAX_EDITS
+
+
+def deletes(word: str, distance: int) -> Set[str]:
+    """``word`` (cut to ``PREFIX``) and every string made by deleting up to ``distance`` letters from it."""
+    found = {word[:PREFIX]}
+    frontier = found
+    for _ in range(distance):
+        frontier = {part[:i] + part[i + 1:] for part in frontier if len(part) > 1 for i in range(len(part))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` as soon as it must exceed ``limit``.
+
+    Shared prefixes and suffixes are trimmed first and only the diagonal band ``limit`` wide is
+    filled in, so verifying a near miss costs a few dozen cells rather than ``len(a) * len(b)``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    shorter = min(len(a), len(b))
+    head = 0
+    while head < shorter and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < shorter - head and a[-1 - tail] == b[-1 - tail]:
+        tail += 1
+    a, b = a[head:len(a) - tail], b[head:len(b) - tail]
+    if not a or not b:
+        return len(a) or len(b)
+    over = limit + 1
+    previous2: List[int] = []
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        current = [i if i <= limit else over] + [over] * len(b)
+        best = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cb = b[j - 1]
+            value = previous[j - 1] if ca == cb else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+class SymSpellIndex:
+    """Words -> documents, searchable with a bounded number of typos per query word."""
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._deletes: Dict[str, List[str]] = defaultdict(list)
+        self._doc_words: Dict[int, Tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_words)
+
+    @property
+    def vocabulary(self) -> int:
+        return len(self._postings)
+
+    def add(self, doc_id: int, *texts: str | None) -> None:
+        """Index ``doc_id`` under the words of ``texts``, replacing what it was indexed under before."""
+        self.remove(doc_id)
+        # Interned so every document shares one copy of each word with the postings keys.
+        terms = tuple(dict.fromkeys(sys.intern(word) for text in texts for word in words(text)))
+        self._doc_words[doc_id] = terms
+        for term in terms:
+            docs = self._postings.get(term)
+            if docs is None:
+                docs = self._postings[term] = set()
+                if max_edits(term):
+                    for key in deletes(term, MAX_EDITS):
+                        self._deletes[key].append(term)
+            docs.add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        for term in self._doc_words.pop(doc_id, ()):
+            docs = self._postings[term]
+            docs.discard(doc_id)
+            if docs:
+                continue
+            del self._postings[term]
+            if max_edits(term):
+                for key in deletes(term, MAX_EDITS):
+                    terms = self._deletes[key]
+                    terms.remove(term)
+                    if not terms:
+                        del self._deletes[key]
+
+    def similar_terms(self, word: str) -> Dict[str, int]:
+        """Indexed words within ``max_edits(word)`` of ``word``, with their distances."""
+        limit = max_edits(word)
+        matches = {word: 0} if word in self._postings else {}
+        if not limit:
+            return matches
+        seen = set(matches)
+        for key in deletes(word, limit):
+            for term in self._deletes.get(key, ()):
+                if term not in seen:
+                    seen.add(term)
+                    distance = edit_distance(word, term, limit)
+                    if distance <= limit:
+                        matches[term] = distance
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[int, int, int]]:
+        """``(doc_id, words_matched, total_edits)`` best first: most query words, then fewest edits."""
+        query_words = list(dict.fromkeys(words(query)))
+        if len(query_words) == 1:
+            return self._search_word(query_words[0], limit)
+        matched: Dict[int, int] = defaultdict(int)
+        edits: Dict[int, int] = defaultdict(int)
+        for word in query_words:
+            best: Dict[int, int] = {}
+            for term, distance in sorted(self.similar_terms(word).items(), key=lambda item: -item[1]):
+                best.update(dict.fromkeys(self._postings[term], distance))  # closest term written last
+            for doc_id, distance in best.items():
+                matched[doc_id] += 1
+                edits[doc_id] += distance
+        ranked = heapq.nsmallest(limit, matched, key=lambda doc_id: (-matched[doc_id], edits[doc_id], doc_id))
+        return [(doc_id, matched[doc_id], edits[doc_id]) for doc_id in ranked]
+
+    def _search_word(self, word: str, limit: int) -> List[Tuple[int, int, int]]:
+        """One-word ``search``: whole distance tiers are taken in order, never ranked doc by doc."""
+        tiers: Dict[int, List[Set[int]]] = defaultdict(list)
+        for term, distance in self.similar_terms(word).items():
+            tiers[distance].append(self._postings[term])
+        hits: List[Tuple[int, int, int]] = []
+        taken: Set[int] = set()
+        for distance in sorted(tiers):
+            docs = set().union(*tiers[distance]) - taken
+            taken |= docs
+            hits.extend((doc_id, 1, distance) for doc_id in heapq.nsmallest(limit - len(hits), docs))
+            if len(hits) >= limit:
+                break
+        return hits
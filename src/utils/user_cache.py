@@ -0,0 +1,34 @@
+"""Per-worker cache of ``User`` objects for Flask-Login's ``user_loader``."""
+from __future__ import annotations
+
+from typing import Callable, Optional, TypeVar
+
+from src.utils.keyed_cache import KeyedCache
+
+UserT = TypeVar('UserT')
+
+
+class UserCache:
+    """LRU of users keyed by id, each entry stamped with the accounts version it was loaded at.
+
+    Triggers bump the ``accounts:version`` counter on any change to a user row, and the loader
+    passes the current value in, so a role change, suspension or close made by any worker applies
+    on the next request everywhere. ``UserDAL`` also invalidates the user in its own worker, and
+    ``ttl`` is only a backstop. Misses (``None``) are cached too, so a stale session cookie does
+    not query the users table on every request.
+    """
+
+    _cache: KeyedCache = KeyedCache()
+
+    @classmethod
+    def get(cls, user_id: int, load: Callable[[int], Optional[UserT]], ttl: float = 60,
+            version: int | None = None) -> Optional[UserT]:
+        return cls._cache.get(user_id, lambda: load(user_id), ttl, stamp=version)
+
+    @classmethod
+    def invalidate(cls, *user_ids: int) -> None:
+        cls._cache.invalidate(*user_ids)
+
+    @classmethod
+    def invalidate_all(cls) -> None:
+        cls._cache.clear()
@@ -0,0 +1,62 @@
+from src.controllers import api_controller
+from src.data_access.db import get_connection
+from src.data_access.resource_dal import ResourceDAL
+
+
+def _login(client, email, password):
+    client.post('/auth/login', data={'email': email, 'password': password}, follow_redirects=True)
+
+
+def test_resource_pages_follow_the_cursor_with_sparse_fields(client, app):
+    with app.app_context():
+        published = [r.resource_id for r in ResourceDAL.search_resources(sort='id')]
+    seen, cursor = [], None
+    while True:
+        query = '/api/v1/resources?limit=1&fields=title' + (f'&after={cursor}' if cursor else '')
+        page = client.get(query).get_json()
+        assert all(set(row) == {'resource_id', 'title'} for row in page['data'])
+        seen += [row['resource_id'] for row in page['data']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == published
+    assert client.get('/api/v1/resources?fields=password').status_code == 400
+
+
+def test_batch_get_keeps_request_order_and_hides_drafts(client, app):
+    with app.app_context():
+        staff_id = get_connection().execute(
+            "SELECT user_id FROM users WHERE email = 'staff@campus.test'").fetchone()[0]
+        draft = ResourceDAL.create_resource(staff_id, 'Quiet pod', 'Draft listing', 'Study room', 'Library', 2,
+                                            None, 'draft', [])
+        first, second = ResourceDAL.search_resources(sort='id')[:2]
+    ids = f'{second.resource_id},{draft.resource_id},{first.resource_id}'
+    data = client.get(f'/api/v1/resources?ids={ids}&fields=status').get_json()['data']
+    assert [row['resource_id'] for row in data] == [second.resource_id, first.resource_id]
+    assert client.get(f'/api/v1/resources/{draft.resource_id}').status_code == 404
+    _login(client, 'staff@campus.test', 'StaffPass1!')
+    assert client.get(f'/api/v1/resources/{draft.resource_id}?fields=status').get_json()['data']['status'] == 'draft'
+
+
+def test_etag_revalidates_small_pages_and_large_ones_stream(client, app, monkeypatch):
+    response = client.get('/api/v1/resources')
+    assert response.headers['ETag']
+    assert client.get('/api/v1/resources', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    monkeypatch.setattr(api_controller, 'BUFFERED_PAGE_SIZE', 1)
+    streamed = client.get('/api/v1/resources?limit=2')
+    assert streamed.is_streamed and 'ETag' not in streamed.headers
+    assert streamed.get_json()['data']
+
+
+def test_bookings_are_private_to_the_requester(client, app):
+    assert client.get('/api/v1/bookings').status_code == 401
+    _login(client, 'student@campus.test', 'StudentPass1!')
+    rows = client.get('/api/v1/bookings').get_json()['data']
+    with app.app_context():
+        student_id = get_connection().execute(
+            "SELECT user_id FROM users WHERE email = 'student@campus.test'").fetchone()[0]
+        other = get_connection().execute(
+            'SELECT booking_id FROM bookings WHERE requester_id != ? LIMIT 1', (student_id,)).fetchone()
+    assert rows and all(row['requester_id'] == student_id for row in rows)
+    if other:
+        assert client.get(f'/api/v1/bookings?ids={other[0]}').get_json()['data'] == []
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 
 from src.data_access.booking_dal import BookingDAL
+from src.data_access.db import get_connection, iter_rows
 from src.data_access.resource_dal import ResourceDAL
 from src.data_access.user_dal import UserDAL
 
@@ -29,3 +30,51 @@ def test_booking_request_flow(client, app):
     }, follow_redirects=True)
     assert resp.status_code == 200
     assert b'Booking submitted' in resp.data
+
+
+def test_iter_bookings_streams_dataclasses_or_tuples(app):
+    with app.app_context():
+        bookings = list(BookingDAL.iter_bookings(batch_size=2))
+        raw = list(BookingDAL.iter_bookings(raw=True, batch_size=2))
+        assert bookings and [b.booking_id for b in bookings] == sorted(b.booking_id for b in bookings)
+        assert raw == [tuple(getattr(b, column) for column in BookingDAL.COLUMNS) for b in bookings]
+        assert all(b.status == 'completed' for b in BookingDAL.iter_bookings(status='completed'))
+
+
+def test_abandoned_iterator_releases_its_statement(app):
+    with app.app_context():
+        conn = get_connection()
+        conn.execute('CREATE TABLE scratch (n INTEGER)')
+        conn.executemany('INSERT INTO scratch VALUES (?)', [(n,) for n in range(50)])
+        rows = iter_rows('SELECT n FROM scratch', batch_size=10, raw=True)
+        assert [next(rows) for _ in range(3)] == [(0,), (1,), (2,)]
+        rows.close()
+        conn.execute('DROP TABLE scratch')  # "database table is locked" while a statement is still open
+
+
+def test_models_are_slotted_and_share_interned_statuses(app):
+    with app.app_context():
+        resource = ResourceDAL.get_featured_resources(limit=1)[0]
+        student = UserDAL.get_user_by_email('student@campus.test')
+        for day in (1, 2):
+            start = datetime(2030, 1, day, 9)
+            BookingDAL.create_booking(resource.resource_id, student.user_id, start.isoformat(),
+                                      (start + timedelta(hours=1)).isoformat(), notes=None)
+        first, second = BookingDAL.list_recent(2)
+        assert not hasattr(first, '__dict__')
+        assert first.status == 'pending' and first.status is second.status
+
+
+def test_list_views_use_projections(client, app):
+    with app.app_context():
+        resource = ResourceDAL.get_featured_resources(limit=1)[0]
+        ResourceDAL.update_resource(resource.resource_id, summary='x' * 500)
+        card = next(r for r in ResourceDAL.search_resources() if r.resource_id == resource.resource_id)
+        assert not hasattr(card, 'gallery') and len(card.summary) == 161
+        student = UserDAL.get_user_by_email('student@campus.test')
+        BookingDAL.create_booking(resource.resource_id, student.user_id, '2030-02-01T09:00:00',
+                                  '2030-02-01T10:00:00', notes='Bring the spare projector cable')
+        row = BookingDAL.get_bookings_by_requester(student.user_id)[0]
+        assert row.resource_title == resource.title and not hasattr(row, 'notes')
+    client.post('/auth/login', data={'email': 'student@campus.test', 'password': 'StudentPass1!'})
+    assert resource.title.encode() in client.get('/bookings/mine').data
@@ -0,0 +1,63 @@
+import csv
+import gzip
+import io
+import json
+import sqlite3
+
+from src.data_access.db import get_connection
+from src.utils import exports
+
+
+def _login(client, email, password):
+    client.post('/auth/login', data={'email': email, 'password': password}, follow_redirects=True)
+
+
+def test_admin_csv_export_streams_every_booking(client, app):
+    _login(client, 'admin@campus.test', 'AdminPass1!')
+    response = client.get('/admin/export/bookings')
+    assert response.status_code == 200
+    assert response.is_streamed
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    with app.app_context():
+        total = get_connection().execute('SELECT COUNT(*) FROM bookings').fetchone()[0]
+    assert len(rows) == total
+    assert set(rows[0]) == set(exports.DATASETS['bookings'].columns)
+
+
+def test_gzip_jsonl_export_applies_filters(client, app, monkeypatch):
+    monkeypatch.setattr(exports, 'CHUNK_BYTES', 1)
+    _login(client, 'admin@campus.test', 'AdminPass1!')
+    response = client.get('/admin/export?dataset=resources&format=jsonl&gzip=1&status=published&department=library')
+    assert response.mimetype == 'application/gzip'
+    records = [json.loads(line) for line in gzip.decompress(response.data).decode().splitlines()]
+    assert records and {(r['status'], r['department']) for r in records} == {('published', 'Library')}
+
+    assert client.get('/admin/export/reviews?since=yesterday').status_code == 400
+    assert client.get('/admin/export/users').status_code == 400
+
+
+def test_staff_exports_are_limited_to_their_department(client, app):
+    _login(client, 'student@campus.test', 'StudentPass1!')
+    assert client.get('/admin/export/bookings').status_code == 403
+    client.get('/auth/logout')
+
+    _login(client, 'staff@campus.test', 'StaffPass1!')
+    rows = list(csv.DictReader(io.StringIO(client.get('/admin/export/resources?department=Engineering').get_data(as_text=True))))
+    assert rows and {row['department'] for row in rows} == {'Library'}
+
+
+def test_writes_proceed_while_an_export_is_partly_read(app, monkeypatch):
+    monkeypatch.setattr(exports, 'CHUNK_BYTES', 1)
+    with app.app_context():
+        conn = get_connection()
+        conn.execute('''INSERT INTO bookings (resource_id, requester_id, start_datetime, end_datetime, status)
+                        SELECT resource_id, requester_id, start_datetime, end_datetime, status FROM bookings''')
+        conn.commit()
+        chunks = exports.stream_export('bookings', batch_size=1)
+        first = next(chunks)  # header and first row; the statement is still open on the rest
+        writer = sqlite3.connect(app.config['DATABASE_PATH'], timeout=0)
+        writer.execute("UPDATE users SET department = 'Library' WHERE email = 'student@campus.test'")
+        writer.commit()
+        writer.close()
+        rest = b''.join(chunks)
+    assert first.startswith(b'booking_id') and rest
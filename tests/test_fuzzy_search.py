@@ -0,0 +1,49 @@
+from src.data_access.resource_dal import ResourceDAL
+from src.utils.fuzzy_search import FuzzyResourceIndex
+from src.utils.symspell import SymSpellIndex, edit_distance
+
+
+def test_symspell_index_ranks_by_words_matched_then_edits():
+    index = SymSpellIndex()
+    index.add(1, 'Innovation Loft', 'Wells Library 4th Floor')
+    index.add(2, 'Audio Storytelling Kit', 'Media Commons')
+    index.add(3, 'Wells Quiet Room', 'Wells Hall')
+    assert edit_distance('libary', 'library', 2) == 1
+    assert edit_distance('storyetlling', 'storytelling', 2) == 1  # transposition
+    assert [doc for doc, _, _ in index.search('welles libary')] == [1, 3]
+    assert index.search('4th') == [(1, 1, 0)] and index.search('5th') == []
+    index.add(1, 'Innovation Loft', 'Media Commons')
+    index.remove(3)
+    assert index.search('wells') == [] and index.vocabulary == 7
+
+
+def test_browse_falls_back_to_close_matches(client, app):
+    page = client.get('/resources/?keyword=Inovation+Lof').get_data(as_text=True)
+    assert 'showing close matches' in page and 'Innovation Loft' in page
+    with app.app_context():
+        assert [card.title for card in ResourceDAL.fuzzy_search(location='Wels Libary')] == ['Innovation Loft']
+        assert ResourceDAL.fuzzy_search(keyword='Inovation', category='AV Equipment') == []
+    assert 'No resources match' in client.get('/resources/?keyword=zzzzzz').get_data(as_text=True)
+
+
+def test_index_follows_resource_writes(app):
+    with app.app_context():
+        target = ResourceDAL.search_resources(keyword='Audio')[0]
+        ResourceDAL.update_resource(target.resource_id, title='Podcast Recording Booth')
+        created = ResourceDAL.create_resource(target.owner_id, 'Makerspace Laser Cutter', 'Cuts acrylic.', 'Lab',
+                                              'Luddy Hall', 2, None, 'published', [])
+        assert [card.resource_id for card in ResourceDAL.fuzzy_search(keyword='podcats')] == [target.resource_id]
+        assert ResourceDAL.fuzzy_search(keyword='storytelling') == []
+        assert [card.resource_id for card in ResourceDAL.fuzzy_search(keyword='makerspase')] == [created.resource_id]
+        assert FuzzyResourceIndex.snapshot()['resources'] == 3
+
+
+def test_filters_apply_before_the_fallback_is_cut_to_size(client, app):
+    with app.app_context():
+        owner = ResourceDAL.get_resource_by_id(1).owner_id
+        for n in range(6):
+            ResourceDAL.create_resource(owner, f'Welles Annex {n}', 'Not yet open.', 'Study Room', 'Welles Hall',
+                                        4, None, 'draft', [])
+        assert [card.title for card in ResourceDAL.fuzzy_search(keyword='Welles', limit=1)] == ['Innovation Loft']
+    page = client.get('/resources/?keyword=Welles').get_data(as_text=True)
+    assert '1 close match<' in page and '0 results' not in page
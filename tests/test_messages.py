@@ -0,0 +1,222 @@
+import pytest
+
+from src.data_access.db import get_connection, transaction
+from src.data_access.message_dal import MessageDAL
+from src.data_access.notification_dal import NotificationDAL
+from src.data_access.review_dal import ReviewDAL
+from src.data_access.user_dal import UserDAL
+
+
+def _login(client, email, password):
+    return client.post('/auth/login', data={'email': email, 'password': password}, follow_redirects=True)
+
+
+def test_thread_page_anchors_on_newest_messages(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        student = UserDAL.get_user_by_email('student@campus.test')
+        thread = MessageDAL.find_or_create_thread(owner_id=staff.user_id, participant_id=student.user_id)
+        posted = [MessageDAL.post_message(thread.thread_id, student.user_id, f'Message {i}') for i in range(7)]
+
+        page, cursor = MessageDAL.get_thread_page(thread.thread_id, limit=3)
+        assert [m.body for m in page] == ['Message 4', 'Message 5', 'Message 6']
+        assert cursor == posted[4].message_id
+
+        earlier, cursor = MessageDAL.get_thread_page(thread.thread_id, limit=3, before_id=cursor)
+        assert [m.body for m in earlier] == ['Message 1', 'Message 2', 'Message 3']
+        oldest, cursor = MessageDAL.get_thread_page(thread.thread_id, limit=3, before_id=cursor)
+        assert [m.body for m in oldest] == ['Message 0']
+        assert cursor is None
+
+        newer = MessageDAL.get_messages_since(thread.thread_id, posted[5].message_id)
+        assert [m.body for m in newer] == ['Message 6']
+
+
+def test_iter_thread_messages_streams_in_batches_after_a_cursor(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        admin = UserDAL.get_user_by_email('admin@campus.test')
+        thread = MessageDAL.find_or_create_thread(owner_id=staff.user_id, participant_id=admin.user_id)
+        posted = [MessageDAL.post_message(thread.thread_id, admin.user_id, f'Line {i}') for i in range(5)]
+
+        assert [m.body for m in MessageDAL.iter_thread_messages(thread.thread_id, batch_size=2)] == \
+            [f'Line {i}' for i in range(5)]
+        after = list(MessageDAL.iter_thread_messages(thread.thread_id, after_id=posted[2].message_id, raw=True))
+        assert [row[MessageDAL.MESSAGE_COLUMNS.index('body')] for row in after] == ['Line 3', 'Line 4']
+        assert all(isinstance(row, tuple) and len(row) == len(MessageDAL.MESSAGE_COLUMNS) for row in after)
+
+
+def test_iter_users_filters_by_role_and_yields_column_ordered_tuples(app):
+    with app.app_context():
+        users = list(UserDAL.iter_users(batch_size=1))
+        assert [user.user_id for user in users] == sorted(user.user_id for user in users)
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        rows = list(UserDAL.iter_users(role='staff', raw=True))
+        assert staff.user_id in [row[0] for row in rows]
+        assert {row[UserDAL.COLUMNS.index('role')] for row in rows} == {'staff'}
+        row = next(row for row in rows if row[0] == staff.user_id)
+        assert dict(zip(UserDAL.COLUMNS, row))['email'] == 'staff@campus.test'
+        assert 'password_hash' not in UserDAL.COLUMNS
+        assert [user.user_id for user in UserDAL.iter_users(after_id=users[1].user_id)] == \
+            [user.user_id for user in users[2:]]
+
+
+def test_thread_updates_endpoint_requires_participant(client, app):
+    with app.app_context():
+        thread = MessageDAL.list_threads_for_user(UserDAL.get_user_by_email('student@campus.test').user_id)[0]
+    _login(client, 'admin@campus.test', 'AdminPass1!')
+    assert client.get(f'/messages/thread/{thread.thread_id}/updates').status_code == 404
+
+    client.get('/auth/logout')
+    _login(client, 'student@campus.test', 'StudentPass1!')
+    resp = client.get(f'/messages/thread/{thread.thread_id}/updates?since=0')
+    assert resp.status_code == 200
+    assert len(resp.get_json()['messages']) == 2
+
+
+def test_inbox_rows_track_preview_and_unread(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        admin = UserDAL.get_user_by_email('admin@campus.test')
+        thread = MessageDAL.find_or_create_thread(owner_id=staff.user_id, participant_id=admin.user_id)
+        assert MessageDAL.find_or_create_thread(owner_id=admin.user_id, participant_id=staff.user_id).thread_id == thread.thread_id
+
+        MessageDAL.post_message(thread.thread_id, admin.user_id, 'Can I borrow the projector?')
+        MessageDAL.post_message(thread.thread_id, admin.user_id, 'Tomorrow morning works best.')
+
+        staff_entry = MessageDAL.list_inbox(staff.user_id)[0]
+        assert staff_entry.thread_id == thread.thread_id
+        assert staff_entry.other_user_name == admin.name
+        assert staff_entry.last_message_preview == 'Tomorrow morning works best.'
+        assert staff_entry.unread_count == 2
+        assert MessageDAL.list_inbox(admin.user_id)[0].unread_count == 0
+
+        MessageDAL.mark_thread_read(thread.thread_id, staff.user_id)
+        assert MessageDAL.list_inbox(staff.user_id)[0].unread_count == 0
+
+
+def test_seeded_thread_is_backfilled_into_inbox(client):
+    _login(client, 'staff@campus.test', 'StaffPass1!')
+    resp = client.get('/messages/')
+    assert resp.status_code == 200
+    assert b'Student Malik' in resp.data
+    assert b'Innovation Loft' in resp.data
+    assert b'Yes, please submit a booking' in resp.data
+
+
+def test_thread_stream_resumes_from_last_event_id(client, app):
+    app.config.update(SSE_MAX_STREAM_SECONDS=0, SSE_POLL_SECONDS=0)
+    with app.app_context():
+        student = UserDAL.get_user_by_email('student@campus.test')
+        thread = MessageDAL.list_threads_for_user(student.user_id)[0]
+        channel = MessageDAL.thread_channel(thread.thread_id)
+        start_id = MessageDAL.latest_event_id(channel)
+        MessageDAL.post_message(thread.thread_id, student.user_id, 'First live message')
+        MessageDAL.post_message(thread.thread_id, student.user_id, 'Second live message')
+
+    _login(client, 'student@campus.test', 'StudentPass1!')
+    resp = client.get(f'/messages/thread/{thread.thread_id}/stream', headers={'Last-Event-ID': str(start_id)})
+    assert resp.mimetype == 'text/event-stream'
+    body = resp.get_data(as_text=True)
+    assert body.count('event: message') == 2
+    assert 'First live message' in body and 'Second live message' in body
+
+    resumed = client.get(f'/messages/thread/{thread.thread_id}/stream').get_data(as_text=True)
+    assert 'event: message' not in resumed
+
+
+def test_thread_stream_resumes_across_more_than_one_page_of_events(client, app):
+    app.config.update(SSE_MAX_STREAM_SECONDS=0, SSE_POLL_SECONDS=0)
+    with app.app_context():
+        student = UserDAL.get_user_by_email('student@campus.test')
+        thread = MessageDAL.list_threads_for_user(student.user_id)[0]
+        start_id = MessageDAL.latest_event_id(MessageDAL.thread_channel(thread.thread_id))
+        for index in range(130):
+            MessageDAL.post_message(thread.thread_id, student.user_id, f'Backlog {index}')
+
+    _login(client, 'student@campus.test', 'StudentPass1!')
+    body = client.get(f'/messages/thread/{thread.thread_id}/stream',
+                      headers={'Last-Event-ID': str(start_id)}).get_data(as_text=True)
+    assert body.count('event: message') == 130
+    assert 'Backlog 0"' in body and 'Backlog 129"' in body
+
+
+def test_broker_queue_is_bounded():
+    from src.utils.message_broker import MessageBroker
+
+    broker = MessageBroker()
+    subscription = broker.subscribe('thread:1', maxsize=2)
+    for event_id in range(1, 4):
+        broker.publish('thread:1', {'event_id': event_id})
+    assert subscription.overflowed
+    assert subscription.get(timeout=0)['event_id'] == 2
+    broker.unsubscribe(subscription)
+    assert broker.subscriber_count('thread:1') == 0
+
+
+def test_read_cursor_settles_unread_totals(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        admin = UserDAL.get_user_by_email('admin@campus.test')
+        thread = MessageDAL.find_or_create_thread(owner_id=staff.user_id, participant_id=admin.user_id)
+        first = MessageDAL.post_message(thread.thread_id, admin.user_id, 'One')
+        MessageDAL.post_message(thread.thread_id, admin.user_id, 'Two')
+        MessageDAL.post_message(thread.thread_id, admin.user_id, 'Three')
+        assert MessageDAL.get_unread_total(staff.user_id) == 3
+        assert MessageDAL.get_unread_total(admin.user_id) == 0
+
+        MessageDAL.mark_thread_read(thread.thread_id, staff.user_id, up_to_message_id=first.message_id)
+        entry = MessageDAL.list_inbox(staff.user_id)[0]
+        assert entry.last_read_message_id == first.message_id
+        assert entry.unread_count == 2
+        assert MessageDAL.get_unread_total(staff.user_id) == 2
+
+        MessageDAL.mark_thread_read(thread.thread_id, staff.user_id)
+        assert MessageDAL.list_inbox(staff.user_id)[0].unread_count == 0
+        assert MessageDAL.get_unread_total(staff.user_id) == 0
+
+
+def test_message_search_is_scoped_to_participants(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        student = UserDAL.get_user_by_email('student@campus.test')
+        admin = UserDAL.get_user_by_email('admin@campus.test')
+        private = MessageDAL.find_or_create_thread(owner_id=staff.user_id, participant_id=admin.user_id)
+        MessageDAL.post_message(private.thread_id, admin.user_id, 'Budget <projector> discussion')
+
+        hits = MessageDAL.search_messages('project', user_id=admin.user_id)
+        assert [hit.thread_id for hit in hits] == [private.thread_id]
+        assert '<mark>' in hits[0].snippet and '&lt;' in hits[0].snippet
+        assert MessageDAL.search_messages('projector', user_id=student.user_id) == []
+        assert len(MessageDAL.search_messages('loft available', user_id=None)) == 1
+        assert MessageDAL.search_messages('"*(', user_id=None) == []
+
+
+def test_admin_moderation_searches_reviews(client):
+    _login(client, 'admin@campus.test', 'AdminPass1!')
+    resp = client.get('/admin/moderation?scope=reviews&q=whiteboard')
+    assert resp.status_code == 200
+    assert b'<mark>whiteboards</mark>' in resp.data
+
+
+def test_dal_writes_roll_back_together_inside_transaction(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        admin = UserDAL.get_user_by_email('admin@campus.test')
+        conn = get_connection()
+        reviews = conn.execute('SELECT COUNT(*) FROM reviews').fetchone()[0]
+        unread = MessageDAL.get_unread_total(staff.user_id)
+        with pytest.raises(RuntimeError):
+            with transaction():
+                thread = MessageDAL.find_or_create_thread(owner_id=staff.user_id, participant_id=admin.user_id)
+                MessageDAL.post_message(thread.thread_id, admin.user_id, 'Rolled back with the rest')
+                ReviewDAL.create_review(1, admin.user_id, 5, 'Never committed')
+                UserDAL.update_role(staff.user_id, 'student')
+                raise RuntimeError('step three failed')
+        assert MessageDAL.list_inbox(admin.user_id) == []
+        assert MessageDAL.get_unread_total(staff.user_id) == unread
+        assert conn.execute('SELECT COUNT(*) FROM reviews').fetchone()[0] == reviews
+        assert UserDAL.get_user_by_id(staff.user_id).role == 'staff'
+        with pytest.raises(RuntimeError):
+            with transaction():
+                NotificationDAL.compact(retention_days=30)
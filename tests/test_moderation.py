@@ -0,0 +1,172 @@
+from src.data_access.db import get_connection
+from src.data_access.moderation_dal import ModerationDAL
+from src.data_access.message_dal import HIDDEN_MESSAGE_TEXT, MessageDAL
+from src.data_access.review_dal import ReviewDAL
+from src.data_access.user_dal import UserDAL
+from src.utils.aho_corasick import Automaton
+from src.utils.content_filter import ContentFilter
+from src.utils.minhash import MinHashLSH, signature_for, similarity
+from src.utils.near_duplicates import NearDuplicateIndex, backfill_signatures
+
+SPAM = 'Cheap textbook rentals available now, message me on the campus marketplace for the best weekly deals'
+
+
+def test_minhash_estimates_similarity():
+    original = signature_for(SPAM)
+    edited = signature_for(SPAM.replace('best weekly', 'best monthly'))
+    unrelated = signature_for('The projector in this room flickers whenever the blinds are open in the afternoon')
+    assert similarity(original, edited) > 0.6
+    assert similarity(original, unrelated) < 0.2
+    assert signature_for('Thanks, see you then!') is None
+
+    lsh = MinHashLSH()
+    lsh.add(('review', 1), original)
+    lsh.add(('review', 2), unrelated)
+    assert [key for key, _ in lsh.query(edited, 0.6)] == [('review', 1)]
+
+
+def test_near_duplicate_review_is_flagged_on_write(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        student = UserDAL.get_user_by_email('student@campus.test')
+        first = ReviewDAL.create_review(1, student.user_id, 5, SPAM)
+        copy = ReviewDAL.create_review(2, staff.user_id, 5, SPAM.replace('now', 'today'))
+        honest = ReviewDAL.create_review(3, staff.user_id, 4, 'Quiet room with good lighting and plenty of outlets for laptops')
+
+        assert ModerationDAL.flags_for('review', first.review_id) == []
+        [flag] = ModerationDAL.flags_for('review', copy.review_id)
+        assert (flag.matched_kind, flag.matched_ref_id) == ('review', first.review_id)
+        assert ModerationDAL.flags_for('review', honest.review_id) == []
+        assert ModerationDAL.list_flags()[0].excerpt == copy.comment
+
+
+def test_backfill_signs_existing_rows_once(app):
+    with app.app_context():
+        conn = get_connection()
+        student = UserDAL.get_user_by_email('student@campus.test')
+        conn.executemany(
+            'INSERT INTO reviews (resource_id, reviewer_id, rating, comment) VALUES (1, ?, 3, ?)',
+            [(student.user_id, SPAM), (student.user_id, SPAM + ' again')]
+        )
+        conn.commit()
+
+        first = backfill_signatures(batch_size=2)
+        assert first['flagged'] >= 1
+        assert backfill_signatures(batch_size=2) == {'signed': 0, 'flagged': 0}
+
+        NearDuplicateIndex.sync()
+        assert len(NearDuplicateIndex._lsh) == conn.execute('SELECT COUNT(*) FROM content_signatures').fetchone()[0]
+
+
+def test_admin_flag_queue(client, app):
+    with app.app_context():
+        student = UserDAL.get_user_by_email('student@campus.test')
+        ReviewDAL.create_review(1, student.user_id, 5, SPAM)
+        ReviewDAL.create_review(2, student.user_id, 5, SPAM)
+        flag = ModerationDAL.list_flags()[0]
+    client.post('/auth/login', data={'email': 'admin@campus.test', 'password': 'AdminPass1!'})
+    page = client.get('/admin/moderation?scope=flags')
+    assert b'near duplicate' in page.data
+    client.post(f'/admin/flags/{flag.flag_id}', data={'status': 'dismissed'})
+    with app.app_context():
+        assert ModerationDAL.list_flags() == []
+
+
+def test_actioned_flag_hides_the_flagged_row_not_the_form_target(client, app):
+    with app.app_context():
+        student = UserDAL.get_user_by_email('student@campus.test')
+        original = ReviewDAL.create_review(1, student.user_id, 5, SPAM)
+        copy = ReviewDAL.create_review(2, student.user_id, 5, SPAM)
+        flag = ModerationDAL.list_flags()[0]
+    client.post('/auth/login', data={'email': 'admin@campus.test', 'password': 'AdminPass1!'})
+    client.post(f'/admin/flags/{flag.flag_id}',
+                data={'status': 'actioned', 'kind': 'review', 'ref_id': original.review_id})
+    assert client.post('/admin/flags/999999', data={'status': 'actioned'}).status_code == 404
+    with app.app_context():
+        assert ReviewDAL.get_review_by_id(copy.review_id).is_hidden
+        assert not ReviewDAL.get_review_by_id(original.review_id).is_hidden
+        assert ModerationDAL.get_flag(flag.flag_id).status == 'actioned'
+
+
+def test_automaton_matches_whole_words_in_one_pass():
+    automaton = Automaton([('scam', 'flag'), ('free money', 'hide'), ('ass', 'flag')])
+    matches = automaton.scan('Total SCAM: free money for the class, ass!')
+    assert [(m.start, m.end, m.term, m.payload) for m in matches] == [
+        (6, 10, 'scam', 'flag'), (12, 22, 'free money', 'hide'), (38, 41, 'ass', 'flag'),
+    ]
+    assert automaton.scan('scammer') == []
+
+
+def test_term_policy_flags_and_hides_on_write(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        student = UserDAL.get_user_by_email('student@campus.test')
+        ModerationDAL.save_term('rude', 'flag')
+        flagged = ReviewDAL.create_review(1, student.user_id, 2, 'The desk clerk was rude to us')
+        [flag] = ModerationDAL.flags_for('review', flagged.review_id)
+        assert flag.reason == 'blocked_term' and flag.matched_terms == ['rude']
+        assert not flagged.is_hidden
+
+        ModerationDAL.save_term('spamlink', 'hide')
+        before = ReviewDAL.get_average_for_resource(1).total_reviews
+        hidden = ReviewDAL.create_review(1, staff.user_id, 5, 'Visit spamlink now')
+        assert hidden.is_hidden
+        assert ReviewDAL.get_average_for_resource(1).total_reviews == before
+
+        thread = MessageDAL.find_or_create_thread(owner_id=staff.user_id, participant_id=student.user_id)
+        message = MessageDAL.post_message(thread.thread_id, student.user_id, 'spamlink deals inside')
+        assert message.display_body == HIDDEN_MESSAGE_TEXT
+        assert MessageDAL.list_inbox(staff.user_id)[0].last_message_preview == HIDDEN_MESSAGE_TEXT
+
+        ModerationDAL.delete_term(ModerationDAL.list_terms()[1].term_id)  # 'spamlink'
+        assert not ContentFilter.screen('spamlink').matches
+
+
+def test_hiding_the_latest_message_updates_both_inbox_previews(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        admin = UserDAL.get_user_by_email('admin@campus.test')
+        thread = MessageDAL.find_or_create_thread(owner_id=staff.user_id, participant_id=admin.user_id)
+        first = MessageDAL.post_message(thread.thread_id, admin.user_id, 'Is the lab open?')
+        last = MessageDAL.post_message(thread.thread_id, admin.user_id, 'Reply to my other account instead')
+
+        MessageDAL.set_hidden(first.message_id)
+        assert MessageDAL.list_inbox(staff.user_id)[0].last_message_preview == last.body
+        MessageDAL.set_hidden(last.message_id)
+        for user in (staff, admin):
+            assert MessageDAL.list_inbox(user.user_id)[0].last_message_preview == HIDDEN_MESSAGE_TEXT
+        MessageDAL.set_hidden(last.message_id, hidden=False)
+        assert MessageDAL.list_inbox(admin.user_id)[0].last_message_preview == last.body
+
+
+def test_thread_updates_do_not_leak_hidden_message_text(client, app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        student = UserDAL.get_user_by_email('student@campus.test')
+        ModerationDAL.save_term('spamlink', 'hide')
+        thread = MessageDAL.find_or_create_thread(owner_id=staff.user_id, participant_id=student.user_id)
+        MessageDAL.post_message(thread.thread_id, student.user_id, 'spamlink deals inside')
+    client.post('/auth/login', data={'email': 'staff@campus.test', 'password': 'StaffPass1!'})
+    bodies = [m['body'] for m in client.get(f'/messages/thread/{thread.thread_id}/updates?since=0').get_json()['messages']]
+    assert HIDDEN_MESSAGE_TEXT in bodies and not any('spamlink' in body for body in bodies)
+
+
+def test_index_keeps_only_the_newest_signatures(app):
+    app.config['NEAR_DUPLICATE_MAX_ENTRIES'] = 2
+    with app.app_context():
+        student = UserDAL.get_user_by_email('student@campus.test')
+        reviews = [
+            ReviewDAL.create_review(1, student.user_id, 4, f'Review number {n} about the {word} room and its many chairs')
+            for n, word in enumerate(('quiet', 'noisy', 'sunny'))
+        ]
+        NearDuplicateIndex.sync()
+        assert len(NearDuplicateIndex._lsh) == 2
+        assert ('review', reviews[0].review_id) not in NearDuplicateIndex._lsh
+        NearDuplicateIndex.reset()
+        NearDuplicateIndex.sync()
+        assert ('review', reviews[0].review_id) not in NearDuplicateIndex._lsh
+        assert ('review', reviews[2].review_id) in NearDuplicateIndex._lsh
+        backfill_signatures()  # signs the seeded reviews
+        assert backfill_signatures() == {'signed': 0, 'flagged': 0}  # signed rows are skipped, in the window or not
+        NearDuplicateIndex.sync()
+        assert len(NearDuplicateIndex._lsh) == 2
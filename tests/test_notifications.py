@@ -0,0 +1,286 @@
+import socketserver
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.data_access.db import get_connection, transaction
+from src.data_access.notification_dal import NotificationDAL
+from src.data_access.user_dal import UserDAL
+from src.utils.notification_outbox import OutboxDispatcher, OutboxSettings, SMTPMailer, claim_batch, drain
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: records each DATA payload and counts sessions."""
+
+    def handle(self):
+        server = self.server
+        server.sessions += 1
+        self.wfile.write(b'220 localhost ready\r\n')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.wfile.write(b'250 localhost\r\n')
+            elif command == 'DATA':
+                self.wfile.write(b'354 end with .\r\n')
+                payload = []
+                while (data_line := self.rfile.readline()) not in (b'.\r\n', b''):
+                    payload.append(data_line.decode())
+                if any('Oversized' in data for data in payload):
+                    self.wfile.write(b'552 message size exceeds limit\r\n')
+                    continue
+                server.messages.append(''.join(payload))
+                self.wfile.write(b'250 queued\r\n')
+            elif command == 'QUIT':
+                self.wfile.write(b'221 bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 ok\r\n')
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.sessions = 0
+    server.messages = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _outbox_rows():
+    return get_connection().execute('SELECT * FROM notification_outbox ORDER BY outbox_id').fetchall()
+
+
+def test_outbox_batches_share_one_smtp_session(app, smtp_server):
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=smtp_server.server_address[1])
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        for index in range(3):
+            NotificationDAL.create_notification(staff.user_id, f'Update {index}', email_subject='Queue update')
+        assert [row['status'] for row in _outbox_rows()] == ['pending'] * 3
+
+        processed = drain(SMTPMailer.from_config(app.config), OutboxSettings.from_config(app.config))
+        assert processed == 3
+        assert smtp_server.sessions == 1
+        assert len(smtp_server.messages) == 3
+        assert 'To: staff@campus.test' in smtp_server.messages[0]
+        assert {row['status'] for row in _outbox_rows()} == {'sent'}
+
+
+def test_outbox_retries_then_dead_letters(app):
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=1, OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BASE_SECONDS=0)
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        NotificationDAL.create_notification(staff.user_id, 'Unreachable mail server')
+        mailer = SMTPMailer.from_config(app.config)
+        settings = OutboxSettings.from_config(app.config)
+
+        drain(mailer, settings)
+        row = _outbox_rows()[0]
+        assert row['status'] == 'dead'
+        assert row['attempts'] == 2
+        assert row['last_error']
+
+
+def test_one_rejected_message_does_not_fail_the_batch(app, smtp_server):
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=smtp_server.server_address[1])
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        for message in ('First update', 'Oversized attachment', 'Last update'):
+            NotificationDAL.create_notification(staff.user_id, message)
+
+        drain(SMTPMailer.from_config(app.config), OutboxSettings.from_config(app.config))
+        assert [(row['status'], row['attempts']) for row in _outbox_rows()] == [('sent', 0), ('pending', 1), ('sent', 0)]
+        assert '552' in _outbox_rows()[1]['last_error']
+
+
+def test_expired_claims_count_as_attempts(app):
+    app.config.update(MAIL_SERVER='127.0.0.1')
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        NotificationDAL.create_notification(staff.user_id, 'Crashed mid-send')
+        conn = get_connection()
+        conn.execute("UPDATE notification_outbox SET status = 'sending', attempts = 4, "
+                     "claimed_at = datetime('now', '-1 hour')")
+        conn.commit()
+    with sqlite3.connect(app.config['DATABASE_PATH'], isolation_level=None) as outbox:
+        assert claim_batch(outbox, 10, max_attempts=5) == []
+        assert outbox.execute('SELECT status, attempts FROM notification_outbox').fetchall() == [('dead', 5)]
+
+
+def test_dispatcher_survives_unexpected_errors(app):
+    class BrokenMailer:
+        calls = 0
+
+        def session(self):
+            BrokenMailer.calls += 1
+            raise RuntimeError('mailer misconfigured')
+
+    app.config.update(MAIL_SERVER='127.0.0.1')
+    with app.app_context():
+        NotificationDAL.create_notification(UserDAL.get_user_by_email('staff@campus.test').user_id, 'Queued')
+    settings = OutboxSettings(app.config['DATABASE_PATH'], max_attempts=2, retry_base_seconds=0, poll_seconds=0.001)
+    dispatcher = OutboxDispatcher(BrokenMailer(), settings, workers=1)
+    dispatcher.start()
+    try:
+        for _ in range(500):
+            if BrokenMailer.calls >= 2:
+                break
+            time.sleep(0.01)
+        assert BrokenMailer.calls >= 2 and dispatcher._threads[0].is_alive()
+    finally:
+        dispatcher.stop()
+    with app.app_context():
+        assert [(row['status'], row['attempts']) for row in _outbox_rows()] == [('dead', 2)]
+
+
+def test_outbox_row_rolls_back_with_business_transaction(app):
+    app.config.update(MAIL_SERVER='127.0.0.1')
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        with pytest.raises(RuntimeError):
+            with transaction():
+                NotificationDAL.create_notification(staff.user_id, 'Never committed')
+                raise RuntimeError('booking failed')
+        assert _outbox_rows() == []
+
+
+def test_booking_requests_coalesce_into_one_digest(app):
+    app.config.update(MAIL_SERVER='127.0.0.1')
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        student = UserDAL.get_user_by_email('student@campus.test')
+        conn = get_connection()
+        resource_id = conn.execute('SELECT resource_id FROM resources WHERE owner_id = ? LIMIT 1', (staff.user_id,)).fetchone()[0]
+        before = conn.execute('SELECT COUNT(*) FROM notifications').fetchone()[0]
+        for index in range(3):
+            booking_id = conn.execute(
+                "INSERT INTO bookings (resource_id, requester_id, start_datetime, end_datetime) VALUES (?, ?, '2030-01-01T10:00', '2030-01-01T11:00')",
+                (resource_id, student.user_id)
+            ).lastrowid
+            NotificationDAL.create_notification(
+                staff.user_id,
+                'New booking request for Innovation Loft from Student Malik.',
+                email_subject='New booking request: Innovation Loft',
+                kind='booking_request',
+                resource_id=resource_id,
+                item_id=booking_id,
+                digest='{count} new booking requests for Innovation Loft.',
+            )
+
+        assert conn.execute('SELECT COUNT(*) FROM notifications').fetchone()[0] == before + 1
+        note = NotificationDAL.list_for_user(staff.user_id, limit=1)[0]
+        assert note['message'] == '3 new booking requests for Innovation Loft.'
+        assert len(NotificationDAL.expand(note['notification_id'], staff.user_id)) == 3
+
+        outbox = _outbox_rows()
+        assert len(outbox) == 1
+        assert outbox[0]['body'] == note['message']
+        held = conn.execute("SELECT next_attempt_at > CURRENT_TIMESTAMP FROM notification_outbox").fetchone()[0]
+        assert held == 1
+
+
+def test_email_rate_limit_keeps_in_app_notification(app):
+    app.config.update(MAIL_SERVER='127.0.0.1', NOTIFICATION_EMAIL_HOURLY_LIMIT=2)
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        for index in range(4):
+            NotificationDAL.create_notification(staff.user_id, f'Alert {index}')
+        assert len(_outbox_rows()) == 2
+        assert len(NotificationDAL.list_for_user(staff.user_id, limit=10)) >= 4
+
+
+def test_navbar_feed_blends_sources_and_caches(app):
+    from src.data_access.message_dal import MessageDAL
+    from src.utils.notification_feed import NotificationFeed
+
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        admin = UserDAL.get_user_by_email('admin@campus.test')
+        thread = MessageDAL.find_or_create_thread(owner_id=staff.user_id, participant_id=admin.user_id)
+        MessageDAL.post_message(thread.thread_id, admin.user_id, 'Ping')
+
+        statements = []
+        get_connection().set_trace_callback(statements.append)
+        feed = NotificationFeed.for_user(staff.user_id)
+        assert len(statements) == 1
+        assert {item.kind for item in feed.items} >= {'notification', 'message'}
+        assert feed.unread_messages == 1
+        assert feed.items[0].text == '1 new message from Admin Rivera'
+
+        assert NotificationFeed.for_user(staff.user_id) is feed
+        assert len(statements) == 1
+
+        NotificationDAL.create_notification(staff.user_id, 'Fresh alert')
+        refreshed = NotificationFeed.for_user(staff.user_id)
+        assert refreshed is not feed
+        assert any(item.text == 'Fresh alert' for item in refreshed.items)
+        get_connection().set_trace_callback(None)
+
+
+def test_mark_all_read_moves_high_water_mark(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        NotificationDAL.create_notification(staff.user_id, 'Before mark', email_subject=None)
+        assert NotificationDAL.count_unread(staff.user_id) > 0
+
+        NotificationDAL.mark_all_read(staff.user_id)
+        assert NotificationDAL.count_unread(staff.user_id) == 0
+        assert all(note['is_read'] for note in NotificationDAL.list_for_user(staff.user_id))
+        untouched = get_connection().execute(
+            'SELECT COUNT(*) FROM notifications WHERE user_id = ? AND is_read = 0', (staff.user_id,)
+        ).fetchone()[0]
+        assert untouched > 0
+
+        NotificationDAL.create_notification(staff.user_id, 'After mark', email_subject=None)
+        assert NotificationDAL.count_unread(staff.user_id) == 1
+        assert not NotificationDAL.list_for_user(staff.user_id, limit=1)[0]['is_read']
+
+
+def test_read_digest_is_not_reopened_by_new_items(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        options = dict(email_subject=None, kind='booking_request', resource_id=1, digest='{count} new requests.')
+        NotificationDAL.create_notification(staff.user_id, 'Request 1', item_id=1, **options)
+        NotificationDAL.mark_all_read(staff.user_id)
+        NotificationDAL.create_notification(staff.user_id, 'Request 2', item_id=2, **options)
+        assert NotificationDAL.list_for_user(staff.user_id, limit=1)[0]['message'] == 'Request 2'
+
+
+def test_compaction_archives_old_notifications_in_batches(app):
+    from src.utils.maintenance import run_retention
+
+    with app.app_context():
+        conn = get_connection()
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        for index in range(5):
+            NotificationDAL.create_notification(staff.user_id, f'Old {index}', email_subject=None)
+        conn.execute("UPDATE notifications SET created_at = datetime('now', '-400 days')")
+        NotificationDAL.create_notification(staff.user_id, 'Recent', email_subject=None)
+        conn.commit()
+        total = conn.execute('SELECT COUNT(*) FROM notifications').fetchone()[0]
+
+        app.config.update(NOTIFICATION_RETENTION_DAYS=180, RETENTION_BATCH_SIZE=2)
+        removed = run_retention(app)['notifications']
+        assert removed == total - 1
+        assert [row[0] for row in conn.execute('SELECT message FROM notifications')] == ['Recent']
+        assert conn.execute('SELECT COUNT(*) FROM notifications_archive').fetchone()[0] == removed
+
+
+def test_only_one_scheduler_per_interval_runs_retention(app):
+    from src.utils.maintenance import MaintenanceScheduler
+
+    workers = [MaintenanceScheduler(app, 3600) for _ in range(3)]
+    assert [worker.tick() is not None for worker in workers] == [True, False, False]
+    with app.app_context():
+        get_connection().execute("UPDATE stats_counters SET value = 0 WHERE name = 'lease:retention'")
+        get_connection().commit()
+    assert workers[2].tick() is not None
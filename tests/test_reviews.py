@@ -0,0 +1,97 @@
+from src.data_access.db import get_connection, init_database
+from src.data_access.resource_dal import ResourceDAL
+from src.data_access.review_dal import ReviewDAL, rebuild_rating_aggregates
+from src.data_access.user_dal import UserDAL
+
+
+def _fresh_resource(owner_id, title):
+    return ResourceDAL.create_resource(owner_id, title, 'Summary', 'Study Room', 'Library', 4, None, 'published', [])
+
+
+def test_rating_aggregates_follow_insert_hide_and_delete(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        student = UserDAL.get_user_by_email('student@campus.test')
+        resource = _fresh_resource(staff.user_id, 'Rated room')
+
+        first = ReviewDAL.create_review(resource.resource_id, student.user_id, 5, 'Great')
+        ReviewDAL.create_review(resource.resource_id, staff.user_id, 2, 'Noisy')
+        stats = ReviewDAL.get_average_for_resource(resource.resource_id)
+        assert (stats.total_reviews, stats.avg_rating) == (2, 3.5)
+        assert stats.histogram == {5: 1, 4: 0, 3: 0, 2: 1, 1: 0}
+        assert stats.score == (7 + 3.0 * 5) / (2 + 5)
+
+        ReviewDAL.set_hidden(first.review_id)
+        stats = ReviewDAL.get_average_for_resource(resource.resource_id)
+        assert (stats.total_reviews, stats.histogram[5]) == (1, 0)
+        assert [review.rating for review in ReviewDAL.list_for_resource(resource.resource_id)] == [2]
+
+        ReviewDAL.delete_review(first.review_id)
+        assert ReviewDAL.get_average_for_resource(resource.resource_id).total_reviews == 1
+
+        conn = get_connection()
+        before = [tuple(row) for row in conn.execute('SELECT rating_sum, rating_count, rating_score FROM resources')]
+        rebuild_rating_aggregates(conn)
+        after = [tuple(row) for row in conn.execute('SELECT rating_sum, rating_count, rating_score FROM resources')]
+        assert before == after
+
+
+def test_top_rated_sort_prefers_many_good_reviews_over_one_perfect(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        reviewers = [UserDAL.get_user_by_email(email).user_id for email in
+                     ('student@campus.test', 'admin@campus.test', 'staff@campus.test')]
+        single = _fresh_resource(staff.user_id, 'One perfect review')
+        steady = _fresh_resource(staff.user_id, 'Consistently good')
+        ReviewDAL.create_review(single.resource_id, reviewers[0], 5, None)
+        for reviewer_id in reviewers * 3:
+            ReviewDAL.create_review(steady.resource_id, reviewer_id, 5 if reviewer_id != reviewers[2] else 4, None)
+
+        ranked = [resource.title for resource in ResourceDAL.search_resources(sort='top_rated')]
+        assert ranked.index('Consistently good') < ranked.index('One perfect review')
+
+
+def test_review_pages_follow_keyset_cursor(app, client):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        resource = _fresh_resource(staff.user_id, 'Busy room')
+        conn = get_connection()
+        conn.executemany(
+            "INSERT INTO reviews (resource_id, reviewer_id, rating, comment, created_at) VALUES (?, ?, 4, ?, '2030-01-01 10:00:00')",
+            [(resource.resource_id, staff.user_id, f'Review {index}') for index in range(25)]
+        )
+        conn.commit()
+
+        plan = ' '.join(row[3] for row in conn.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM reviews WHERE resource_id = 1 AND is_hidden = 0 ORDER BY created_at DESC, review_id DESC LIMIT 10'
+        ))
+        assert 'idx_reviews_resource_visible' in plan and 'TEMP B-TREE' not in plan
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = ReviewDAL.get_review_page(resource.resource_id, limit=10, before_id=cursor)
+            seen.extend(review.comment for review in page)
+            if cursor is None:
+                break
+        assert seen == [f'Review {index}' for index in range(24, -1, -1)]
+
+        page, cursor = ReviewDAL.get_review_page(resource.resource_id, limit=10)
+        ReviewDAL.delete_review(cursor)
+        restarted, _ = ReviewDAL.get_review_page(resource.resource_id, limit=10, before_id=cursor)
+        assert restarted[0].comment == 'Review 24'
+
+    first = client.get(f'/resources/{resource.resource_id}')
+    assert first.data.count(b'class="review-entry"') == 10
+    assert b'Older reviews' in first.data
+
+
+def test_init_replaces_the_older_review_index(app):
+    with app.app_context():
+        conn = get_connection()
+        conn.execute('DROP INDEX idx_reviews_resource_visible')
+        conn.execute('CREATE INDEX idx_reviews_resource ON reviews(resource_id, created_at)')
+        conn.commit()
+        init_database()
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_reviews_resource_visible' in names and 'idx_reviews_resource' not in names
@@ -0,0 +1,54 @@
+from src.controllers import resource_controller
+from src.data_access.resource_dal import ResourceDAL
+from src.utils.search_cache import SearchCache
+
+
+def test_repeat_searches_hit_until_the_catalog_changes(client, app):
+    with app.app_context():
+        first = [card.resource_id for card in ResourceDAL.search_resources(keyword='Kit')]
+        assert [card.resource_id for card in ResourceDAL.search_resources(keyword='  kit ')] == first
+        assert SearchCache.snapshot()['hits'] == 1
+        target = ResourceDAL.search_resources()[0]
+        ResourceDAL.update_resource(target.resource_id, title='Podcast kit annex')
+        renamed = ResourceDAL.search_resources(keyword='kit')
+        assert target.resource_id in [card.resource_id for card in renamed]
+        assert SearchCache.snapshot()['stale'] == 1
+    client.post('/auth/login', data={'email': 'admin@campus.test', 'password': 'AdminPass1!'})
+    metrics = client.get('/admin/metrics/search').get_json()
+    assert metrics['hits'] == 1 and metrics['entries'] >= 1
+    assert metrics['fuzzy']['resources'] == 0  # built by the first fallback lookup, not at startup
+    client.get('/resources/?keyword=Podcats')
+    assert client.get('/admin/metrics/search').get_json()['fuzzy']['resources'] >= 2
+
+
+def test_capacity_buckets_share_an_entry_and_the_byte_cap_evicts(app):
+    with app.app_context():
+        everything = ResourceDAL.search_resources()
+        for seats in (5, 6):
+            expected = [card.resource_id for card in everything if card.capacity >= seats]
+            assert [card.resource_id for card in ResourceDAL.search_resources(min_capacity=seats)] == expected
+        assert SearchCache.snapshot()['hits'] == 1
+        app.config['SEARCH_CACHE_BYTES'] = 600
+        for category in ('a', 'b', 'c', 'd'):
+            ResourceDAL.search_resources(category=category)
+        stats = SearchCache.snapshot()
+        assert stats['evicted'] and stats['bytes'] <= 600
+
+
+def test_browse_pages_through_cached_ids(client, app, monkeypatch):
+    monkeypatch.setattr(resource_controller, 'BROWSE_PAGE_SIZE', 1)
+    with app.app_context():
+        titles = [card.title for card in ResourceDAL.search_resources()]
+    first = client.get('/resources/').get_data(as_text=True)
+    second = client.get('/resources/?page=2').get_data(as_text=True)
+    assert titles[0] in first and titles[0] not in second and titles[1] in second
+    assert 'Next page' in first and f'{len(titles)} results' in second
+
+
+def test_non_ascii_locations_keep_their_case(app):
+    with app.app_context():
+        owner = ResourceDAL.get_resource_by_id(1).owner_id
+        hall = ResourceDAL.create_resource(owner, 'Guest Hall', 'Visiting space.', 'Event Space', 'Überseehalle',
+                                           80, None, 'published', [])
+        for location in ('Überseehalle', '  Überseehalle '):
+            assert [card.resource_id for card in ResourceDAL.search_resources(location=location)] == [hall.resource_id]
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+from src.data_access.booking_dal import BookingDAL
+from src.data_access.db import get_connection
+from src.data_access.resource_dal import ResourceDAL
+from src.data_access.stats_dal import COUNTER_SOURCES, StatsDAL, reconcile_counters
+from src.data_access.user_dal import UserDAL
+
+
+def _recounted(conn):
+    return {name: value for query in COUNTER_SOURCES.values() for name, value in conn.execute(query)}
+
+
+def test_counters_track_resource_and_booking_writes(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        student = UserDAL.get_user_by_email('student@campus.test')
+        resource = ResourceDAL.create_resource(staff.user_id, 'Counter Lab', 'A room for counting.', 'Lab', 'Hall 1',
+                                               12, None, 'draft', [])
+        ResourceDAL.update_resource(resource.resource_id, status='published', capacity=30)
+        start = datetime.utcnow().replace(microsecond=0)
+        booking = BookingDAL.create_booking(resource.resource_id, student.user_id, start.isoformat(),
+                                               (start + timedelta(hours=1)).isoformat(), notes=None)
+        BookingDAL.update_status(booking.booking_id, 'approved')
+
+        conn = get_connection()
+        stored = {row['name']: row['value'] for row in conn.execute('SELECT name, value FROM stats_counters')}
+        assert {name: stored.get(name, 0) for name in _recounted(conn)} == _recounted(conn)
+        assert reconcile_counters(conn) == []
+
+        stats = ResourceDAL.get_resource_stats()
+        totals = conn.execute("SELECT COUNT(*), SUM(status = 'published'), AVG(capacity) FROM resources").fetchone()
+        assert (stats['total'], stats['published']) == (totals[0], totals[1])
+        assert abs(stats['avg_capacity'] - totals[2]) < 1e-9
+
+
+def test_reconcile_repairs_writes_that_bypassed_triggers(app):
+    with app.app_context():
+        conn = get_connection()
+        conn.execute('DROP TRIGGER bookings_counters_delete')
+        conn.execute('DELETE FROM bookings')
+        drifted = {name for name, _, _ in reconcile_counters(conn)}
+        conn.commit()
+        assert 'bookings' in drifted
+        assert StatsDAL.counters('bookings') and not any(StatsDAL.counters('bookings').values())
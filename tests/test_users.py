@@ -0,0 +1,263 @@
+import io
+import sqlite3
+
+from src.app import create_app
+from src.config import TestConfig
+from src.data_access.booking_dal import BookingDAL
+from src.data_access.db import get_connection
+from src.data_access.message_dal import MessageDAL
+from src.data_access.resource_dal import ResourceDAL
+from src.data_access.stats_dal import StatsDAL, reconcile_counters
+from src.data_access.user_dal import DELETED_USER_NAME, UserDAL
+from src.utils.keyed_cache import KeyedCache
+from src.utils.provisioning import provision_users
+
+
+def _login(client, email, password):
+    return client.post('/auth/login', data={'email': email, 'password': password}, follow_redirects=True)
+
+
+def test_authenticated_requests_reuse_cached_user(client, app, monkeypatch):
+    _login(client, 'student@campus.test', 'StudentPass1!')
+    client.get('/dashboard/')
+    loads = []
+    original = UserDAL.get_user_by_id
+    monkeypatch.setattr(UserDAL, 'get_user_by_id', staticmethod(lambda user_id: loads.append(user_id) or original(user_id)))
+
+    for _ in range(3):
+        assert client.get('/dashboard/').status_code == 200
+    assert loads == []
+
+
+def test_suspension_and_role_change_apply_on_next_request(client, app):
+    _login(client, 'staff@campus.test', 'StaffPass1!')
+    assert client.get('/resources/mine').status_code == 200
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        UserDAL.update_role(staff.user_id, 'student')
+    response = client.get('/resources/mine', follow_redirects=True)
+    assert b'Only staff and admin users can manage resources.' in response.data
+
+    with app.app_context():
+        UserDAL.set_suspension(staff.user_id, True)
+    assert client.get('/dashboard/').status_code == 302
+    response = _login(client, 'staff@campus.test', 'StaffPass1!')
+    assert b'This account is suspended' in response.data
+
+
+def test_changes_from_another_worker_reach_the_cached_user(app):
+    with app.app_context():
+        staff = UserDAL.get_cached_user(UserDAL.get_user_by_email('staff@campus.test').user_id)
+        assert UserDAL.get_cached_user(staff.user_id) is staff
+        other_worker = sqlite3.connect(app.config['DATABASE_PATH'])
+        other_worker.execute('UPDATE users SET is_suspended = 1 WHERE user_id = ?', (staff.user_id,))
+        other_worker.commit()
+        other_worker.close()
+        assert UserDAL.get_cached_user(staff.user_id).is_suspended
+
+
+def test_keyed_cache_forgets_invalidated_keys():
+    cache = KeyedCache(max_entries=2)
+    for key in range(5):
+        assert cache.get(key, lambda: key * 10, ttl=60) == key * 10
+        cache.invalidate(key + 100)
+    assert len(cache) == 2 and cache._loading == {}
+    assert cache.get(4, lambda: 'reloaded', ttl=60) == 40
+    assert cache.get(4, lambda: 'reloaded', ttl=60, stamp=1) == 'reloaded'
+
+    def load_then_invalidate():
+        cache.invalidate('racing')
+        return 'stale'
+    assert cache.get('racing', load_then_invalidate, ttl=60) == 'stale'
+    assert cache.get('racing', lambda: 'fresh', ttl=60) == 'fresh'
+
+
+def test_admin_can_suspend_users(client, app):
+    _login(client, 'admin@campus.test', 'AdminPass1!')
+    with app.app_context():
+        student = UserDAL.get_user_by_email('student@campus.test')
+    client.post(f'/admin/users/{student.user_id}/suspension', data={'suspended': '1'})
+    with app.app_context():
+        assert UserDAL.get_user_by_email('student@campus.test').is_suspended
+
+
+def test_login_rehashes_when_hash_parameters_change(client, app):
+    hasher = app.extensions['password_hasher']
+    hasher.method = 'pbkdf2:sha256:1000'
+    _login(client, 'student@campus.test', 'StudentPass1!')
+    with app.app_context():
+        stored = get_connection().execute("SELECT password_hash FROM users WHERE email = 'student@campus.test'").fetchone()[0]
+    assert stored.startswith('pbkdf2:sha256:1000$')
+    assert hasher.metrics.snapshot()['rehashed'] == 1
+
+
+def test_account_bucket_rejects_before_hashing(client, app):
+    hasher = app.extensions['password_hasher']
+    for _ in range(app.config['LOGIN_ACCOUNT_BURST']):
+        assert client.post('/auth/login', data={'email': 'staff@campus.test', 'password': 'wrong'}).status_code == 200
+    verified = hasher.metrics.snapshot()['verified']
+    response = client.post('/auth/login', data={'email': 'staff@campus.test', 'password': 'StaffPass1!'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    assert hasher.metrics.snapshot()['verified'] == verified
+
+
+def test_ip_bucket_keys_on_the_forwarded_client_behind_a_trusted_proxy():
+    proxied = create_app(type('ProxiedConfig', (TestConfig,), {'TRUSTED_PROXY_HOPS': 1, 'LOGIN_IP_BURST': 1}))
+    client = proxied.test_client()
+
+    def attempt(address):
+        return client.post('/auth/login', data={'email': f'{address}@campus.test', 'password': 'wrong'},
+                           headers={'X-Forwarded-For': address}).status_code
+
+    assert [attempt('10.0.0.1'), attempt('10.0.0.2'), attempt('10.0.0.1')] == [200, 200, 429]
+
+
+def test_full_hash_queue_refuses_sign_in(client, app):
+    from src.utils.password_hasher import PasswordHasher
+
+    app.extensions['password_hasher'] = PasswordHasher('scrypt', workers=0, max_pending=0)
+    response = client.post('/auth/login', data={'email': 'staff@campus.test', 'password': 'StaffPass1!'})
+    assert response.status_code == 503
+
+
+def test_process_pool_hashes_and_records_metrics():
+    from src.utils.password_hasher import PasswordHasher
+
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=1, max_pending=4)
+    try:
+        pwhash = hasher.hash('Secret123!')
+        assert hasher.verify(pwhash, 'Secret123!')
+        assert not hasher.verify(pwhash, 'nope')
+    finally:
+        hasher.shutdown()
+    snapshot = hasher.metrics.snapshot()
+    assert snapshot['hash_seconds']['samples'] == 3
+    assert snapshot['queue_wait_seconds']['p50'] is not None
+
+
+ROSTER = '''name,email,role,department
+New Student,New.Student@campus.test,student,History
+Sam Staff,staff@campus.test,admin,Facilities
+Bad Email,not-an-email,student,
+Wrong Role,wrong.role@campus.test,dean,
+'''
+
+
+def test_provisioning_upserts_and_reports_rejected_rows(app):
+    with app.app_context():
+        report = provision_users(io.StringIO(ROSTER), 'pbkdf2:sha256:1000', chunk_size=1, processes=0)
+
+        assert (report.created, report.updated) == (1, 1)
+        assert [line for line, _ in report.errors] == [4, 5]
+        assert [email for email, _ in report.credentials] == ['new.student@campus.test']
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        assert (staff.role, staff.department) == ('admin', 'Facilities')
+        assert UserDAL.verify_password('staff@campus.test', 'StaffPass1!')
+        assert UserDAL.verify_password('new.student@campus.test', report.credentials[0][1])
+
+
+def test_admin_roster_upload_returns_generated_credentials(client, app):
+    _login(client, 'admin@campus.test', 'AdminPass1!')
+    response = client.post('/admin/users/import', data={'roster': (io.BytesIO(ROSTER.encode()), 'roster.csv')},
+                           content_type='multipart/form-data')
+    assert response.mimetype == 'text/csv'
+    assert response.data.decode().splitlines()[1].startswith('new.student@campus.test,')
+
+    response = client.post('/admin/users/import', data={'roster': (io.BytesIO(b'email\nx@campus.test\n'), 'r.csv')},
+                           content_type='multipart/form-data', follow_redirects=True)
+    assert b'missing column(s): name' in response.data
+
+
+def test_large_rosters_are_sent_to_the_cli(client, app):
+    app.config['WEB_ROSTER_MAX_ROWS'] = 2
+    _login(client, 'admin@campus.test', 'AdminPass1!')
+    response = client.post('/admin/users/import', data={'roster': (io.BytesIO(ROSTER.encode()), 'roster.csv')},
+                           content_type='multipart/form-data', follow_redirects=True)
+    assert b'flask provision-users' in response.data
+    with app.app_context():
+        assert UserDAL.get_user_by_email('new.student@campus.test') is None
+
+
+def test_roster_without_roles_keeps_existing_roles_and_renames_inbox_rows(app):
+    roster = 'name,email,password\nSamuel Staff,staff@campus.test,\nNew Person,new.person@campus.test,Welcome123\n' \
+             'Weak Password,weak@campus.test,short\n'
+    with app.app_context():
+        student = UserDAL.get_user_by_email('student@campus.test')
+        report = provision_users(io.StringIO(roster), 'pbkdf2:sha256:1000', processes=0)
+
+        assert (report.created, report.updated) == (1, 1)
+        assert report.errors == [(4, 'Password must contain at least eight characters.')]
+        assert UserDAL.get_user_by_email('staff@campus.test').role == 'staff'
+        assert UserDAL.get_user_by_email('new.person@campus.test').role == 'student'
+        assert 'Samuel Staff' in [entry.other_user_name for entry in MessageDAL.list_inbox(student.user_id)]
+
+
+def test_cli_refuses_to_generate_passwords_it_cannot_keep(app, tmp_path):
+    roster = tmp_path / 'roster.csv'
+    roster.write_text('name,email\nCli Person,cli.person@campus.test\n')
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['provision-users', str(roster)])
+    assert result.exit_code != 0 and '--credentials-out' in result.output
+    with app.app_context():
+        assert UserDAL.get_user_by_email('cli.person@campus.test') is None
+
+    credentials = tmp_path / 'credentials.csv'
+    result = runner.invoke(args=['provision-users', str(roster), '--credentials-out', str(credentials)])
+    assert result.exit_code == 0
+    assert credentials.read_text().splitlines()[1].startswith('cli.person@campus.test,')
+
+
+def test_user_counters_follow_inserts_role_changes_and_deletes(app):
+    with app.app_context():
+        before = StatsDAL.counters('users')
+        UserDAL.create_user('Counted Person', 'counted@campus.test', 'CountedPass1!')
+        user = UserDAL.get_user_by_email('counted@campus.test')
+        UserDAL.update_role(user.user_id, 'staff')
+        UserDAL.set_suspension(user.user_id, True)
+        after = StatsDAL.counters('users')
+        assert after[''] == before[''] + 1
+        assert after['role:staff'] == before['role:staff'] + 1
+        assert after['role:student'] == before['role:student']
+        assert after['suspended'] == before.get('suspended', 0) + 1
+
+        UserDAL.delete_user(user.user_id)
+        assert StatsDAL.counters('users') == after  # closed accounts stay on file, suspended
+        conn = get_connection()
+        conn.execute("UPDATE stats_counters SET value = 0 WHERE name = 'users'")
+        assert reconcile_counters(conn) == [('users', 0, after[''])]
+
+
+def test_deleting_a_user_closes_the_account_without_orphans(app):
+    with app.app_context():
+        staff = UserDAL.get_user_by_email('staff@campus.test')
+        student = UserDAL.get_user_by_email('student@campus.test')
+        resource = ResourceDAL.create_resource(staff.user_id, 'Closing Room', 'Soon gone.', 'Study Room', 'Ballantine',
+                                               4, None, 'published', [])
+        booking = BookingDAL.create_booking(resource.resource_id, student.user_id, '2099-01-01T09:00:00',
+                                               '2099-01-01T10:00:00', None)
+        assert UserDAL.delete_user(staff.user_id) and not UserDAL.delete_user(999999)
+
+        closed = UserDAL.get_user_by_id(staff.user_id)
+        assert closed.is_suspended and closed.name == DELETED_USER_NAME
+        assert UserDAL.get_user_by_email('staff@campus.test') is None
+        assert ResourceDAL.get_resource_by_id(resource.resource_id).status == 'archived'
+        assert BookingDAL.get_booking_by_id(booking.booking_id).status == 'rejected'
+        assert resource.resource_id not in [card.resource_id for card in ResourceDAL.search_resources()]
+
+
+def test_directory_prefix_search_and_keyset_pages(client, app):
+    with app.app_context():
+        UserDAL.upsert_many([(f'Zed Person {i}', f'zed{i}@campus.test', 'student', 'Physics', 'x') for i in range(5)])
+        first, cursor = UserDAL.directory(search='ZED', limit=3)
+        second, last = UserDAL.directory(search='zed', after_id=cursor, limit=3)
+        assert [u.email for u in first + second] == [f'zed{i}@campus.test' for i in range(4, -1, -1)]
+        assert last is None
+        assert UserDAL.directory(search='zed%')[0] == []
+        assert len(UserDAL.directory(department='physics')[0]) == 5
+
+    _login(client, 'admin@campus.test', 'AdminPass1!')
+    payload = client.get('/admin/api/users?q=zed&role=student').get_json()
+    assert len(payload['users']) == 5 and payload['next_cursor'] is None
+    assert payload['counts']['role:student'] >= 5
+    assert b'zed4@campus.test' in client.get('/admin/users?q=zed').data